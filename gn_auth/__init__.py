@@ -1,6 +1,7 @@
 """Application initialisation module."""
 import os
 import sys
+import sqlite3
 import logging
 from pathlib import Path
 from typing import Optional
@@ -10,6 +11,8 @@ from flask_cors import CORS
 
 from gn_auth.misc_views import misc
 from gn_auth.auth.views import oauth2
+from gn_auth.auth.db import sqlite3 as authdb
+from gn_auth.auth.authorisation.identity import clear_identities
 
 from gn_auth.auth.authentication.oauth2.server import setup_oauth2_server
 
@@ -58,6 +61,34 @@ def load_secrets_conf(app: Flask) -> None:
                 "You must provide a path to an existing secrets file.")
         app.config.from_pyfile(secretsfile)
 
+def check_auth_db_profile(app: Flask) -> None:
+    """Report the performance settings in effect for the auth database."""
+    with app.app_context():
+        try:
+            expected = authdb.performance_profile()
+        except ValueError as verr:
+            raise ConfigurationError(verr.args[0]) from verr
+
+        try:
+            with authdb.connection(app.config["AUTH_DB"]) as conn:
+                effective = authdb.effective_profile(conn)
+        except sqlite3.Error as _sqlerr:
+            app.logger.warning(
+                "Could not check the auth database's performance settings.",
+                exc_info=True)
+            return
+
+    app.logger.info("Auth database performance settings: %s", effective)
+    mismatched = {
+        pragma: value for pragma, value in effective.items()
+        if str(value) != expected[pragma]}
+    if len(mismatched) > 0:
+        app.logger.warning(
+            "Some auth database performance settings differ from the "
+            "configured values: %s (expected %s)",
+            mismatched,
+            {pragma: expected[pragma] for pragma in mismatched})
+
 def create_app(config: Optional[dict] = None) -> Flask:
     """Create and return a new flask application."""
     app = Flask(__name__)
@@ -78,6 +109,7 @@ def create_app(config: Optional[dict] = None) -> Flask:
     check_mandatory_settings(app)
 
     setup_logging_handlers(app)
+    check_auth_db_profile(app)
     setup_oauth2_server(app)
 
     CORS(
@@ -91,5 +123,6 @@ def create_app(config: Optional[dict] = None) -> Flask:
     app.register_blueprint(oauth2, url_prefix="/auth")
 
     register_error_handlers(app)
+    app.teardown_request(clear_identities)
 
     return app
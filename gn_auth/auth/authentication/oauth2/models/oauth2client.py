@@ -4,7 +4,7 @@ import datetime
 
 from uuid import UUID
 from dataclasses import dataclass
-from functools import cached_property
+from functools import lru_cache, cached_property
 from typing import Sequence, Optional
 
 from authlib.oauth2.rfc6749 import ClientMixin
@@ -18,6 +18,8 @@ from gn_auth.auth.authentication.users import (User,
 
 from gn_auth.auth.authorisation.errors import NotFoundError
 
+from .token_cache import uncache_client_tokens
+
 
 @dataclass(frozen=True)
 class OAuth2Client(ClientMixin):
@@ -140,6 +142,17 @@ class OAuth2Client(ClientMixin):
         return self.client_metadata.get("default_redirect_uri", "")
 
 
+@lru_cache(maxsize=256)
+def parse_client_metadata(metadata: str) -> dict:
+    """
+    Parse the JSON-encoded client metadata.
+
+    Clients are few, so the parsed metadata is reused rather than parsed again
+    each time a client is loaded: treat the returned dict as read-only.
+    """
+    return json.loads(metadata)
+
+
 def client(conn: db.DbConnection, client_id: UUID,
            user: Optional[User] = None) -> Maybe:
     """Retrieve a client by its ID"""
@@ -166,7 +179,8 @@ def client(conn: db.DbConnection, client_id: UUID,
                     client_secret_expires_at=datetime.datetime.fromtimestamp(
                         result["client_secret_expires_at"]
                     ),
-                    client_metadata=json.loads(result["client_metadata"]),
+                    client_metadata=parse_client_metadata(
+                        result["client_metadata"]),
                     user=_user)  # type: ignore[arg-type]
             )
     return Nothing
@@ -264,4 +278,5 @@ def delete_client(
                        params)
         cursor.execute("DELETE FROM oauth2_tokens WHERE client_id=?", params)
         cursor.execute("DELETE FROM oauth2_clients WHERE client_id=?", params)
+        uncache_client_tokens(the_client.client_id)
         return the_client
@@ -10,10 +10,10 @@ from pymonad.tools import monad_from_none_or_value
 from pymonad.maybe import Just, Maybe, Nothing
 
 from gn_auth.auth.db import sqlite3 as db
-from gn_auth.auth.authentication.users import User, user_by_id
-from gn_auth.auth.authorisation.errors import NotFoundError
+from gn_auth.auth.authentication.users import User
 
-from .oauth2client import client, OAuth2Client
+from .oauth2client import OAuth2Client, parse_client_metadata
+from .token_cache import uncache_token
 
 
 # pylint: disable=[too-many-instance-attributes]
@@ -58,56 +58,66 @@ class OAuth2Token(TokenMixin):
         return self.revoked
 
 
-def __token_from_resultset__(conn: db.DbConnection, rset) -> Maybe:
-    try:
-        the_user = user_by_id(conn, uuid.UUID(rset["user_id"]))
-    except NotFoundError as _nfe:
-        the_user = None
-    return client(
-        conn, uuid.UUID(rset["client_id"]), the_user
-    ).then(
-        lambda client: OAuth2Token(
-            token_id=uuid.UUID(rset["token_id"]),
-            client=client,
-            token_type=rset["token_type"],
-            access_token=rset["access_token"],
-            refresh_token=rset["refresh_token"],
-            scope=rset["scope"],
-            revoked=(rset["revoked"] == 1),
-            issued_at=datetime.datetime.fromtimestamp(
-                rset["issued_at"]),
-            expires_in=rset["expires_in"],
-            user=the_user  # type: ignore
-        ) if bool(the_user) else
-        Nothing
-    )
+__TOKEN_QUERY__ = (
+    "SELECT tokens.*, users.email AS user_email, users.name AS user_name, "
+    "clients.client_secret, clients.client_id_issued_at, "
+    "clients.client_secret_expires_at, clients.client_metadata "
+    "FROM oauth2_tokens AS tokens "
+    "INNER JOIN users ON tokens.user_id=users.user_id "
+    "INNER JOIN oauth2_clients AS clients "
+    "ON tokens.client_id=clients.client_id ")
 
 
-def token_by_access_token(conn: db.DbConnection, token_str: str) -> Maybe:
-    """Retrieve token by its token string"""
+def __token_from_resultset__(rset) -> OAuth2Token:
+    """
+    Build the token from a row with the token, its user and its client, as
+    retrieved with `__TOKEN_QUERY__`.
+    """
+    the_user = User(
+        uuid.UUID(rset["user_id"]), rset["user_email"], rset["user_name"])
+    return OAuth2Token(
+        token_id=uuid.UUID(rset["token_id"]),
+        client=OAuth2Client(
+            client_id=uuid.UUID(rset["client_id"]),
+            client_secret=rset["client_secret"],
+            client_id_issued_at=datetime.datetime.fromtimestamp(
+                rset["client_id_issued_at"]),
+            client_secret_expires_at=datetime.datetime.fromtimestamp(
+                rset["client_secret_expires_at"]),
+            client_metadata=parse_client_metadata(rset["client_metadata"]),
+            user=the_user),
+        token_type=rset["token_type"],
+        access_token=rset["access_token"],
+        refresh_token=rset["refresh_token"],
+        scope=rset["scope"],
+        revoked=(rset["revoked"] == 1),
+        issued_at=datetime.datetime.fromtimestamp(
+            rset["issued_at"]),
+        expires_in=rset["expires_in"],
+        user=the_user)
+
+
+def __token_by__(conn: db.DbConnection, column: str, token_str: str) -> Maybe:
+    """
+    Retrieve the token, together with its user and client, in a single query.
+    """
+    assert column in ("access_token", "refresh_token")
     with db.cursor(conn) as cursor:
-        cursor.execute("SELECT * FROM oauth2_tokens WHERE access_token=?",
+        cursor.execute(f"{__TOKEN_QUERY__} WHERE tokens.{column}=?",
                        (token_str,))
         return monad_from_none_or_value(
             Nothing, Just, cursor.fetchone()
-        ).then(
-            lambda res: __token_from_resultset__(
-                conn, res
-            )
-        )
+        ).map(__token_from_resultset__)
+
+
+def token_by_access_token(conn: db.DbConnection, token_str: str) -> Maybe:
+    """Retrieve token by its token string"""
+    return __token_by__(conn, "access_token", token_str)
 
 
 def token_by_refresh_token(conn: db.DbConnection, token_str: str) -> Maybe:
     """Retrieve token by its token string"""
-    with db.cursor(conn) as cursor:
-        cursor.execute(
-            "SELECT * FROM oauth2_tokens WHERE refresh_token=?",
-            (token_str,))
-        return monad_from_none_or_value(
-            Nothing, Just, cursor.fetchone()
-        ).then(
-            lambda res: __token_from_resultset__(conn, res)
-        )
+    return __token_by__(conn, "refresh_token", token_str)
 
 
 def revoke_token(token: OAuth2Token) -> OAuth2Token:
@@ -124,7 +134,7 @@ def revoke_token(token: OAuth2Token) -> OAuth2Token:
 
 def save_token(conn: db.DbConnection, token: OAuth2Token) -> None:
     """Save/Update the token."""
-    with db.cursor(conn) as cursor:
+    def __save__(cursor):
         cursor.execute(
             ("INSERT INTO oauth2_tokens VALUES (:token_id, :client_id, "
              ":token_type, :access_token, :refresh_token, :scope, :revoked, "
@@ -145,3 +155,6 @@ def save_token(conn: db.DbConnection, token: OAuth2Token) -> None:
                 "expires_in": token.expires_in,
                 "user_id": str(token.user.user_id)
             })
+
+    db.transaction(conn, __save__, "save_token")
+    uncache_token(token.access_token)
@@ -0,0 +1,66 @@
+"""In-process cache of validated OAuth2 bearer tokens."""
+import hashlib
+import datetime
+import threading
+from uuid import UUID
+from typing import Any, Optional
+
+from flask import current_app, has_app_context
+
+from gn_auth import settings
+from gn_auth.caching import TTLCache
+
+__cache__: Optional[TTLCache] = None
+__cache_lock__ = threading.Lock()
+
+def __token_cache__() -> TTLCache:
+    """Retrieve the process-wide token cache, creating it if necessary."""
+    global __cache__ # pylint: disable=[global-statement]
+    with __cache_lock__:
+        if __cache__ is None:
+            config = current_app.config if has_app_context() else {}
+            __cache__ = TTLCache(
+                int(config.get("OAUTH2_TOKEN_CACHE_SIZE",
+                               settings.OAUTH2_TOKEN_CACHE_SIZE)),
+                float(config.get("OAUTH2_TOKEN_CACHE_TTL",
+                                 settings.OAUTH2_TOKEN_CACHE_TTL)))
+        return __cache__
+
+def __key__(access_token: str) -> str:
+    """Avoid holding the raw token strings in memory as cache keys."""
+    return hashlib.sha256(access_token.encode("utf8")).hexdigest()
+
+def cached_token(access_token: str, generation: Any) -> Optional[Any]:
+    """
+    Retrieve the token for `access_token` if it was cached at the current
+    'tokens' `generation`.
+
+    Revoking or refreshing a token, or changing or deleting a client, in any
+    process bumps the generation, so tokens cached before then are no longer
+    trusted.
+    """
+    cached = __token_cache__().get(__key__(access_token))
+    if cached is None or cached[0] != generation:
+        return None
+    return cached[1]
+
+def cache_token(token: Any, generation: Any) -> None:
+    """
+    Cache `token` at the 'tokens' `generation`, for no longer than its
+    remaining lifetime. Revoked tokens are never cached.
+    """
+    if token.revoked:
+        return
+    __token_cache__().set(
+        __key__(token.access_token),
+        (generation, token),
+        (token.expires_at - datetime.datetime.now()).total_seconds())
+
+def uncache_token(access_token: str) -> None:
+    """Remove the token for `access_token` from the cache."""
+    __token_cache__().pop(__key__(access_token))
+
+def uncache_client_tokens(client_id: UUID) -> None:
+    """Remove all cached tokens issued to the client with `client_id`."""
+    __token_cache__().pop_where(
+        lambda cached: cached[1].client.client_id == client_id)
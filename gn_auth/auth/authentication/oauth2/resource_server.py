@@ -5,14 +5,25 @@ from authlib.oauth2.rfc6750 import BearerTokenValidator as _BearerTokenValidator
 from authlib.integrations.flask_oauth2 import ResourceProtector
 
 from gn_auth.auth.db import sqlite3 as db
+from gn_auth.auth.authorisation.privileges import authorisation_generation
 from gn_auth.auth.authentication.oauth2.models.oauth2token import token_by_access_token
+from gn_auth.auth.authentication.oauth2.models.token_cache import (
+    cache_token, cached_token)
 
 class BearerTokenValidator(_BearerTokenValidator):
     """Extends `authlib.oauth2.rfc6750.BearerTokenValidator`"""
     def authenticate_token(self, token_string: str):
         with db.connection(app.config["AUTH_DB"]) as conn:
-            return token_by_access_token(conn, token_string).maybe(# type: ignore[misc]
+            generation = authorisation_generation(conn, "tokens")
+            token = cached_token(token_string, generation)
+            if token is not None:
+                return token
+
+            token = token_by_access_token(conn, token_string).maybe(# type: ignore[misc]
                 None, lambda tok: tok)
+        if token is not None:
+            cache_token(token, generation)
+        return token
 
 require_oauth = ResourceProtector()
 
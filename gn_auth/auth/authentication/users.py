@@ -112,12 +112,13 @@ def fetch_users(conn: db.DbConnection,
     """
     Fetch all users with the given `ids`. If `ids` is empty, return ALL users.
     """
-    params = ", ".join(["?"] * len(ids))
     with db.cursor(conn) as cursor:
-        query = "SELECT * FROM users" + (
-            f" WHERE user_id IN ({params})"
-            if len(ids) > 0 else "")
-        cursor.execute(query, tuple(str(the_id) for the_id in ids))
+        if len(ids) > 0:
+            cursor.execute(
+                f"SELECT * FROM users WHERE user_id IN ({db.VALUES_IN})",
+                (db.json_values(ids),))
+        else:
+            cursor.execute("SELECT * FROM users")
         return tuple(User(UUID(row["user_id"]), row["email"], row["name"])
                      for row in cursor.fetchall())
     return tuple()
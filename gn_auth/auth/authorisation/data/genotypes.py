@@ -1,14 +1,17 @@
 """Handle linking of Genotype data to the Auth(entic|oris)ation system."""
 import uuid
 from dataclasses import asdict
-from typing import Iterable
+from typing import Iterable, Iterator
 
 from MySQLdb.cursors import DictCursor
 
+from gn_auth.streaming import fetch_rows
 from gn_auth.auth.db import mariadb as gn3db
 from gn_auth.auth.db import sqlite3 as authdb
 
 from gn_auth.auth.authorisation.checks import authorised_p
+from gn_auth.auth.authorisation.data.linked_keys import (
+    join_linked_keys, linked_keys_table)
 from gn_auth.auth.authorisation.resources.groups.models import Group
 
 def linked_genotype_data(conn: authdb.DbConnection) -> Iterable[dict]:
@@ -25,14 +28,15 @@ def linked_genotype_data(conn: authdb.DbConnection) -> Iterable[dict]:
 def ungrouped_genotype_data(# pylint: disable=[too-many-arguments]
         authconn: authdb.DbConnection, gn3conn: gn3db.DbConnection,
         search_query: str, selected: tuple[dict, ...] = tuple(),
-        limit: int = 10000, offset: int = 0) -> tuple[
-            dict, ...]:
-    """Retrieve genotype data that is not linked to any user group."""
-    params = tuple(
+        limit: int = 10000, offset: int = 0) -> Iterator[dict]:
+    """
+    Retrieve genotype data that is not linked to any user group, nor among the
+    `selected` data.
+    """
+    selected_params = tuple(
         (row["SpeciesId"], row["InbredSetId"], row["GenoFreezeId"])
-            for row in linked_genotype_data(authconn)) + tuple(
-                    (row["SpeciesId"], row["InbredSetId"], row["GenoFreezeId"])
-                    for row in selected)
+        for row in selected)
+    columns = ("s.SpeciesId", "iset.InbredSetId", "gf.Id")
     query = (
         "SELECT s.SpeciesId, iset.InbredSetId, iset.InbredSetName, "
         "gf.Id AS GenoFreezeId, gf.Name AS dataset_name, "
@@ -40,28 +44,26 @@ def ungrouped_genotype_data(# pylint: disable=[too-many-arguments]
         "gf.ShortName AS dataset_shortname "
         "FROM Species AS s INNER JOIN InbredSet AS iset "
         "ON s.SpeciesId=iset.SpeciesId INNER JOIN GenoFreeze AS gf "
-        "ON iset.InbredSetId=gf.InbredSetId ")
+        "ON iset.InbredSetId=gf.InbredSetId" + join_linked_keys(
+            linked_keys_table(authconn, gn3conn, "genotype"), "genotype",
+            columns) +
+        "WHERE lk.SpeciesId IS NULL ")
+    params = tuple(item for sublist in selected_params for item in sublist)
 
-    if len(params) > 0 or bool(search_query):
-        query = query + "WHERE "
-
-    if len(params) > 0:
-        paramstr = ", ".join(["(%s, %s, %s)"] * len(params))
-        query = query + (
-            "(s.SpeciesId, iset.InbredSetId, gf.Id) "
-            f"NOT IN ({paramstr}) "
-            ) + ("AND " if bool(search_query) else "")
+    if len(selected_params) > 0:
+        paramstr = ", ".join(["(%s, %s, %s)"] * len(selected_params))
+        query = query + f"AND ({', '.join(columns)}) NOT IN ({paramstr}) "
 
     if bool(search_query):
         query = query + (
-            "CONCAT(gf.Name, ' ', gf.FullName, ' ', gf.ShortName) LIKE %s ")
-        params = params + ((f"%{search_query}%",),)# type: ignore[operator]
+            "AND CONCAT(gf.Name, ' ', gf.FullName, ' ', gf.ShortName) "
+            "LIKE %s ")
+        params = params + (f"%{search_query}%",)
 
     query = query + f"LIMIT {int(limit)} OFFSET {int(offset)}"
     with gn3conn.cursor(DictCursor) as cursor:
-        cursor.execute(
-            query, tuple(item for sublist in params for item in sublist))
-        return tuple(row for row in cursor.fetchall())
+        cursor.execute(query, params)
+        yield from fetch_rows(cursor)
 
 @authorised_p(
     ("system:data:link-to-group",),
@@ -72,26 +74,29 @@ def ungrouped_genotype_data(# pylint: disable=[too-many-arguments]
 def link_genotype_data(
         conn: authdb.DbConnection, group: Group, datasets: dict) -> dict:
     """Link genotye `datasets` to `group`."""
-    with authdb.cursor(conn) as cursor:
-        cursor.executemany(
+    params = tuple({
+        "data_link_id": str(uuid.uuid4()),
+        "group_id": str(group.group_id),
+        **{
+            key: value for key,value in dataset.items() if key in (
+                "GenoFreezeId", "InbredSetId", "SpeciesId",
+                "dataset_fullname", "dataset_name", "dataset_shortname")
+        }
+    } for dataset in datasets)
+    authdb.transaction(
+        conn,
+        lambda cursor: cursor.executemany(
             "INSERT INTO linked_genotype_data VALUES "
             "(:data_link_id, :group_id, :SpeciesId, :InbredSetId, "
             ":GenoFreezeId, :dataset_name, :dataset_fullname, "
             ":dataset_shortname) "
             "ON CONFLICT (SpeciesId, InbredSetId, GenoFreezeId) DO NOTHING",
-            tuple({
-                "data_link_id": str(uuid.uuid4()),
-                "group_id": str(group.group_id),
-                **{
-                    key: value for key,value in dataset.items() if key in (
-                        "GenoFreezeId", "InbredSetId", "SpeciesId",
-                        "dataset_fullname", "dataset_name", "dataset_shortname")
-                }
-            } for dataset in datasets))
-        return {
-            "description": (
-                f"Successfully linked {len(datasets)} to group "
-                f"'{group.group_name}'."),
-            "group": asdict(group),
-            "datasets": datasets
-        }
+            params),
+        "link_genotype_data")
+    return {
+        "description": (
+            f"Successfully linked {len(datasets)} to group "
+            f"'{group.group_name}'."),
+        "group": asdict(group),
+        "datasets": datasets
+    }
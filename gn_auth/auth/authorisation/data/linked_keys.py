@@ -0,0 +1,84 @@
+"""
+Filter GN3 data by whether it is linked to a group in the auth database.
+
+The keys of the linked data are loaded into a temporary table on the MariaDB
+connection, and joined against, rather than being sent along with every query
+as a `(NOT) IN ((%s, %s, ...), ...)` list that grows with every link.
+"""
+import threading
+from itertools import islice
+from weakref import WeakKeyDictionary
+
+from gn_auth.streaming import fetch_rows
+from gn_auth.auth.db import sqlite3 as authdb
+from gn_auth.auth.db import mariadb as gn3db
+from gn_auth.auth.authorisation.privileges import authorisation_generation
+
+INSERT_BATCH_SIZE = 1000
+
+# data type: (linked-data table, the columns that identify the data in GN3)
+LINKED_DATA = {
+    "mrna": ("linked_mrna_data",
+             ("SpeciesId", "InbredSetId", "ProbeFreezeId", "ProbeSetFreezeId")),
+    "genotype": ("linked_genotype_data",
+                 ("SpeciesId", "InbredSetId", "GenoFreezeId")),
+    "phenotype": ("linked_phenotype_data",
+                  ("SpeciesId", "InbredSetId", "PublishFreezeId",
+                   "PublishXRefId"))
+}
+
+# The generation of the keys loaded on each MariaDB connection, by table
+__loaded__: WeakKeyDictionary = WeakKeyDictionary()
+__loaded_lock__ = threading.Lock()
+
+def linked_keys_table(authconn: authdb.DbConnection,
+                      gn3conn: gn3db.DbConnection,
+                      data_type: str) -> str:
+    """
+    Load the keys of the `data_type` data that is linked to groups into a
+    temporary table on `gn3conn`, and return the name of the table.
+
+    Temporary tables last as long as the connection does, so the keys are only
+    reloaded after data has been linked or unlinked.
+    """
+    linked_table, columns = LINKED_DATA[data_type]
+    table = f"tmp_{linked_table}_keys"
+    generation = authorisation_generation(authconn, "linked-data")
+    with __loaded_lock__:
+        if __loaded__.get(gn3conn, {}).get(table) == generation:
+            return table
+
+    with (authdb.cursor(authconn) as authcursor,
+          gn3conn.cursor() as gn3cursor):
+        gn3cursor.execute(
+            f"CREATE TEMPORARY TABLE IF NOT EXISTS {table}("
+            + ", ".join(f"{column} INT NOT NULL" for column in columns)
+            + f", PRIMARY KEY({', '.join(columns)})) ENGINE=MEMORY")
+        gn3cursor.execute(f"DELETE FROM {table}")
+        authcursor.execute(
+            f"SELECT DISTINCT {', '.join(columns)} FROM {linked_table}")
+        rows = (tuple(row) for row in fetch_rows(authcursor))
+        while batch := tuple(islice(rows, INSERT_BATCH_SIZE)):
+            gn3cursor.executemany(
+                f"INSERT IGNORE INTO {table} VALUES "
+                f"({', '.join(['%s'] * len(columns))})",
+                batch)
+
+    with __loaded_lock__:
+        __loaded__.setdefault(gn3conn, {})[table] = generation
+    return table
+
+def join_linked_keys(
+        table: str, data_type: str, columns: tuple[str, ...],
+        join: str = "LEFT JOIN") -> str:
+    """
+    Join the linked keys in `table`, as `lk`, on the query's `columns`, which
+    correspond to the key columns of `data_type`.
+
+    Use the default LEFT JOIN with `lk.SpeciesId IS NULL` to keep the data
+    that is not linked, or an INNER JOIN to keep the data that is.
+    """
+    _linked_table, keys = LINKED_DATA[data_type]
+    assert len(columns) == len(keys), "Expected a column for each key."
+    return f" {join} {table} AS lk ON " + " AND ".join(
+        f"{column}=lk.{key}" for column, key in zip(columns, keys)) + " "
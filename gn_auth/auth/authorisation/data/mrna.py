@@ -1,13 +1,16 @@
 """Handle linking of mRNA Assay data to the Auth(entic|oris)ation system."""
 import uuid
 from dataclasses import asdict
-from typing import Iterable
+from typing import Iterable, Iterator
 from MySQLdb.cursors import DictCursor
 
+from gn_auth.streaming import fetch_rows
 from gn_auth.auth.db import sqlite3 as authdb
 from gn_auth.auth.db import mariadb as gn3db
 
 from gn_auth.auth.authorisation.checks import authorised_p
+from gn_auth.auth.authorisation.data.linked_keys import (
+    join_linked_keys, linked_keys_table)
 from gn_auth.auth.authorisation.resources.groups.models import Group
 
 def linked_mrna_data(conn: authdb.DbConnection) -> Iterable[dict]:
@@ -24,16 +27,17 @@ def linked_mrna_data(conn: authdb.DbConnection) -> Iterable[dict]:
 def ungrouped_mrna_data(# pylint: disable=[too-many-arguments]
         authconn: authdb.DbConnection, gn3conn: gn3db.DbConnection,
         search_query: str, selected: tuple[dict, ...] = tuple(),
-        limit: int = 10000, offset: int = 0) -> tuple[
-            dict, ...]:
-    """Retrieve mrna data that is not linked to any user group."""
-    params = tuple(
+        limit: int = 10000, offset: int = 0) -> Iterator[dict]:
+    """
+    Retrieve mrna data that is not linked to any user group, nor among the
+    `selected` data.
+    """
+    selected_params = tuple(
         (row["SpeciesId"], row["InbredSetId"], row["ProbeFreezeId"],
          row["ProbeSetFreezeId"])
-        for row in linked_mrna_data(authconn)) + tuple(
-                (row["SpeciesId"], row["InbredSetId"], row["ProbeFreezeId"],
-                 row["ProbeSetFreezeId"])
-                for row in selected)
+        for row in selected)
+    columns = ("s.SpeciesId", "iset.InbredSetId", "pf.ProbeFreezeId",
+               "psf.Id")
     query = (
         "SELECT s.SpeciesId, iset.InbredSetId, iset.InbredSetName, "
         "pf.ProbeFreezeId, pf.Name AS StudyName, psf.Id AS ProbeSetFreezeId, "
@@ -42,27 +46,25 @@ def ungrouped_mrna_data(# pylint: disable=[too-many-arguments]
         "FROM Species AS s INNER JOIN InbredSet AS iset "
         "ON s.SpeciesId=iset.SpeciesId INNER JOIN ProbeFreeze AS pf "
         "ON iset.InbredSetId=pf.InbredSetId INNER JOIN ProbeSetFreeze AS psf "
-        "ON pf.ProbeFreezeId=psf.ProbeFreezeId ") + (
-            "WHERE " if (len(params) > 0 or bool(search_query)) else "")
+        "ON pf.ProbeFreezeId=psf.ProbeFreezeId" + join_linked_keys(
+            linked_keys_table(authconn, gn3conn, "mrna"), "mrna", columns) +
+        "WHERE lk.SpeciesId IS NULL ")
+    params = tuple(item for sublist in selected_params for item in sublist)
 
-    if len(params) > 0:
-        paramstr = ", ".join(["(%s, %s, %s, %s)"] * len(params))
-        query = query + (
-            "(s.SpeciesId, iset.InbredSetId, pf.ProbeFreezeId, psf.Id) "
-            f"NOT IN ({paramstr}) "
-            ) + ("AND " if bool(search_query) else "")
+    if len(selected_params) > 0:
+        paramstr = ", ".join(["(%s, %s, %s, %s)"] * len(selected_params))
+        query = query + f"AND ({', '.join(columns)}) NOT IN ({paramstr}) "
 
     if bool(search_query):
         query = query + (
-            "CONCAT(pf.Name, psf.Name, ' ', psf.FullName, ' ', psf.ShortName) "
-            "LIKE %s ")
-        params = params + ((f"%{search_query}%",),)# type: ignore[operator]
+            "AND CONCAT(pf.Name, psf.Name, ' ', psf.FullName, ' ', "
+            "psf.ShortName) LIKE %s ")
+        params = params + (f"%{search_query}%",)
 
     query = query + f"LIMIT {int(limit)} OFFSET {int(offset)}"
     with gn3conn.cursor(DictCursor) as cursor:
-        cursor.execute(
-            query, tuple(item for sublist in params for item in sublist))
-        return tuple(row for row in cursor.fetchall())
+        cursor.execute(query, params)
+        yield from fetch_rows(cursor)
 
 @authorised_p(
     ("system:data:link-to-group",),
@@ -73,8 +75,19 @@ def ungrouped_mrna_data(# pylint: disable=[too-many-arguments]
 def link_mrna_data(
         conn: authdb.DbConnection, group: Group, datasets: dict) -> dict:
     """Link genotye `datasets` to `group`."""
-    with authdb.cursor(conn) as cursor:
-        cursor.executemany(
+    params = tuple({
+        "data_link_id": str(uuid.uuid4()),
+        "group_id": str(group.group_id),
+        **{
+            key: value for key,value in dataset.items() if key in (
+                "SpeciesId", "InbredSetId", "ProbeFreezeId",
+                "ProbeSetFreezeId", "dataset_fullname", "dataset_name",
+                "dataset_shortname")
+        }
+    } for dataset in datasets)
+    authdb.transaction(
+        conn,
+        lambda cursor: cursor.executemany(
             "INSERT INTO linked_mrna_data VALUES "
             "(:data_link_id, :group_id, :SpeciesId, :InbredSetId, "
             ":ProbeFreezeId, :ProbeSetFreezeId, :dataset_name, "
@@ -82,20 +95,12 @@ def link_mrna_data(
             "ON CONFLICT "
             "(SpeciesId, InbredSetId, ProbeFreezeId, ProbeSetFreezeId) "
             "DO NOTHING",
-            tuple({
-                "data_link_id": str(uuid.uuid4()),
-                "group_id": str(group.group_id),
-                **{
-                    key: value for key,value in dataset.items() if key in (
-                        "SpeciesId", "InbredSetId", "ProbeFreezeId",
-                        "ProbeSetFreezeId", "dataset_fullname", "dataset_name",
-                        "dataset_shortname")
-                }
-            } for dataset in datasets))
-        return {
-            "description": (
-                f"Successfully linked {len(datasets)} to group "
-                f"'{group.group_name}'."),
-            "group": asdict(group),
-            "datasets": datasets
-        }
+            params),
+        "link_mrna_data")
+    return {
+        "description": (
+            f"Successfully linked {len(datasets)} to group "
+            f"'{group.group_name}'."),
+        "group": asdict(group),
+        "datasets": datasets
+    }
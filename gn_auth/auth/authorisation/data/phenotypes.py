@@ -1,7 +1,7 @@
 """Handle linking of Phenotype data to the Auth(entic|oris)ation system."""
 import uuid
 from dataclasses import asdict
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
 
 from MySQLdb.cursors import DictCursor
 
@@ -9,44 +9,90 @@ from gn_auth.auth.db import sqlite3 as authdb
 from gn_auth.auth.db import mariadb as gn3db
 
 from gn_auth.auth.authorisation.checks import authorised_p
+from gn_auth.auth.authorisation.data.linked_keys import (
+    join_linked_keys, linked_keys_table)
 from gn_auth.auth.authorisation.resources.groups.models import Group
 
 def linked_phenotype_data(
         authconn: authdb.DbConnection, gn3conn: gn3db.DbConnection,
         species: str = "") -> Iterable[dict[str, Any]]:
     """Retrieve phenotype data linked to user groups."""
-    authkeys = ("SpeciesId", "InbredSetId", "PublishFreezeId", "PublishXRefId")
-    with (authdb.cursor(authconn) as authcursor,
-          gn3conn.cursor(DictCursor) as gn3cursor):
-        authcursor.execute("SELECT * FROM linked_phenotype_data")
-        linked = tuple(tuple(row[key] for key in authkeys)
-                       for row in authcursor.fetchall())
-        if len(linked) <= 0:
-            return iter(())
-        paramstr = ", ".join(["(%s, %s, %s, %s)"] * len(linked))
-        query = (
-            "SELECT spc.SpeciesId, spc.Name AS SpeciesName, iset.InbredSetId, "
-            "iset.InbredSetName, pf.Id AS PublishFreezeId, "
-            "pf.Name AS dataset_name, pf.FullName AS dataset_fullname, "
-            "pf.ShortName AS dataset_shortname, pxr.Id AS PublishXRefId "
-            "FROM "
-            "Species AS spc "
-            "INNER JOIN InbredSet AS iset "
-            "ON spc.SpeciesId=iset.SpeciesId "
-            "INNER JOIN PublishFreeze AS pf "
-            "ON iset.InbredSetId=pf.InbredSetId "
-            "INNER JOIN PublishXRef AS pxr "
-            "ON pf.InbredSetId=pxr.InbredSetId") + (
-                " WHERE" if (len(linked) > 0 or bool(species)) else "") + (
-                    (" (spc.SpeciesId, iset.InbredSetId, pf.Id, pxr.Id) "
-                     f"IN ({paramstr})") if len(linked) > 0 else "") + (
-                        " AND"if len(linked) > 0 else "") + (
-                        " spc.SpeciesName=%s" if bool(species) else "")
-        params = tuple(item for sublist in linked for item in sublist) + (
-            (species,) if bool(species) else tuple())
-        gn3cursor.execute(query, params)
+    query = (
+        "SELECT spc.SpeciesId, spc.Name AS SpeciesName, iset.InbredSetId, "
+        "iset.InbredSetName, pf.Id AS PublishFreezeId, "
+        "pf.Name AS dataset_name, pf.FullName AS dataset_fullname, "
+        "pf.ShortName AS dataset_shortname, pxr.Id AS PublishXRefId "
+        "FROM "
+        "Species AS spc "
+        "INNER JOIN InbredSet AS iset "
+        "ON spc.SpeciesId=iset.SpeciesId "
+        "INNER JOIN PublishFreeze AS pf "
+        "ON iset.InbredSetId=pf.InbredSetId "
+        "INNER JOIN PublishXRef AS pxr "
+        "ON pf.InbredSetId=pxr.InbredSetId" + join_linked_keys(
+            linked_keys_table(authconn, gn3conn, "phenotype"), "phenotype",
+            ("spc.SpeciesId", "iset.InbredSetId", "pf.Id", "pxr.Id"),
+            join="INNER JOIN")) + (
+                "WHERE spc.SpeciesName=%s" if bool(species) else "")
+    with gn3conn.cursor(DictCursor) as gn3cursor:
+        gn3cursor.execute(query, (species,) if bool(species) else tuple())
         return (item for item in gn3cursor.fetchall())
 
+def __index_search_keys__(
+        authcursor: authdb.DbCursor, gn3conn: gn3db.DbConnection):
+    """Index the search keys of the linked phenotypes that are not yet indexed."""
+    authcursor.execute(
+        "SELECT lpd.data_link_id, lpd.InbredSetId, lpd.dataset_name, "
+        "lpd.PublishXRefId FROM linked_phenotype_data AS lpd "
+        "LEFT JOIN linked_phenotype_search_index AS lpsi "
+        "ON lpd.data_link_id=lpsi.data_link_id "
+        "WHERE lpsi.data_link_id IS NULL AND lpd.dataset_name IS NOT NULL")
+    unindexed = authcursor.fetchall()
+    if len(unindexed) == 0:
+        return
+
+    # Only the species and group names need to come from GN3, and there are
+    # far fewer groups than there are traits.
+    group_ids = tuple(sorted({str(row["InbredSetId"]) for row in unindexed}))
+    with gn3conn.cursor(DictCursor) as gn3cursor:
+        gn3cursor.execute(
+            "SELECT iset.InbredSetId, spc.Name AS SpeciesName, "
+            "iset.InbredSetName FROM Species AS spc "
+            "INNER JOIN InbredSet AS iset ON spc.SpeciesId=iset.SpeciesId "
+            f"WHERE iset.InbredSetId IN ({', '.join(['%s'] * len(group_ids))})",
+            group_ids)
+        names = {
+            str(row["InbredSetId"]): (row["SpeciesName"], row["InbredSetName"])
+            for row in gn3cursor.fetchall()
+        }
+
+    authcursor.executemany(
+        "INSERT OR IGNORE INTO linked_phenotype_search_index("
+        "species_name, group_name, dataset_name, trait_name, data_link_id) "
+        "VALUES (?, ?, ?, ?, ?)",
+        ((*names[str(row["InbredSetId"])], row["dataset_name"],
+          str(row["PublishXRefId"]), row["data_link_id"])
+         for row in unindexed if str(row["InbredSetId"]) in names))
+
+def linked_phenotype_keys(
+        authconn: authdb.DbConnection, gn3conn: gn3db.DbConnection,
+        species: str) -> frozenset[tuple[str, str, str, str]]:
+    """
+    Retrieve the (species, group, dataset, trait) keys of the phenotypes of
+    `species` that are linked to user groups, as phenotype search results are
+    keyed.
+
+    The keys are read from an index in the auth database, which only needs the
+    traits linked since it was last read to be looked up in GN3.
+    """
+    with authdb.cursor(authconn) as cursor:
+        __index_search_keys__(cursor, gn3conn)
+        cursor.execute(
+            "SELECT species_name, group_name, dataset_name, trait_name "
+            "FROM linked_phenotype_search_index WHERE species_name=?",
+            (species,))
+        return frozenset(tuple(row) for row in cursor.fetchall())
+
 @authorised_p(("system:data:link-to-group",),
               error_description=(
                   "You do not have sufficient privileges to link data to (a) "
@@ -55,13 +101,8 @@ def linked_phenotype_data(
 def ungrouped_phenotype_data(
         authconn: authdb.DbConnection, gn3conn: gn3db.DbConnection):
     """Retrieve phenotype data that is not linked to any user group."""
-    with gn3conn.cursor() as cursor:
-        params = tuple(
-            (row["SpeciesId"], row["InbredSetId"], row["PublishFreezeId"],
-             row["PublishXRefId"])
-            for row in linked_phenotype_data(authconn, gn3conn))
-        paramstr = ", ".join(["(?, ?, ?, ?)"] * len(params))
-        query = (
+    with gn3conn.cursor(DictCursor) as cursor:
+        cursor.execute(
             "SELECT spc.SpeciesId, spc.SpeciesName, iset.InbredSetId, "
             "iset.InbredSetName, pf.Id AS PublishFreezeId, "
             "pf.Name AS dataset_name, pf.FullName AS dataset_fullname, "
@@ -73,42 +114,32 @@ def ungrouped_phenotype_data(
             "INNER JOIN PublishFreeze AS pf "
             "ON iset.InbredSetId=pf.InbredSetId "
             "INNER JOIN PublishXRef AS pxr "
-            "ON pf.InbredSetId=pxr.InbredSetId")
-        if len(params) > 0:
-            query = query + (
-                f" WHERE (iset.InbredSetId, pf.Id, pxr.Id) NOT IN ({paramstr})")
-
-        cursor.execute(query, params)
+            "ON pf.InbredSetId=pxr.InbredSetId" + join_linked_keys(
+                linked_keys_table(authconn, gn3conn, "phenotype"),
+                "phenotype",
+                ("spc.SpeciesId", "iset.InbredSetId", "pf.Id", "pxr.Id")) +
+            "WHERE lk.SpeciesId IS NULL")
         return tuple(dict(row) for row in cursor.fetchall())
 
-    return tuple()
-
-def __traits__(gn3conn: gn3db.DbConnection, params: tuple[dict, ...]) -> tuple[dict, ...]:
+def __traits__(sql_uri: str, params: tuple[dict, ...]) -> Iterator[dict]:
     """An internal utility function. Don't use outside of this module."""
-    if len(params) < 1:
-        return tuple()
-    paramstr = ", ".join(["(%s, %s, %s, %s)"] * len(params))
-    with gn3conn.cursor(DictCursor) as cursor:
-        cursor.execute(
-            "SELECT spc.SpeciesId, iset.InbredSetId, pf.Id AS PublishFreezeId, "
-            "pf.Name AS dataset_name, pf.FullName AS dataset_fullname, "
-            "pf.ShortName AS dataset_shortname, pxr.Id AS PublishXRefId "
-            "FROM "
-            "Species AS spc "
-            "INNER JOIN InbredSet AS iset "
-            "ON spc.SpeciesId=iset.SpeciesId "
-            "INNER JOIN PublishFreeze AS pf "
-            "ON iset.InbredSetId=pf.InbredSetId "
-            "INNER JOIN PublishXRef AS pxr "
-            "ON pf.InbredSetId=pxr.InbredSetId "
-            "WHERE (spc.SpeciesName, iset.InbredSetName, pf.Name, pxr.Id) "
-            f"IN ({paramstr})",
-            tuple(
-                itm for sublist in (
-                    (item["species"], item["group"], item["dataset"], item["name"])
-                    for item in params)
-                for itm in sublist))
-        return cursor.fetchall()
+    return gn3db.query_in_chunks(
+        sql_uri,
+        "SELECT spc.SpeciesId, iset.InbredSetId, pf.Id AS PublishFreezeId, "
+        "pf.Name AS dataset_name, pf.FullName AS dataset_fullname, "
+        "pf.ShortName AS dataset_shortname, pxr.Id AS PublishXRefId "
+        "FROM "
+        "Species AS spc "
+        "INNER JOIN InbredSet AS iset "
+        "ON spc.SpeciesId=iset.SpeciesId "
+        "INNER JOIN PublishFreeze AS pf "
+        "ON iset.InbredSetId=pf.InbredSetId "
+        "INNER JOIN PublishXRef AS pxr "
+        "ON pf.InbredSetId=pxr.InbredSetId "
+        "WHERE (spc.SpeciesName, iset.InbredSetName, pf.Name, pxr.Id) "
+        "IN ({keys})",
+        tuple((item["species"], item["group"], item["dataset"], item["name"])
+              for item in params))
 
 @authorised_p(("system:data:link-to-group",),
               error_description=(
@@ -116,26 +147,31 @@ def __traits__(gn3conn: gn3db.DbConnection, params: tuple[dict, ...]) -> tuple[d
                   "group(s)."),
               oauth2_scope="profile group resource")
 def link_phenotype_data(
-        authconn:authdb.DbConnection, gn3conn: gn3db.DbConnection, group: Group,
+        authconn:authdb.DbConnection, sql_uri: str, group: Group,
         traits: tuple[dict, ...]) -> dict:
-    """Link phenotype traits to a user group."""
-    with authdb.cursor(authconn) as cursor:
-        params = tuple({
-            "data_link_id": str(uuid.uuid4()),
-            "group_id": str(group.group_id),
-            **item
-        } for item in __traits__(gn3conn, traits))
-        cursor.executemany(
+    """
+    Link phenotype traits to a user group, looking the traits up in the GN3
+    database at `sql_uri`.
+    """
+    params = tuple({
+        "data_link_id": str(uuid.uuid4()),
+        "group_id": str(group.group_id),
+        **item
+    } for item in __traits__(sql_uri, traits))
+    authdb.transaction(
+        authconn,
+        lambda cursor: cursor.executemany(
             "INSERT INTO linked_phenotype_data "
             "VALUES ("
             ":data_link_id, :group_id, :SpeciesId, :InbredSetId, "
             ":PublishFreezeId, :dataset_name, :dataset_fullname, "
             ":dataset_shortname, :PublishXRefId"
             ")",
-            params)
-        return {
-            "description": (
-                f"Successfully linked {len(traits)} traits to group."),
-            "group": asdict(group),
-            "traits": params
-        }
+            params),
+        "link_phenotype_data")
+    return {
+        "description": (
+            f"Successfully linked {len(traits)} traits to group."),
+        "group": asdict(group),
+        "traits": params
+    }
@@ -6,28 +6,29 @@ from dataclasses import asdict
 from typing import Any
 from functools import partial
 
-import redis
 from MySQLdb.cursors import DictCursor
 from authlib.integrations.flask_oauth2.errors import _HTTPException
 from flask import request, jsonify, Response, Blueprint, current_app as app
 
 from gn_auth import jobs
+from gn_auth.streaming import json_response
 from gn_auth.commands import run_async_cmd
 
 from gn_auth.auth.authorisation.resources.groups.models import group_by_id
 
 from ...db import sqlite3 as db
+from ...db import redis as rdb
 from ...db import mariadb as gn3db
 from ...db.sqlite3 import with_db_connection
 
 from ..checks import require_json
 from ..errors import InvalidData, NotFoundError
 
-from ..users.models import user_resource_roles
+from ..privileges import cached_user_privileges
 
 from ..resources.checks import authorised_for
-from ..resources.models import (
-    user_resources, public_resources, attach_resources_data)
+from ..resources.data import data_resources
+from ..resources.models import user_resources_among
 
 from ...authentication.users import User
 from ...authentication.oauth2.resource_server import require_oauth
@@ -76,7 +77,7 @@ def list_species() -> Response:
 
 @data.route("/authorisation", methods=["POST"])
 @require_json
-def authorisation() -> Response:
+def authorisation() -> Response:# pylint: disable=[too-many-locals]
     """Retrieve the authorisation level for datasets/traits for the user."""
     # Access endpoint with something like:
     # curl -X POST http://127.0.0.1:8080/api/oauth2/data/authorisation \
@@ -84,104 +85,103 @@ def authorisation() -> Response:
     #    -d '{"traits": ["HC_M2_0606_P::1442370_at", "BXDGeno::01.001.695",
     #        "BXDPublish::10001"]}'
     db_uri = app.config["AUTH_DB"]
-    privileges = {}
     user = User(uuid.uuid4(), "anon@ymous.user", "Anonymous User")
+    authenticated = False
+    try:
+        with require_oauth.acquire("profile group resource") as _token:
+            user = _token.user
+            authenticated = True
+    except _HTTPException as exc:
+        err_msg = json.loads(exc.body)
+        if err_msg["error"] != "missing_authorization":
+            raise exc from None
+
+    def __translate__(val):
+        return {
+            "Temp": "Temp",
+            "ProbeSet": "mRNA",
+            "Geno": "Genotype",
+            "Publish": "Phenotype"
+        }[val]
+
+    def __trait_key__(trait):
+        dataset_type = __translate__(trait['db']['dataset_type']).lower()
+        dataset_name = trait["db"]["dataset_name"]
+        if dataset_type == "phenotype":
+            return (dataset_type, dataset_name, trait['trait_name'])
+        return (dataset_type, dataset_name, "")
+
+    args = request.get_json()
+    traits = tuple(
+        build_trait_name(trait_fullname)
+        for trait_fullname in args["traits"]) # type: ignore[index]
     with db.connection(db_uri) as auth_conn:
-        try:
-            with require_oauth.acquire("profile group resource") as _token:
-                user = _token.user
-                resources = attach_resources_data(
-                    auth_conn, user_resources(auth_conn, _token.user))
-                resources_roles = user_resource_roles(auth_conn, _token.user)
-                privileges = {
-                    resource_id: tuple(
-                        privilege.privilege_id
-                        for roles in resources_roles[resource_id]
-                        for privilege in roles.privileges)#("group:resource:view-resource",)
+        linked = data_resources(
+            auth_conn, set(__trait_key__(trait) for trait in traits))
+        resources = {
+            resource.resource_id: resource
+            for resource in user_resources_among(
+                auth_conn, user, set(
+                    resource_id
+                    for resource_ids in linked.values()
+                    for resource_id in resource_ids))
+        }
+        data_to_resource_map = {
+            key: resource_id
+            for key, resource_ids in linked.items()
+            for resource_id in resource_ids
+            if resource_id in resources
+        }
+        privileges: dict[uuid.UUID, tuple[str, ...]] = {
+            resource_id: ("system:resource:public-read",)
+            for resource_id, resource in resources.items() if resource.public
+        }
+        if authenticated and len(resources) > 0:
+            user_privileges = cached_user_privileges(auth_conn, user)
+            privileges = {
+                **privileges,
+                **{
+                    resource_id: tuple(sorted(
+                        user_privileges.resource_privilege_ids(resource_id)))
                     for resource_id, is_authorised
                     in authorised_for(
-                        auth_conn, _token.user,
-                        ("group:resource:view-resource",), tuple(
-                            resource.resource_id for resource in resources)).items()
+                        auth_conn, user, ("group:resource:view-resource",),
+                        tuple(resources.keys())).items()
                     if is_authorised
                 }
-        except _HTTPException as exc:
-            err_msg = json.loads(exc.body)
-            if err_msg["error"] == "missing_authorization":
-                resources = attach_resources_data(
-                    auth_conn, public_resources(auth_conn))
-            else:
-                raise exc from None
-
-        def __gen_key__(resource, data_item):
-            if resource.resource_category.resource_category_key.lower() == "phenotype":
-                return (
-                    f"{resource.resource_category.resource_category_key.lower()}::"
-                    f"{data_item['dataset_name']}::{data_item['PublishXRefId']}")
-            return (
-                f"{resource.resource_category.resource_category_key.lower()}::"
-                f"{data_item['dataset_name']}")
-
-        data_to_resource_map = {
-            __gen_key__(resource, data_item): resource.resource_id
-            for resource in resources
-            for data_item in resource.resource_data
-        }
-        privileges = {
-            **{
-                resource.resource_id: ("system:resource:public-read",)
-                for resource in resources if resource.public
-            },
-            **privileges}
-
-        args = request.get_json()
-        traits_names = args["traits"] # type: ignore[index]
-        def __translate__(val):
-            return {
-                "Temp": "Temp",
-                "ProbeSet": "mRNA",
-                "Geno": "Genotype",
-                "Publish": "Phenotype"
-            }[val]
-
-        def __trait_key__(trait):
-            dataset_type = __translate__(trait['db']['dataset_type']).lower()
-            dataset_name = trait["db"]["dataset_name"]
-            if dataset_type == "phenotype":
-                return f"{dataset_type}::{dataset_name}::{trait['trait_name']}"
-            return f"{dataset_type}::{dataset_name}"
-
-        return jsonify(tuple(
-            {
-                "user": asdict(user),
-                **{key:trait[key] for key in ("trait_fullname", "trait_name")},
-                "dataset_name": trait["db"]["dataset_name"],
-                "dataset_type": __translate__(trait["db"]["dataset_type"]),
-                "resource_id": data_to_resource_map.get(__trait_key__(trait)),
-                "privileges": privileges.get(
-                    data_to_resource_map.get(
-                        __trait_key__(trait),
-                        uuid.UUID("4afa415e-94cb-4189-b2c6-f9ce2b6a878d")),
-                    tuple()) + (
-                        # Temporary traits do not exist in db: Set them
-                        # as public-read
-                        ("system:resource:public-read",)
-                        if trait["db"]["dataset_type"] == "Temp"
-                        else tuple())
-            } for trait in
-            (build_trait_name(trait_fullname)
-             for trait_fullname in traits_names)))
+            }
+
+    return jsonify(tuple(
+        {
+            "user": asdict(user),
+            **{key:trait[key] for key in ("trait_fullname", "trait_name")},
+            "dataset_name": trait["db"]["dataset_name"],
+            "dataset_type": __translate__(trait["db"]["dataset_type"]),
+            "resource_id": data_to_resource_map.get(__trait_key__(trait)),
+            "privileges": privileges.get(
+                data_to_resource_map.get(
+                    __trait_key__(trait),
+                    uuid.UUID("4afa415e-94cb-4189-b2c6-f9ce2b6a878d")),
+                tuple()) + (
+                    # Temporary traits do not exist in db: Set them
+                    # as public-read
+                    ("system:resource:public-read",)
+                    if trait["db"]["dataset_type"] == "Temp"
+                    else tuple())
+        } for trait in traits))
 
 def __search_mrna__():
     query = __request_key__("query", "")
     limit = int(__request_key__("limit", 10000))
     offset = int(__request_key__("offset", 0))
-    with gn3db.database_connection(app.config["SQL_URI"]) as gn3conn:
-        __ungrouped__ = partial(
-            ungrouped_mrna_data, gn3conn=gn3conn, search_query=query,
-            selected=__request_key_list__("selected"),
-            limit=limit, offset=offset)
-        return jsonify(with_db_connection(__ungrouped__))
+    selected = __request_key_list__("selected")
+    def __ungrouped__():
+        with (db.connection(app.config["AUTH_DB"]) as authconn,
+              gn3db.database_connection(app.config["SQL_URI"]) as gn3conn):
+            yield from ungrouped_mrna_data(
+                authconn, gn3conn, search_query=query, selected=selected,
+                limit=limit, offset=offset)
+    return json_response(__ungrouped__())
 
 def __request_key__(key: str, default: Any = ""):
     if bool(request.json):
@@ -201,17 +201,19 @@ def __search_genotypes__():
     query = __request_key__("query", "")
     limit = int(__request_key__("limit", 10000))
     offset = int(__request_key__("offset", 0))
-    with gn3db.database_connection(app.config["SQL_URI"]) as gn3conn:
-        __ungrouped__ = partial(
-            ungrouped_genotype_data, gn3conn=gn3conn, search_query=query,
-            selected=__request_key_list__("selected"),
-            limit=limit, offset=offset)
-        return jsonify(with_db_connection(__ungrouped__))
+    selected = __request_key_list__("selected")
+    def __ungrouped__():
+        with (db.connection(app.config["AUTH_DB"]) as authconn,
+              gn3db.database_connection(app.config["SQL_URI"]) as gn3conn):
+            yield from ungrouped_genotype_data(
+                authconn, gn3conn, search_query=query, selected=selected,
+                limit=limit, offset=offset)
+    return json_response(__ungrouped__())
 
 def __search_phenotypes__():
     # launch the external process to search for phenotypes
     redisuri = app.config["REDIS_URI"]
-    with redis.Redis.from_url(redisuri, decode_responses=True) as redisconn:
+    with rdb.connection(redisuri) as redisconn:
         job_id = uuid.uuid4()
         selected = __request_key__("selected_traits", [])
         command =[
@@ -227,8 +229,7 @@ def __search_phenotypes__():
                 [f"--selected={json.dumps(selected)}"]
                 if len(selected) > 0 else [])
         jobs.create_job(redisconn, {
-            "job_id": job_id, "command": command, "status": "queued",
-            "search_results": tuple()})
+            "job_id": job_id, "command": command, "status": "queued"})
         return jsonify({
             "job_id": job_id,
             "command_id": run_async_cmd(
@@ -254,9 +255,39 @@ def pheno_search_results(job_id: uuid.UUID) -> Response:
     def __search_error__(err):
         raise NotFoundError(err["error_description"])
     redisuri = app.config["REDIS_URI"]
-    with redis.Redis.from_url(redisuri, decode_responses=True) as redisconn:
+    with rdb.connection(redisuri) as redisconn:
         return jobs.job(redisconn, job_id).either(
-            __search_error__, jsonify)
+            __search_error__,
+            lambda job: jsonify({
+                **job, "search_results": jobs.job_results(redisconn, job_id)
+            }))
+
+@data.route("/search/phenotype/<uuid:job_id>/results", methods=["GET"])
+def pheno_search_results_from(job_id: uuid.UUID) -> Response:
+    """
+    Get the search results from the `offset`-th result onwards, so that a
+    client polling a running search only downloads the results that are new
+    since it last polled: at the 'next_offset' of the previous response.
+    """
+    try:
+        offset = int(request.args.get("offset", "0"), base=10)
+    except ValueError as _verr:
+        raise InvalidData("Expected an integer 'offset'.") from _verr
+    if offset < 0:
+        raise InvalidData("Expected a non-negative 'offset'.")
+    redisuri = app.config["REDIS_URI"]
+    with rdb.connection(redisuri) as redisconn:
+        status = redisconn.hget(jobs.job_key(job_id), "status")
+        if status is None:
+            raise NotFoundError(f"Job '{job_id}' was not found.")
+        results = jobs.job_results(redisconn, job_id, offset)
+        return jsonify({
+            "job_id": job_id,
+            "status": json.loads(status),
+            "offset": offset,
+            "next_offset": offset + len(results),
+            "search_results": results
+        })
 
 @data.route("/link/genotype", methods=["POST"])
 def link_genotypes() -> Response:
@@ -327,11 +358,10 @@ def link_phenotype() -> Response:
             "traits": form["selected"]
         }
 
-    with gn3db.database_connection(app.config["SQL_URI"]) as gn3conn:
-        def __link__(conn: db.DbConnection, group_id: uuid.UUID,
-                     traits: tuple[dict, ...]) -> dict:
-            return link_phenotype_data(
-                conn, gn3conn, group_by_id(conn, group_id), traits)
+    def __link__(conn: db.DbConnection, group_id: uuid.UUID,
+                 traits: tuple[dict, ...]) -> dict:
+        return link_phenotype_data(
+            conn, app.config["SQL_URI"], group_by_id(conn, group_id), traits)
 
-        return jsonify(with_db_connection(
-            partial(__link__, **__values__(request.json))))
+    return jsonify(with_db_connection(
+        partial(__link__, **__values__(request.json))))
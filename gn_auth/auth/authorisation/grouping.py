@@ -0,0 +1,25 @@
+"""
+Group rows and other items by a key in a single pass over them.
+
+Folding rows into a dictionary with `reduce` and `{**acc, key: ...}` copies
+the whole dictionary for every row; these helpers build each group in place.
+"""
+from typing import Any, Callable, Hashable, Iterable
+
+def __identity__(item: Any) -> Any:
+    return item
+
+def group_by(
+        items: Iterable[Any],
+        key: Callable[[Any], Hashable],
+        value: Callable[[Any], Any] = __identity__) -> dict[Any, tuple]:
+    """
+    Group `items` by their `key`, keeping the `value` of each item.
+
+    Groups are ordered by the first appearance of their key, and the values in
+    each group keep the order of the items.
+    """
+    groups: dict[Any, list] = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(value(item))
+    return {group_key: tuple(values) for group_key, values in groups.items()}
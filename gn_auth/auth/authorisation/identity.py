@@ -0,0 +1,56 @@
+"""
+Facts about the users acting in a request, e.g. their privileges and group,
+loaded at most once per request rather than once per check.
+"""
+from typing import Any, Callable
+
+from flask import g, has_request_context
+
+from ..db import sqlite3 as db
+from ..authentication.users import User
+
+from . import privileges as auth_privs
+
+def identity_fact(user: User, fact: str, load: Callable[[], Any]) -> Any:
+    """
+    Retrieve `fact` about `user`, calling `load` to fetch it only the first
+    time it is needed in the request.
+
+    Facts are fetched afresh once anything is written to the auth database
+    during the request, and are not kept at all outside of a request.
+    """
+    if not has_request_context():
+        return load()
+
+    changes = db.changes_made()
+    identities = g.get("identities")
+    if identities is None or identities["changes"] != changes:
+        identities = {"changes": changes, "users": {}}
+        g.identities = identities
+
+    facts = identities["users"].setdefault(user.user_id, {})
+    if fact not in facts:
+        facts[fact] = load()
+    return facts[fact]
+
+def clear_identities(_exc=None) -> None:
+    """Forget all facts loaded during the request."""
+    g.pop("identities", None)
+
+def user_privilege_ids(conn: db.DbConnection, user: User) -> frozenset[str]:
+    """The IDs of all the privileges granted to `user` by any of their roles."""
+    return identity_fact(
+        user,
+        "privilege_ids",
+        lambda: auth_privs.cached_user_privileges(conn, user).privilege_ids)
+
+def user_role_names(conn: db.DbConnection, user: User) -> frozenset[str]:
+    """The names of all the roles assigned to `user`."""
+    def __load__():
+        with db.cursor(conn) as cursor:
+            cursor.execute(
+                ("SELECT roles.role_name FROM user_roles LEFT JOIN roles "
+                 "ON user_roles.role_id = roles.role_id WHERE user_id = ?"),
+                (str(user.user_id),))
+            return frozenset(row[0] for row in cursor.fetchall())
+    return identity_fact(user, "role_names", __load__)
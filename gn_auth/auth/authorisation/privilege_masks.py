@@ -0,0 +1,85 @@
+"""
+Represent sets of privileges as integer bit masks, so that checking whether a
+user holds a set of privileges is a bitwise AND rather than string compares.
+"""
+import threading
+from uuid import UUID
+from dataclasses import dataclass
+from typing import Iterable, Hashable, Optional
+
+from ..db import sqlite3 as db
+
+@dataclass(frozen=True)
+class PrivilegeMasks:
+    """
+    The bit for each privilege, and the mask of privileges for each role.
+
+    Bits are assigned in the sorted order of the privilege IDs, so they are
+    the same in every process for the same set of privileges.
+    """
+    bits: dict[str, int]
+    roles: dict[UUID, int]
+
+    def mask(self, privilege_ids: Iterable[str]) -> Optional[int]:
+        """
+        The mask for `privilege_ids`, or `None` if any of them is unknown,
+        since nobody can hold a privilege that does not exist.
+        """
+        mask = 0
+        for privilege_id in privilege_ids:
+            bit = self.bits.get(privilege_id)
+            if bit is None:
+                return None
+            mask = mask | bit
+        return mask
+
+    def role_mask(self, role_id: UUID) -> int:
+        """The mask of the privileges granted by the role."""
+        return self.roles.get(role_id, 0)
+
+    def privilege_ids(self, mask: int) -> frozenset[str]:
+        """The IDs of the privileges in `mask`."""
+        return frozenset(
+            privilege_id for privilege_id, bit in self.bits.items()
+            if mask & bit)
+
+
+def has_all(held: int, required: Optional[int]) -> bool:
+    """Check whether the `held` mask includes every bit in `required`."""
+    return bool(required) and (held & required) == required # type: ignore[operator]
+
+
+def load_privilege_masks(conn: db.DbConnection) -> PrivilegeMasks:
+    """Compute the privilege bits and role masks from the database."""
+    with db.cursor(conn) as cursor:
+        cursor.execute(
+            "SELECT privilege_id FROM privileges ORDER BY privilege_id")
+        bits = {
+            row[0]: 1 << index for index, row in enumerate(cursor.fetchall())}
+        cursor.execute("SELECT role_id, privilege_id FROM role_privileges")
+        roles: dict[UUID, int] = {}
+        for row in cursor.fetchall():
+            role_id = UUID(row[0])
+            roles[role_id] = roles.get(role_id, 0) | bits.get(row[1], 0)
+
+    return PrivilegeMasks(bits, roles)
+
+
+__masks__: dict[str, tuple[Hashable, PrivilegeMasks]] = {}
+__masks_lock__ = threading.Lock()
+
+def privilege_masks(
+        conn: db.DbConnection, generation: Hashable) -> PrivilegeMasks:
+    """
+    Retrieve the privilege masks, computing them again only when the
+    authorisation `generation` has changed since they were last computed.
+    """
+    with __masks_lock__:
+        cached = __masks__.get("masks")
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+
+    masks = load_privilege_masks(conn)
+    with __masks_lock__:
+        __masks__["masks"] = (generation, masks)
+    return masks
@@ -1,10 +1,21 @@
 """Handle privileges"""
+import threading
+from uuid import UUID
 from dataclasses import dataclass
-from typing import Iterable
+from functools import cached_property
+from typing import Iterable, Optional
+
+from flask import g, current_app, has_app_context, has_request_context
+
+from gn_auth import settings
+from gn_auth.caching import TTLCache
 
 from ..db import sqlite3 as db
 from ..authentication.users import User
 
+from .resources.base import Resource, ResourceCategory
+from .privilege_masks import PrivilegeMasks, privilege_masks
+
 
 @dataclass(frozen=True)
 class Privilege:
@@ -35,10 +46,189 @@ def privileges_by_ids(
         return tuple()
 
     with db.cursor(conn) as cursor:
-        clause = ", ".join(["?"] * len(privileges_ids))
         cursor.execute(
-            f"SELECT * FROM privileges WHERE privilege_id IN ({clause})",
-            privileges_ids)
+            f"SELECT * FROM privileges WHERE privilege_id IN ({db.VALUES_IN})",
+            (db.json_values(privileges_ids),))
         return tuple(
             Privilege(row["privilege_id"], row["privilege_description"])
             for row in cursor.fetchall())
+
+
+# The database the generation applies to, and the generation itself.
+Generation = tuple[str, int]
+
+
+@dataclass(frozen=True)
+class PublicResources:
+    """
+    The public resources, and the 'public-view' role that every user holds,
+    implicitly, on each of them, as of the 'public-resources' `generation`.
+    """
+    generation: Generation
+    role_id: Optional[UUID]
+    resources: tuple[Resource, ...]
+    resource_ids: frozenset[UUID]
+
+
+@dataclass(frozen=True)
+class UserPrivileges:
+    """
+    The privileges a user holds through all their roles: overall, and on each
+    resource. Valid for as long as the authorisation generation is unchanged.
+    """
+    generation: Generation
+    masks: PrivilegeMasks
+    mask: int
+    by_resource: dict[UUID, int]
+    public: PublicResources
+
+    @cached_property
+    def privilege_ids(self) -> frozenset[str]:
+        """The IDs of all the privileges the user holds, on any resource."""
+        return self.masks.privilege_ids(self.mask)
+
+    def resource_mask(self, resource_id: UUID) -> int:
+        """The mask of the privileges the user holds on the resource."""
+        mask = self.by_resource.get(resource_id, 0)
+        if resource_id in self.public.resource_ids:
+            return mask | self.masks.role_mask(
+                self.public.role_id) # type: ignore[arg-type]
+        return mask
+
+    def resource_privilege_ids(self, resource_id: UUID) -> frozenset[str]:
+        """The IDs of all the privileges the user holds on the resource."""
+        return self.masks.privilege_ids(self.resource_mask(resource_id))
+
+
+def authorisation_generation(
+        conn: db.DbConnection,
+        generation_key: str = "authorisation") -> Generation:
+    """
+    The current authorisation generation for `generation_key`.
+
+    Triggers on the tables that decide who may do what bump the
+    'authorisation' generation on every change, so anything computed from
+    those tables remains valid for as long as the generation is unchanged.
+    Other keys track narrower changes, e.g. 'public-resources' changes only
+    when the set of public resources does.
+
+    The generation is read at most once per request, or again after the
+    request writes to the database.
+    """
+    def __read__():
+        with db.cursor(conn) as cursor:
+            cursor.execute(
+                "SELECT (SELECT file FROM pragma_database_list "
+                "WHERE name='main'), generation "
+                "FROM authorisation_generation "
+                "WHERE generation_key=?",
+                (generation_key,))
+            row = cursor.fetchone()
+            return (row[0], row[1])
+
+    if not has_request_context():
+        return __read__()
+
+    changes = db.changes_made()
+    generations = g.setdefault("authorisation_generations", {})
+    cached = generations.get(generation_key)
+    if cached is None or cached[0] != changes:
+        cached = (changes, __read__())
+        generations[generation_key] = cached
+    return cached[1]
+
+
+__public__: dict[str, PublicResources] = {}
+__public_lock__ = threading.Lock()
+
+def public_resources_snapshot(conn: db.DbConnection) -> PublicResources:
+    """
+    Retrieve the public resources and the 'public-view' role, from memory
+    unless resources have been made public or private, or public ones changed,
+    since they were loaded.
+    """
+    generation = authorisation_generation(conn, "public-resources")
+    with __public_lock__:
+        cached = __public__.get("public")
+    if cached is not None and cached.generation == generation:
+        return cached
+
+    with db.cursor(conn) as cursor:
+        cursor.execute(
+            "SELECT role_id FROM roles WHERE role_name='public-view'")
+        role = cursor.fetchone()
+        cursor.execute(
+            "SELECT r.resource_id, r.resource_name, r.public, "
+            "rc.resource_category_id, rc.resource_category_key, "
+            "rc.resource_category_description "
+            "FROM resources AS r INNER JOIN resource_categories AS rc "
+            "ON r.resource_category_id=rc.resource_category_id "
+            "WHERE r.public=1")
+        resources = tuple(
+            Resource(UUID(row["resource_id"]), row["resource_name"],
+                     ResourceCategory(UUID(row["resource_category_id"]),
+                                      row["resource_category_key"],
+                                      row["resource_category_description"]),
+                     bool(row["public"]))
+            for row in cursor.fetchall())
+
+    snapshot = PublicResources(
+        generation, (UUID(role[0]) if role else None), resources,
+        frozenset(resource.resource_id for resource in resources))
+    with __public_lock__:
+        __public__["public"] = snapshot
+    return snapshot
+
+
+__cache__: Optional[TTLCache] = None
+__cache_lock__ = threading.Lock()
+
+def __privileges_cache__() -> TTLCache:
+    """Retrieve the process-wide cache of users' privileges."""
+    global __cache__ # pylint: disable=[global-statement]
+    with __cache_lock__:
+        if __cache__ is None:
+            config = current_app.config if has_app_context() else {}
+            __cache__ = TTLCache(
+                int(config.get("AUTHORISATION_CACHE_SIZE",
+                               settings.AUTHORISATION_CACHE_SIZE)),
+                float(config.get("AUTHORISATION_CACHE_TTL",
+                                 settings.AUTHORISATION_CACHE_TTL)))
+        return __cache__
+
+
+def cached_user_privileges(
+        conn: db.DbConnection, user: User) -> UserPrivileges:
+    """
+    Retrieve all the privileges `user` holds, from memory unless anything
+    affecting privileges has changed since they were last loaded.
+    """
+    # Read the generation before the privileges: if they change in between,
+    # the privileges are newer than the generation they are tagged with and
+    # simply get loaded again next time.
+    generation = authorisation_generation(conn)
+    cache = __privileges_cache__()
+    cached = cache.get(user.user_id)
+    if cached is not None and cached.generation == generation:
+        return cached
+
+    masks = privilege_masks(conn, generation)
+    with db.cursor(conn) as cursor:
+        cursor.execute(
+            "SELECT resource_id, role_id FROM user_roles WHERE user_id=?",
+            (str(user.user_id),))
+        by_resource: dict[UUID, int] = {}
+        for row in cursor.fetchall():
+            resource_id = UUID(row[0])
+            by_resource[resource_id] = by_resource.get(
+                resource_id, 0) | masks.role_mask(UUID(row[1]))
+
+    public = public_resources_snapshot(conn)
+    mask = (masks.role_mask(public.role_id) # type: ignore[arg-type]
+            if len(public.resource_ids) > 0 else 0)
+    for resource_mask in by_resource.values():
+        mask = mask | resource_mask
+
+    privileges = UserPrivileges(generation, masks, mask, by_resource, public)
+    cache.set(user.user_id, privileges)
+    return privileges
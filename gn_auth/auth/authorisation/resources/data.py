@@ -3,26 +3,53 @@ Utilities for handling data on resources.
 
 These are mostly meant for internal use.
 """
+import json
 from uuid import UUID
-from typing import Sequence
-from functools import reduce
+from typing import Iterable, Sequence
 
 import sqlite3
 
+from gn_auth.auth.db import sqlite3 as db
+
+from ..grouping import group_by
+
 from .base import Resource
 
 def __attach_data__(
         data_rows: Sequence[sqlite3.Row],
         resources: Sequence[Resource]) -> Sequence[Resource]:
-    def __organise__(acc, row):
-        resource_id = UUID(row["resource_id"])
-        return {
-            **acc,
-            resource_id: acc.get(resource_id, tuple()) + (dict(row),)
-        }
-    organised: dict[UUID, tuple[dict, ...]] = reduce(__organise__, data_rows, {})
+    organised: dict[UUID, tuple[dict, ...]] = group_by(
+        data_rows, lambda row: UUID(row["resource_id"]), dict)
     return tuple(
         Resource(resource.resource_id, resource.resource_name,
                  resource.resource_category, resource.public,
                  organised.get(resource.resource_id, tuple()))
         for resource in resources)
+
+
+DataKey = tuple[str, str, str]
+
+def data_resources(
+        conn: db.DbConnection,
+        keys: Iterable[DataKey]) -> dict[DataKey, tuple[UUID, ...]]:
+    """
+    Find the resources that data is linked to, by the data's key: its
+    resource category's key, its dataset's name, and the trait's name for data
+    that is linked trait by trait, or an empty string otherwise.
+
+    Only the requested keys are looked up, in the index the database keeps up
+    to date as data is linked to, and unlinked from, resources.
+    """
+    with db.cursor(conn) as cursor:
+        cursor.execute(
+            "SELECT dri.resource_category_key, dri.dataset_name, "
+            "dri.trait_name, dri.resource_id "
+            "FROM json_each(?) AS dkeys "
+            "INNER JOIN data_resources_index AS dri "
+            "ON dri.resource_category_key=json_extract(dkeys.value, '$[0]') "
+            "AND dri.dataset_name=json_extract(dkeys.value, '$[1]') "
+            "AND dri.trait_name=json_extract(dkeys.value, '$[2]')",
+            (json.dumps([[str(part) for part in key] for key in keys]),))
+        return group_by(
+            cursor.fetchall(), lambda row: (row[0], row[1], row[2]),
+            lambda row: UUID(row[3]))
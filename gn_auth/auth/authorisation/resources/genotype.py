@@ -1,10 +1,11 @@
 """Genotype data resources functions and utilities."""
 import uuid
-from typing import Optional, Sequence
+from typing import Iterator, Optional, Sequence
 
 import sqlite3
 
 import gn_auth.auth.db.sqlite3 as db
+from gn_auth.streaming import fetch_rows
 
 from .base import Resource
 from .data import __attach_data__
@@ -14,16 +15,27 @@ def resource_data(
         cursor: db.DbCursor,
         resource_id: uuid.UUID,
         offset: int = 0,
-        limit: Optional[int] = None) -> Sequence[sqlite3.Row]:
-    """Fetch data linked to a Genotype resource"""
-    cursor.execute(
-        (("SELECT * FROM genotype_resources AS gr "
-          "INNER JOIN linked_genotype_data AS lgd "
-          "ON gr.data_link_id=lgd.data_link_id "
-          "WHERE gr.resource_id=?") + (
-              f" LIMIT {limit} OFFSET {offset}" if bool(limit) else "")),
-        (str(resource_id),))
-    return cursor.fetchall()
+        limit: Optional[int] = None,
+        after: Optional[str] = None) -> Iterator[sqlite3.Row]:
+    """
+    Fetch data linked to a Genotype resource, ordered by `data_link_id`. Only the
+    data after the `after` data link is fetched, if it is given, and the rows
+    are read in batches.
+    """
+    query = ("SELECT * FROM genotype_resources AS gr "
+             "INNER JOIN linked_genotype_data AS lgd "
+             "ON gr.data_link_id=lgd.data_link_id "
+             "WHERE gr.resource_id=?")
+    params: tuple = (str(resource_id),)
+    if bool(after):
+        query = f"{query} AND gr.data_link_id>?"
+        params = params + (after,)
+    query = f"{query} ORDER BY gr.data_link_id"
+    if bool(limit):
+        query = f"{query} LIMIT ? OFFSET ?"
+        params = params + (limit, offset)
+    cursor.execute(query, params)
+    return fetch_rows(cursor)
 
 def link_data_to_resource(
         conn: db.DbConnection,
@@ -59,11 +71,10 @@ def unlink_data_from_resource(
 def attach_resources_data(
         cursor, resources: Sequence[Resource]) -> Sequence[Resource]:
     """Attach linked data to Genotype resources"""
-    placeholders = ", ".join(["?"] * len(resources))
     cursor.execute(
         "SELECT * FROM genotype_resources AS gr "
         "INNER JOIN linked_genotype_data AS lgd "
         "ON gr.data_link_id=lgd.data_link_id "
-        f"WHERE gr.resource_id IN ({placeholders})",
-        tuple(str(resource.resource_id) for resource in resources))
+        f"WHERE gr.resource_id IN ({db.VALUES_IN})",
+        (db.json_values(resource.resource_id for resource in resources),))
     return __attach_data__(cursor.fetchall(), resources)
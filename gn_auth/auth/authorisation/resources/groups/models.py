@@ -1,7 +1,6 @@
 """Handle the management of resource/user groups."""
 import json
 from uuid import UUID, uuid4
-from functools import reduce
 from dataclasses import dataclass
 from typing import Any, Sequence, Iterable, Optional
 
@@ -12,14 +11,15 @@ from gn_auth.auth.db import sqlite3 as db
 from gn_auth.auth.authentication.users import User, user_by_id
 
 from gn_auth.auth.authorisation.checks import authorised_p
+from gn_auth.auth.authorisation.identity import identity_fact, user_role_names
 from gn_auth.auth.authorisation.privileges import Privilege
 from gn_auth.auth.authorisation.resources.base import Resource
 from gn_auth.auth.authorisation.resources.errors import MissingGroupError
 from gn_auth.auth.authorisation.errors import (
     NotFoundError, AuthorisationError, InconsistencyError)
 from gn_auth.auth.authorisation.roles.models import (
-    Role, create_role, check_user_editable, revoke_user_role_by_name,
-    assign_user_role_by_name)
+    Role, create_role, roles_from_rows, check_user_editable,
+    revoke_user_role_by_name, assign_user_role_by_name)
 
 
 @dataclass(frozen=True)
@@ -182,24 +182,27 @@ def authenticated_user_group(conn) -> Maybe:
 
 def user_group(conn: db.DbConnection, user: User) -> Maybe[Group]:
     """Returns the given user's group"""
-    with db.cursor(conn) as cursor:
-        cursor.execute(
-            ("SELECT groups.group_id, groups.group_name, "
-             "groups.group_metadata FROM group_users "
-             "INNER JOIN groups ON group_users.group_id=groups.group_id "
-             "WHERE group_users.user_id = ?"),
-            (str(user.user_id),))
-        groups = tuple(
-            Group(UUID(row[0]), row[1], json.loads(row[2] or "{}"))
-            for row in cursor.fetchall())
+    def __load__():
+        with db.cursor(conn) as cursor:
+            cursor.execute(
+                ("SELECT groups.group_id, groups.group_name, "
+                 "groups.group_metadata FROM group_users "
+                 "INNER JOIN groups ON group_users.group_id=groups.group_id "
+                 "WHERE group_users.user_id = ?"),
+                (str(user.user_id),))
+            groups = tuple(
+                Group(UUID(row[0]), row[1], json.loads(row[2] or "{}"))
+                for row in cursor.fetchall())
 
-        if len(groups) > 1:
-            raise MembershipError(user, groups)
+            if len(groups) > 1:
+                raise MembershipError(user, groups)
 
-        if len(groups) == 1:
-            return Just(groups[0])
+            if len(groups) == 1:
+                return Just(groups[0])
 
-    return Nothing
+        return Nothing
+
+    return identity_fact(user, "group", __load__)
 
 
 def is_group_leader(conn: db.DbConnection, user: User, group: Group) -> bool:
@@ -215,14 +218,7 @@ def is_group_leader(conn: db.DbConnection, user: User, group: Group) -> bool:
         # User cannot be a group leader if not a member of THIS group
         return False
 
-    with db.cursor(conn) as cursor:
-        cursor.execute(
-            ("SELECT roles.role_name FROM user_roles LEFT JOIN roles "
-             "ON user_roles.role_id = roles.role_id WHERE user_id = ?"),
-            (str(user.user_id),))
-        role_names = tuple(row[0] for row in cursor.fetchall())
-
-        return "group-leader" in role_names
+    return "group-leader" in user_role_names(conn, user)
 
 
 def all_groups(conn: db.DbConnection) -> Maybe[Sequence[Group]]:
@@ -363,27 +359,6 @@ def accept_reject_join_request(
         raise NotFoundError(f"Could not find request with ID '{request_id}'")
 
 
-def __organise_privileges__(acc, row):
-    role_id = UUID(row["role_id"])
-    role = acc.get(role_id, False)
-    if role:
-        return {
-            **acc,
-            role_id: Role(
-                role.role_id, role.role_name,
-                bool(int(row["user_editable"])),
-                role.privileges + (
-                    Privilege(row["privilege_id"],
-                              row["privilege_description"]),))
-        }
-    return {
-        **acc,
-        role_id: Role(
-            UUID(row["role_id"]), row["role_name"],
-            bool(int(row["user_editable"])),
-            (Privilege(row["privilege_id"], row["privilege_description"]),))
-    }
-
 # @authorised_p(("group:role:view",),
 #               "Insufficient privileges to view role",
 #               oauth2_scope="profile group role")
@@ -405,8 +380,7 @@ def group_role_by_id(
             (str(group_role_id), str(group.group_id)))
         rows = cursor.fetchall()
         if rows:
-            roles: tuple[Role, ...] = tuple(reduce(
-                __organise_privileges__, rows, {}).values())
+            roles = roles_from_rows(rows)
             assert len(roles) == 1
             return GroupRole(group_role_id, group, roles[0])
         raise NotFoundError(
@@ -3,13 +3,13 @@ The views/routes for the `gn3.auth.authorisation.resources.groups` package.
 """
 import uuid
 import datetime
-from typing import Iterable
+from typing import Iterable, Iterator
 from functools import partial
 from dataclasses import asdict
 
-from MySQLdb.cursors import DictCursor
 from flask import request, jsonify, Response, Blueprint, current_app
 
+from gn_auth.streaming import fetch_rows, json_response
 from gn_auth.auth.db import sqlite3 as db
 from gn_auth.auth.db import mariadb as gn3db
 from gn_auth.auth.db.sqlite3 import with_db_connection
@@ -143,7 +143,7 @@ def reject_join_requests() -> Response:
             user=the_token.user, status="REJECTED")))
 
 def unlinked_mrna_data(
-        conn: db.DbConnection, group: Group) -> tuple[dict, ...]:
+        conn: db.DbConnection, group: Group) -> Iterator[dict]:
     """
     Retrieve all mRNA Assay data linked to a group but not linked to any
     resource.
@@ -154,10 +154,10 @@ def unlinked_mrna_data(
         "WHERE lmd.group_id=? AND mr.data_link_id IS NULL")
     with db.cursor(conn) as cursor:
         cursor.execute(query, (str(group.group_id),))
-        return tuple(dict(row) for row in cursor.fetchall())
+        yield from (dict(row) for row in fetch_rows(cursor))
 
 def unlinked_genotype_data(
-        conn: db.DbConnection, group: Group) -> tuple[dict, ...]:
+        conn: db.DbConnection, group: Group) -> Iterator[dict]:
     """
     Retrieve all genotype data linked to a group but not linked to any resource.
     """
@@ -167,67 +167,63 @@ def unlinked_genotype_data(
         "WHERE lgd.group_id=? AND gr.data_link_id IS NULL")
     with db.cursor(conn) as cursor:
         cursor.execute(query, (str(group.group_id),))
-        return tuple(dict(row) for row in cursor.fetchall())
+        yield from (dict(row) for row in fetch_rows(cursor))
 
 def unlinked_phenotype_data(
-        authconn: db.DbConnection, gn3conn: gn3db.DbConnection,
-        group: Group) -> tuple[dict, ...]:
+        authconn: db.DbConnection, sql_uri: str, group: Group) -> Iterator[dict]:
     """
     Retrieve all phenotype data linked to a group but not linked to any
-    resource.
+    resource, looking the data up in the GN3 database at `sql_uri`.
     """
-    with db.cursor(authconn) as authcur, gn3conn.cursor(DictCursor) as gn3cur:
+    with db.cursor(authconn) as authcur:
         authcur.execute(
             "SELECT lpd.* FROM linked_phenotype_data AS lpd "
             "LEFT JOIN phenotype_resources AS pr "
             "ON lpd.data_link_id=pr.data_link_id "
             "WHERE lpd.group_id=? AND pr.data_link_id IS NULL",
             (str(group.group_id),))
-        results = authcur.fetchall()
         ids: dict[tuple[str, ...], str] = {
             (
                 row["SpeciesId"], row["InbredSetId"], row["PublishFreezeId"],
                 row["PublishXRefId"]): row["data_link_id"]
-            for row in results
+            for row in fetch_rows(authcur)
         }
-        if len(ids.keys()) < 1:
-            return tuple()
-        paramstr = ", ".join(["(%s, %s, %s, %s)"] * len(ids.keys()))
-        gn3cur.execute(
-            "SELECT spc.SpeciesId, spc.SpeciesName, iset.InbredSetId, "
-            "iset.InbredSetName, pf.Id AS PublishFreezeId, "
-            "pf.Name AS dataset_name, pf.FullName AS dataset_fullname, "
-            "pf.ShortName AS dataset_shortname, pxr.Id AS PublishXRefId, "
-            "pub.PubMed_ID, pub.Title, pub.Year, "
-            "phen.Pre_publication_description, "
-            "phen.Post_publication_description, phen.Original_description "
-            "FROM "
-            "Species AS spc "
-            "INNER JOIN InbredSet AS iset "
-            "ON spc.SpeciesId=iset.SpeciesId "
-            "INNER JOIN PublishFreeze AS pf "
-            "ON iset.InbredSetId=pf.InbredSetId "
-            "INNER JOIN PublishXRef AS pxr "
-            "ON pf.InbredSetId=pxr.InbredSetId "
-            "INNER JOIN Publication AS pub "
-            "ON pxr.PublicationId=pub.Id "
-            "INNER JOIN Phenotype AS phen "
-            "ON pxr.PhenotypeId=phen.Id "
-            "WHERE (spc.SpeciesId, iset.InbredSetId, pf.Id, pxr.Id) "
-            f"IN ({paramstr})",
-            tuple(item for sublist in ids.keys() for item in sublist))
-        return tuple({
-            **{key: value for key, value in row.items() if key not in
-               ("Post_publication_description", "Pre_publication_description",
-                "Original_description")},
-            "description": (
-                row["Post_publication_description"] or
-                row["Pre_publication_description"] or
-                row["Original_description"]),
-            "data_link_id": ids[tuple(str(row[key]) for key in (
-                "SpeciesId", "InbredSetId", "PublishFreezeId",
-                "PublishXRefId"))]
-        } for row in gn3cur.fetchall())
+
+    yield from ({
+        **{key: value for key, value in row.items() if key not in
+           ("Post_publication_description", "Pre_publication_description",
+            "Original_description")},
+        "description": (
+            row["Post_publication_description"] or
+            row["Pre_publication_description"] or
+            row["Original_description"]),
+        "data_link_id": ids[tuple(str(row[key]) for key in (
+            "SpeciesId", "InbredSetId", "PublishFreezeId",
+            "PublishXRefId"))]
+    } for row in gn3db.query_in_chunks(
+        sql_uri,
+        "SELECT spc.SpeciesId, spc.SpeciesName, iset.InbredSetId, "
+        "iset.InbredSetName, pf.Id AS PublishFreezeId, "
+        "pf.Name AS dataset_name, pf.FullName AS dataset_fullname, "
+        "pf.ShortName AS dataset_shortname, pxr.Id AS PublishXRefId, "
+        "pub.PubMed_ID, pub.Title, pub.Year, "
+        "phen.Pre_publication_description, "
+        "phen.Post_publication_description, phen.Original_description "
+        "FROM "
+        "Species AS spc "
+        "INNER JOIN InbredSet AS iset "
+        "ON spc.SpeciesId=iset.SpeciesId "
+        "INNER JOIN PublishFreeze AS pf "
+        "ON iset.InbredSetId=pf.InbredSetId "
+        "INNER JOIN PublishXRef AS pxr "
+        "ON pf.InbredSetId=pxr.InbredSetId "
+        "INNER JOIN Publication AS pub "
+        "ON pxr.PublicationId=pub.Id "
+        "INNER JOIN Phenotype AS phen "
+        "ON pxr.PhenotypeId=phen.Id "
+        "WHERE (spc.SpeciesId, iset.InbredSetId, pf.Id, pxr.Id) "
+        "IN ({keys})",
+        tuple(ids.keys())))
 
 @groups.route("/<string:resource_type>/unlinked-data")
 @require_oauth("profile group resource")
@@ -242,23 +238,23 @@ def unlinked_data(resource_type: str) -> Response:
     with require_oauth.acquire("profile group resource") as the_token:
         db_uri = current_app.config["AUTH_DB"]
         gn3db_uri = current_app.config["SQL_URI"]
-        with (db.connection(db_uri) as authconn,
-              gn3db.database_connection(gn3db_uri) as gn3conn):
-            ugroup = user_group(authconn, the_token.user).maybe(# type: ignore[misc]
-                DUMMY_GROUP, lambda grp: grp)
-            if ugroup == DUMMY_GROUP:
-                return jsonify(tuple())
-
-            unlinked_fns = {
-                "mrna": unlinked_mrna_data,
-                "genotype": unlinked_genotype_data,
-                "phenotype": lambda conn, grp: partial(
-                    unlinked_phenotype_data, gn3conn=gn3conn)(
-                        authconn=conn, group=grp)
-            }
-            return jsonify(tuple(
-                dict(row) for row in unlinked_fns[resource_type](
-                    authconn, ugroup)))
+        def __unlinked__():
+            with db.connection(db_uri) as authconn:
+                ugroup = user_group(authconn, the_token.user).maybe(# type: ignore[misc]
+                    DUMMY_GROUP, lambda grp: grp)
+                if ugroup == DUMMY_GROUP:
+                    return
+
+                unlinked_fns = {
+                    "mrna": unlinked_mrna_data,
+                    "genotype": unlinked_genotype_data,
+                    "phenotype": lambda conn, grp: unlinked_phenotype_data(
+                        conn, gn3db_uri, grp)
+                }
+                yield from (
+                    dict(row) for row in unlinked_fns[resource_type](
+                        authconn, ugroup))
+        return json_response(__unlinked__())
 
     return jsonify(tuple())
 
@@ -1,22 +1,27 @@
 """Handle the management of resources."""
+import base64
+import binascii
 from dataclasses import asdict
 from uuid import UUID, uuid4
-from functools import reduce, partial
-from typing import Dict, Sequence, Optional
+from functools import partial
+from typing import Iterable, Iterator, Sequence, Optional
 
+from gn_auth.streaming import fetch_rows
 from gn_auth.auth.db import sqlite3 as db
 from gn_auth.auth.authentication.users import User
 from gn_auth.auth.db.sqlite3 import with_db_connection
 
-from gn_auth.auth.authorisation.roles import Role
-from gn_auth.auth.authorisation.privileges import Privilege
+from gn_auth.auth.authorisation.grouping import group_by
 from gn_auth.auth.authorisation.checks import authorised_p
-from gn_auth.auth.authorisation.errors import NotFoundError, AuthorisationError
+from gn_auth.auth.authorisation.privileges import public_resources_snapshot
+from gn_auth.auth.authorisation.roles.models import roles_from_rows
+from gn_auth.auth.authorisation.errors import (
+    InvalidData, NotFoundError, AuthorisationError)
 
 from .checks import authorised_for
 from .base import Resource, ResourceCategory
 from .groups.models import (
-    Group, GroupRole, user_group, resource_owner, is_group_leader)
+    GroupRole, user_group, resource_owner)
 from .mrna import (
     resource_data as mrna_resource_data,
     attach_resources_data as mrna_attach_resources_data,
@@ -120,66 +125,107 @@ def resource_categories(conn: db.DbConnection) -> Sequence[ResourceCategory]:
 
 def public_resources(conn: db.DbConnection) -> Sequence[Resource]:
     """List all resources marked as public"""
-    categories = {
-        str(cat.resource_category_id): cat for cat in resource_categories(conn)
-    }
-    with db.cursor(conn) as cursor:
-        cursor.execute("SELECT * FROM resources WHERE public=1")
-        results = cursor.fetchall()
-        return tuple(
-            Resource(UUID(row[0]), row[1], categories[row[2]], bool(row[3]))
-            for row in results)
-
-def group_leader_resources(
-        conn: db.DbConnection, user: User, group: Group,
-        res_categories: Dict[UUID, ResourceCategory]) -> Sequence[Resource]:
-    """Return all the resources available to the group leader"""
-    if is_group_leader(conn, user, group):
-        with db.cursor(conn) as cursor:
-            cursor.execute(
-                "SELECT r.* FROM resource_ownership AS ro "
-                "INNER JOIN resources AS r "
-                "ON ro.resource_id=r.resource_id "
-                "WHERE ro.group_id=?",
-                (str(group.group_id),))
-            return tuple(
-                Resource(UUID(row[0]), row[1],
-                         res_categories[UUID(row[2])], bool(row[3]))
-                for row in cursor.fetchall())
-    return tuple()
+    return public_resources_snapshot(conn).resources
+
+# The columns `__resources_from_rows__` builds resources from.
+__RESOURCE_COLUMNS__ = (
+    "r.resource_id, r.resource_name, r.public, rc.resource_category_id, "
+    "rc.resource_category_key, rc.resource_category_description")
+
+def __resources_from_rows__(rows: Iterable) -> tuple[Resource, ...]:
+    """Build resources from rows of `__RESOURCE_COLUMNS__`."""
+    categories: dict[str, ResourceCategory] = {}
+    def __category__(row) -> ResourceCategory:
+        category_id = row["resource_category_id"]
+        if category_id not in categories:
+            categories[category_id] = ResourceCategory(
+                UUID(category_id), row["resource_category_key"],
+                row["resource_category_description"])
+        return categories[category_id]
+
+    return tuple(
+        Resource(UUID(row["resource_id"]), row["resource_name"],
+                 __category__(row), bool(row["public"]))
+        for row in rows)
 
 def user_resources(conn: db.DbConnection, user: User) -> Sequence[Resource]:
-    """List the resources available to the user"""
-    categories = { # Repeated in `public_resources` function
-        cat.resource_category_id: cat for cat in resource_categories(conn)
-    }
+    """
+    List the resources available to the user: those owned by the group the
+    user leads, those the user has a role on, and the public ones.
+    """
     with db.cursor(conn) as cursor:
-        def __all_resources__(group) -> Sequence[Resource]:
-            gl_resources = group_leader_resources(conn, user, group, categories)
-
-            cursor.execute(
-                ("SELECT resources.* FROM user_roles LEFT JOIN resources "
-                 "ON user_roles.resource_id=resources.resource_id "
-                 "WHERE user_roles.user_id=?"),
-                (str(user.user_id),))
-            rows = cursor.fetchall()
-            private_res = tuple(
-                Resource(UUID(row[0]), row[1], categories[UUID(row[2])],
-                         bool(row[3]))
-                for row in rows)
-            return tuple({
-                res.resource_id: res
-                for res in
-                (private_res + gl_resources + public_resources(conn))# type: ignore[operator]
-            }.values())
-
-        # Fix the typing here
-        return user_group(conn, user).map(__all_resources__).maybe(# type: ignore[arg-type,misc]
-            public_resources(conn), lambda res: res)# type: ignore[arg-type,return-value]
-
-def resource_data(conn, resource, offset: int = 0, limit: Optional[int] = None) -> tuple[dict, ...]:
+        cursor.execute(
+            f"SELECT {__RESOURCE_COLUMNS__} FROM resources AS r "
+            "INNER JOIN resource_categories AS rc "
+            "ON r.resource_category_id=rc.resource_category_id "
+            "WHERE r.public=0 AND r.resource_id IN ("
+            "SELECT ro.resource_id FROM resource_ownership AS ro "
+            "INNER JOIN group_users AS gu ON ro.group_id=gu.group_id "
+            "WHERE gu.user_id=:user_id AND EXISTS("
+            "SELECT 1 FROM user_roles AS ur "
+            "INNER JOIN roles ON ur.role_id=roles.role_id "
+            "WHERE ur.user_id=:user_id AND roles.role_name='group-leader') "
+            "UNION "
+            "SELECT resource_id FROM user_roles WHERE user_id=:user_id)",
+            {"user_id": str(user.user_id)})
+        return public_resources_snapshot(conn).resources + (
+            __resources_from_rows__(fetch_rows(cursor)))
+
+def user_resources_among(
+        conn: db.DbConnection, user: User,
+        resource_ids: Iterable[UUID]) -> Sequence[Resource]:
+    """
+    List the resources, from among `resource_ids`, that are available to the
+    user: checking only those resources, rather than listing all the
+    resources available to the user.
     """
-    Retrieve the data for `resource`, optionally limiting the number of items.
+    with db.cursor(conn) as cursor:
+        cursor.execute(
+            f"SELECT {__RESOURCE_COLUMNS__} FROM resources AS r "
+            "INNER JOIN resource_categories AS rc "
+            "ON r.resource_category_id=rc.resource_category_id "
+            f"WHERE r.resource_id IN ({db.values_in('resource_ids')}) AND ("
+            "r.public=1 "
+            "OR EXISTS("
+            "SELECT 1 FROM user_roles AS ur "
+            "WHERE ur.user_id=:user_id AND ur.resource_id=r.resource_id) "
+            "OR EXISTS("
+            "SELECT 1 FROM resource_ownership AS ro "
+            "INNER JOIN group_users AS gu ON ro.group_id=gu.group_id "
+            "WHERE ro.resource_id=r.resource_id AND gu.user_id=:user_id "
+            "AND EXISTS("
+            "SELECT 1 FROM user_roles AS ur "
+            "INNER JOIN roles ON ur.role_id=roles.role_id "
+            "WHERE ur.user_id=:user_id AND roles.role_name='group-leader')))",
+            {"user_id": str(user.user_id),
+             "resource_ids": db.json_values(resource_ids)})
+        return __resources_from_rows__(fetch_rows(cursor))
+
+def continuation_token(data_link_id: str) -> str:
+    """Build the opaque token that continues a listing after `data_link_id`."""
+    return base64.urlsafe_b64encode(
+        UUID(data_link_id).bytes).decode("ascii").rstrip("=")
+
+def continue_after(token: str) -> str:
+    """Retrieve the data link that the continuation `token` continues after."""
+    try:
+        return str(UUID(bytes=base64.urlsafe_b64decode(f"{token}==")))
+    except (binascii.Error, ValueError) as _verr:
+        raise InvalidData("Invalid continuation token.") from _verr
+
+def resource_data(
+        conn,
+        resource,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[str] = None) -> Iterator[dict]:
+    """
+    Retrieve the data for `resource`, ordered by the data's `data_link_id`,
+    optionally limiting the number of items. The items are read from the
+    database in batches, as they are consumed.
+
+    Pages that start `after` a given data link seek straight to it, however
+    deep they are; pages that start at an `offset` skip every earlier item.
     """
     resource_data_function = {
         "mrna": mrna_resource_data,
@@ -192,11 +238,11 @@ def resource_data(conn, resource, offset: int = 0, limit: Optional[int] = None)
         "group": lambda *args: tuple()
     }
     with db.cursor(conn) as cursor:
-        return tuple(
+        yield from (
             dict(data_row) for data_row in
             resource_data_function[# type: ignore[operator]
                 resource.resource_category.resource_category_key](
-                    cursor, resource.resource_id, offset, limit))
+                    cursor, resource.resource_id, offset, limit, after))
 
 def attach_resource_data(cursor: db.DbCursor, resource: Resource) -> Resource:
     """Attach the linked data to the resource"""
@@ -278,13 +324,7 @@ def unlink_data_from_resource(
 def organise_resources_by_category(resources: Sequence[Resource]) -> dict[
         ResourceCategory, tuple[Resource]]:
     """Organise the `resources` by their categories."""
-    def __organise__(accumulator, resource):
-        category = resource.resource_category
-        return {
-            **accumulator,
-            category: accumulator.get(category, tuple()) + (resource,)
-        }
-    return reduce(__organise__, resources, {})
+    return group_by(resources, lambda resource: resource.resource_category)
 
 def attach_resources_data(
         conn: db.DbConnection, resources: Sequence[Resource]) -> Sequence[
@@ -382,47 +422,40 @@ def save_resource(
 def user_roles_on_resources(conn: db.DbConnection,
                             user: User,
                             resource_ids: tuple[UUID, ...] = tuple()) -> dict:
-    """Get roles on resources for a particular user."""
-    def __setup_roles__(old_roles, row):
-        roles = {role.role_id: role for role in old_roles}
-        role_id = UUID(row["role_id"])
-        role = roles.get(role_id, Role(
-            role_id, row["role_name"], bool(int(row["user_editable"])),
-            tuple()))
-        return tuple({
-            **roles, role_id: Role(
-                role.role_id, role.role_name, role.user_editable,
-                role.privileges + (Privilege(
-                    row["privilege_id"], row["privilege_description"]),))
-        }.values())
-
-    def __organise__(acc, row):
-        resid = UUID(row["resource_id"])
-        roles = acc.get(resid, {}).get("roles", tuple())
-        return {
-            **acc,
-            resid: {
-                "roles": __setup_roles__(roles, row)
-            }
-        }
+    """
+    Get roles on resources for a particular user.
 
-    query = (
-        "SELECT ur.user_id, ur.resource_id, r.*, p.* "
-        "FROM user_roles AS ur "
-        "INNER JOIN roles AS r ON ur.role_id=r.role_id "
+    Every user holds the 'public-view' role on every public resource; that
+    role is not stored per user, and is added here.
+    """
+    granted = (
+        "SELECT ep.user_id, ep.resource_id, r.*, p.* "
+        "FROM effective_privileges AS ep "
+        "INNER JOIN roles AS r ON ep.role_id=r.role_id "
+        "INNER JOIN privileges AS p ON ep.privilege_id=p.privilege_id "
+        "WHERE ep.user_id=:user_id")
+    public = (
+        "SELECT :user_id AS user_id, res.resource_id, r.*, p.* "
+        "FROM resources AS res CROSS JOIN roles AS r "
         "INNER JOIN role_privileges AS rp ON r.role_id=rp.role_id "
         "INNER JOIN privileges AS p ON rp.privilege_id=p.privilege_id "
-        "WHERE ur.user_id=?")
-    params: tuple[str, ...] = (str(user.user_id),)
+        "WHERE res.public=1 AND r.role_name='public-view'")
+    params = {"user_id": str(user.user_id)}
 
     if len(resource_ids) > 0:
-        pholders = ", ".join(["?"] * len(resource_ids))
-        query = f"{query} AND ur.resource_id IN ({pholders})"
-        params = params + tuple(str(resid) for resid in resource_ids)
+        granted = (f"{granted} AND ep.resource_id IN "
+                   f"({db.values_in('resource_ids')})")
+        public = (f"{public} AND res.resource_id IN "
+                  f"({db.values_in('resource_ids')})")
+        params["resource_ids"] = db.json_values(resource_ids)
 
     with db.cursor(conn) as cursor:
-        cursor.execute(query, params)
-        return reduce(__organise__, cursor.fetchall(), {})
+        cursor.execute(f"{granted} UNION {public}", params)
+        return {
+            UUID(resource_id): {"roles": roles_from_rows(resource_rows)}
+            for resource_id, resource_rows in group_by(
+                cursor.fetchall(), lambda row: row["resource_id"]).items()
+        }
 
 
 def get_resource_id(conn: db.DbConnection, name: str) -> Optional[str]:
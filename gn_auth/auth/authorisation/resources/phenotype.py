@@ -1,10 +1,11 @@
 """Phenotype data resources functions and utilities."""
 import uuid
-from typing import Optional, Sequence
+from typing import Iterator, Optional, Sequence
 
 import sqlite3
 
 import gn_auth.auth.db.sqlite3 as db
+from gn_auth.streaming import fetch_rows
 
 from .groups import Group
 from .base import Resource
@@ -14,16 +15,27 @@ def resource_data(
         cursor: db.DbCursor,
         resource_id: uuid.UUID,
         offset: int = 0,
-        limit: Optional[int] = None) -> Sequence[sqlite3.Row]:
-    """Fetch data linked to a Phenotype resource"""
-    cursor.execute(
-        ("SELECT * FROM phenotype_resources AS pr "
-         "INNER JOIN linked_phenotype_data AS lpd "
-         "ON pr.data_link_id=lpd.data_link_id "
-         "WHERE pr.resource_id=?") + (
-             f" LIMIT {limit} OFFSET {offset}" if bool(limit) else ""),
-        (str(resource_id),))
-    return cursor.fetchall()
+        limit: Optional[int] = None,
+        after: Optional[str] = None) -> Iterator[sqlite3.Row]:
+    """
+    Fetch data linked to a Phenotype resource, ordered by `data_link_id`. Only the
+    data after the `after` data link is fetched, if it is given, and the rows
+    are read in batches.
+    """
+    query = ("SELECT * FROM phenotype_resources AS pr "
+             "INNER JOIN linked_phenotype_data AS lpd "
+             "ON pr.data_link_id=lpd.data_link_id "
+             "WHERE pr.resource_id=?")
+    params: tuple = (str(resource_id),)
+    if bool(after):
+        query = f"{query} AND pr.data_link_id>?"
+        params = params + (after,)
+    query = f"{query} ORDER BY pr.data_link_id"
+    if bool(limit):
+        query = f"{query} LIMIT ? OFFSET ?"
+        params = params + (limit, offset)
+    cursor.execute(query, params)
+    return fetch_rows(cursor)
 
 def link_data_to_resource(
         conn: db.DbConnection,
@@ -61,11 +73,10 @@ def unlink_data_from_resource(
 def attach_resources_data(
         cursor, resources: Sequence[Resource]) -> Sequence[Resource]:
     """Attach linked data to Phenotype resources"""
-    placeholders = ", ".join(["?"] * len(resources))
     cursor.execute(
         "SELECT * FROM phenotype_resources AS pr "
         "INNER JOIN linked_phenotype_data AS lpd "
         "ON pr.data_link_id=lpd.data_link_id "
-        f"WHERE pr.resource_id IN ({placeholders})",
-        tuple(str(resource.resource_id) for resource in resources))
+        f"WHERE pr.resource_id IN ({db.VALUES_IN})",
+        (db.json_values(resource.resource_id for resource in resources),))
     return __attach_data__(cursor.fetchall(), resources)
@@ -1,6 +1,4 @@
 """Base functions and utilities for system resources."""
-from uuid import UUID
-from functools import reduce
 from typing import Sequence
 
 from gn_auth.auth.db import sqlite3 as db
@@ -8,21 +6,7 @@ from gn_auth.auth.db import sqlite3 as db
 from gn_auth.auth.authentication.users import User
 
 from gn_auth.auth.authorisation.roles import Role
-from gn_auth.auth.authorisation.privileges import Privilege
-
-def __organise_privileges__(acc, row):
-    role_id = UUID(row["role_id"])
-    role = acc.get(role_id, Role(
-        role_id, row["role_name"], bool(int(row["user_editable"])), tuple()))
-    return {
-        **acc,
-        role_id: Role(
-            role.role_id,
-            role.role_name,
-            role.user_editable,
-            (role.privileges +
-             (Privilege(row["privilege_id"], row["privilege_description"]),)))
-    }
+from gn_auth.auth.authorisation.roles.models import roles_from_rows
 
 def user_roles_on_system(conn: db.DbConnection, user: User) -> Sequence[Role]:
     """
@@ -42,6 +26,5 @@ def user_roles_on_system(conn: db.DbConnection, user: User) -> Sequence[Role]:
             f"WHERE r.role_id IN ({role_ids_query})",
             (str(user.user_id),))
 
-        return tuple(reduce(
-            __organise_privileges__, cursor.fetchall(), {}).values())
+        return roles_from_rows(cursor.fetchall())
     return tuple()
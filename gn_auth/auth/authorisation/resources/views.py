@@ -10,10 +10,12 @@ from functools import reduce
 from authlib.integrations.flask_oauth2.errors import _HTTPException
 from flask import request, jsonify, Response, Blueprint, current_app as app
 
+from gn_auth.streaming import json_response
 from gn_auth.auth.db import sqlite3 as db
 from gn_auth.auth.db.sqlite3 import with_db_connection
 
 from gn_auth.auth.authorisation.roles import Role
+from gn_auth.auth.authorisation.grouping import group_by
 from gn_auth.auth.authorisation.errors import InvalidData, InconsistencyError, AuthorisationError
 
 from gn_auth.auth.authentication.oauth2.resource_server import require_oauth
@@ -21,7 +23,8 @@ from gn_auth.auth.authentication.users import User, user_by_id, user_by_email
 
 from .checks import authorised_for
 from .models import (
-    Resource, resource_data, resource_by_id, public_resources,
+    Resource, resource_data, resource_by_id, continue_after,
+    continuation_token, public_resources_snapshot,
     resource_categories, assign_resource_user, link_data_to_resource,
     unassign_resource_user, resource_category_by_id, user_roles_on_resources,
     unlink_data_from_resource, create_resource as _create_resource,
@@ -99,18 +102,42 @@ def __safe_get_requests_count__(key: str = "count_per_page") -> int:
 @resources.route("/view/<uuid:resource_id>/data")
 @require_oauth("profile group resource")
 def view_resource_data(resource_id: uuid.UUID) -> Response:
-    """Retrieve a particular resource's data."""
+    """
+    Retrieve a particular resource's data.
+
+    A full page of data comes with an 'X-Continuation-Token' header: sending
+    it back as the 'continuation_token' argument fetches the next page, at the
+    same cost however deep into the data the page is. Without a
+    'count_per_page', all the data is streamed as it is read.
+    """
     with require_oauth.acquire("profile group resource") as the_token:
         db_uri = app.config["AUTH_DB"]
         count_per_page = __safe_get_requests_count__("count_per_page")
         offset = (__safe_get_requests_page__("page") - 1)
+        token = request.args.get("continuation_token", "").strip()
+        after = continue_after(token) if bool(token) else None
+        if not bool(count_per_page):
+            def __data__():
+                with db.connection(db_uri) as conn:
+                    yield from resource_data(
+                        conn,
+                        resource_by_id(conn, the_token.user, resource_id),
+                        after=after)
+            return json_response(__data__())
+
         with db.connection(db_uri) as conn:
             resource = resource_by_id(conn, the_token.user, resource_id)
-            return jsonify(resource_data(
+            data = tuple(resource_data(
                 conn,
                 resource,
-                ((offset * count_per_page) if bool(count_per_page) else offset),
-                count_per_page))
+                0 if bool(after) else (offset * count_per_page),
+                count_per_page,
+                after))
+            response = jsonify(data)
+            if len(data) == count_per_page:
+                response.headers["X-Continuation-Token"] = continuation_token(
+                    data[-1]["data_link_id"])
+            return response
 
 @resources.route("/data/link", methods=["POST"])
 @require_oauth("profile group resource")
@@ -166,23 +193,19 @@ def resource_users(resource_id: uuid.UUID):
                 (resource_id,))
             if authorised.get(resource_id, False):
                 with db.cursor(conn) as cursor:
-                    def __organise_users_n_roles__(users_n_roles, row):
-                        user_id = uuid.UUID(row["user_id"])
-                        user = users_n_roles.get(user_id, {}).get(
-                            "user", User(user_id, row["email"], row["name"]))
-                        role = Role(
-                            uuid.UUID(row["role_id"]), row["role_name"],
-                            bool(int(row["user_editable"])), tuple())
+                    def __user_n_roles__(user_id, rows):
                         return {
-                            **users_n_roles,
-                            user_id: {
-                                "user": user,
-                                "user_group": Group(
-                                    uuid.UUID(row["group_id"]), row["group_name"],
-                                    json.loads(row["group_metadata"])),
-                                "roles": users_n_roles.get(
-                                    user_id, {}).get("roles", tuple()) + (role,)
-                            }
+                            "user": User(
+                                user_id, rows[0]["email"], rows[0]["name"]),
+                            "user_group": Group(
+                                uuid.UUID(rows[-1]["group_id"]),
+                                rows[-1]["group_name"],
+                                json.loads(rows[-1]["group_metadata"])),
+                            "roles": tuple(
+                                Role(uuid.UUID(row["role_id"]),
+                                     row["role_name"],
+                                     bool(int(row["user_editable"])), tuple())
+                                for row in rows)
                         }
                     cursor.execute(
                         "SELECT g.*, u.*, r.* "
@@ -193,7 +216,13 @@ def resource_users(resource_id: uuid.UUID):
                         "ON ur.role_id=r.role_id "
                         "WHERE ur.resource_id=?",
                         (str(resource_id),))
-                    return reduce(__organise_users_n_roles__, cursor.fetchall(), {})
+                    return {
+                        uuid.UUID(user_id): __user_n_roles__(
+                            uuid.UUID(user_id), rows)
+                        for user_id, rows in group_by(
+                            cursor.fetchall(),
+                            lambda row: row["user_id"]).items()
+                    }
             raise AuthorisationError(
                 "You do not have sufficient privileges to view the resource "
                 "users.")
@@ -256,54 +285,6 @@ def unassign_role_to_user(resource_id: uuid.UUID) -> Response:
 
         return jsonify(with_db_connection(__assign__))
 
-def __public_view_params__(cursor, user_id, resource_id):
-    ignore = (str(user_id),)
-    # sys admins
-    cursor.execute(
-        "SELECT ur.user_id FROM user_roles AS ur INNER JOIN roles AS r "
-        "ON ur.role_id=r.role_id WHERE r.role_name='system-administrator'")
-    ignore = ignore + tuple(
-        row["user_id"] for row in cursor.fetchall())
-    # group admins
-    cursor.execute(
-        "SELECT DISTINCT gu.user_id FROM resource_ownership AS ro "
-        "INNER JOIN groups AS g ON ro.group_id=g.group_id "
-        "INNER JOIN group_users AS gu ON g.group_id=gu.group_id "
-        "INNER JOIN user_roles AS ur ON gu.user_id=ur.user_id "
-        "INNER JOIN roles AS r ON ur.role_id=r.role_id "
-        "WHERE ro.resource_id=? AND r.role_name='group-leader'",
-        (str(resource_id),))
-    ignore = tuple(set(
-        ignore + tuple(row["user_id"] for row in cursor.fetchall())))
-
-    cursor.execute(
-        "SELECT user_id FROM users WHERE user_id NOT IN "
-        f"({', '.join(['?'] * len(ignore))})",
-        ignore)
-    user_ids = tuple(row["user_id"] for row in cursor.fetchall())
-    cursor.execute(
-        "SELECT role_id FROM roles WHERE role_name='public-view'")
-    role_id = cursor.fetchone()["role_id"]
-    return tuple({
-        "user_id": user_id,
-        "role_id": role_id,
-        "resource_id": str(resource_id)
-    } for user_id in user_ids)
-
-def __assign_revoke_public_view__(cursor, user_id, resource_id, public):
-    if public:
-        cursor.executemany(
-            "INSERT INTO user_roles(user_id, role_id, resource_id) "
-            "VALUES(:user_id, :role_id, :resource_id) "
-            "ON CONFLICT (user_id, role_id, resource_id) "
-            "DO NOTHING",
-            __public_view_params__(cursor, user_id, resource_id))
-        return
-    cursor.executemany(
-        "DELETE FROM user_roles WHERE user_id=:user_id "
-        "AND role_id=:role_id AND resource_id=:resource_id",
-        __public_view_params__(cursor, user_id, resource_id))
-
 @resources.route("<uuid:resource_id>/toggle-public", methods=["POST"])
 @require_oauth("profile group resource role")
 def toggle_public(resource_id: uuid.UUID) -> Response:
@@ -324,8 +305,6 @@ def toggle_public(resource_id: uuid.UUID) -> Response:
                         "public": 1 if public else 0,
                         "resource_id": str(resource_id)
                     })
-                __assign_revoke_public_view__(
-                    cursor, the_token.user.user_id, resource_id, public)
                 return new_resource
             return new_resource
 
@@ -343,9 +322,7 @@ def resources_authorisation():
         data = request.json
         assert (data and "resource-ids" in data)
         resource_ids = tuple(uuid.UUID(resid) for resid in data["resource-ids"])
-        pubres = tuple(
-            res.resource_id for res in with_db_connection(public_resources)
-            if res.resource_id in resource_ids)
+        pubres = with_db_connection(public_resources_snapshot).resource_ids
         with require_oauth.acquire("profile resource") as the_token:
             the_resources = with_db_connection(lambda conn: user_roles_on_resources(
                 conn, the_token.user, resource_ids))
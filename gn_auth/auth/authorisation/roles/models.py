@@ -1,6 +1,5 @@
 """Handle management of roles"""
 from uuid import UUID, uuid4
-from functools import reduce
 from dataclasses import dataclass
 
 from typing import Sequence, Iterable
@@ -12,6 +11,7 @@ from ...authentication.users import User
 
 from ..checks import authorised_p
 from ..privileges import Privilege
+from ..grouping import group_by
 from ..errors import NotFoundError, AuthorisationError
 
 
@@ -24,6 +24,19 @@ class Role:
     privileges: tuple[Privilege, ...]
 
 
+def roles_from_rows(rows: Iterable) -> tuple[Role, ...]:
+    """
+    Build roles from rows with the columns of both the `roles` and the
+    `privileges` tables, one row for each privilege of each role. A role with
+    no privileges comes from a single row with no privilege, as LEFT JOINed.
+    """
+    return tuple(
+        Role(UUID(role_rows[0]["role_id"]), role_rows[0]["role_name"],
+             bool(int(role_rows[0]["user_editable"])),
+             tuple(Privilege(row["privilege_id"], row["privilege_description"])
+                   for row in role_rows if row["privilege_id"] is not None))
+        for role_rows in group_by(rows, lambda row: row["role_id"]).values())
+
 def check_user_editable(role: Role):
     """Raise an exception if `role` is not user editable."""
     if not role.user_editable:
@@ -60,38 +73,18 @@ def create_role(
 
     return role
 
-def __organise_privileges__(resources, row) -> dict:
-    resource_id = UUID(row["resource_id"])
-    role_id = UUID(row["role_id"])
-    roles = resources.get(resource_id, {}).get("roles", {})
-    role = roles.get(role_id, Role(
-        role_id,
-        row["role_name"],
-        bool(int(row["user_editable"])),
-        tuple()))
-    return {
-        **resources,
-        resource_id: {
-            "resource_id": resource_id,
-            "user_id": UUID(row["user_id"]),
-            "roles": {
-                **roles,
-                role_id: Role(
-                    role.role_id,
-                    role.role_name,
-                    role.user_editable,
-                    role.privileges + (Privilege(
-                        row["privilege_id"],
-                        row["privilege_description"]),)
-                )
-            }
-        }
-    }
+def __organise_privileges__(rows) -> tuple[dict, ...]:
+    """Organise the user's roles, and their privileges, by resource."""
+    return tuple({
+        "resource_id": UUID(resource_id),
+        "user_id": UUID(resource_rows[0]["user_id"]),
+        "roles": roles_from_rows(resource_rows)
+    } for resource_id, resource_rows in group_by(
+        rows, lambda row: row["resource_id"]).items())
 
 def user_roles(conn: db.DbConnection, user: User) -> Sequence[dict]:
     """Retrieve all roles (organised by resource) assigned to the user."""
     with db.cursor(conn) as cursor:
-        cursor.execute("SELECT * FROM user_roles")
         cursor.execute(
             "SELECT ur.resource_id, ur.user_id, r.*, p.* "
             "FROM user_roles AS ur "
@@ -101,10 +94,7 @@ def user_roles(conn: db.DbConnection, user: User) -> Sequence[dict]:
             "WHERE ur.user_id=?",
             (str(user.user_id),))
 
-        return tuple({# type: ignore[var-annotated]
-            **row, "roles": tuple(row["roles"].values())
-        } for row in reduce(
-            __organise_privileges__, cursor.fetchall(), {}).values())
+        return __organise_privileges__(cursor.fetchall())
     return tuple()
 
 def user_role(conn: db.DbConnection, user: User, role_id: UUID) -> Either:
@@ -122,10 +112,9 @@ def user_role(conn: db.DbConnection, user: User, role_id: UUID) -> Either:
 
         results = cursor.fetchall()
         if results:
-            res_role_obj = tuple(# type: ignore[var-annotated]
-                reduce(__organise_privileges__, results, {}).values())[0]
+            res_role_obj = __organise_privileges__(results)[0]
             resource_id = res_role_obj["resource_id"]
-            role = tuple(res_role_obj["roles"].values())[0]
+            role = res_role_obj["roles"][0]
             return Right((role, resource_id))
         return Left(NotFoundError(
             f"Could not find role with id '{role_id}'",))
@@ -146,24 +135,9 @@ def __assign_group_creator_role__(cursor: db.DbCursor, user: User):
         {"user_id": str(user.user_id), "role_id": role_id,
          "resource_id": resource_id})
 
-def __assign_public_view_role__(cursor: db.DbCursor, user: User):
-    cursor.execute("SELECT resource_id FROM resources WHERE public=1")
-    public_resources = tuple(row["resource_id"] for row in cursor.fetchall())
-    cursor.execute("SELECT role_id FROM roles WHERE role_name='public-view'")
-    role_id = cursor.fetchone()["role_id"]
-    cursor.executemany(
-        "INSERT INTO user_roles(user_id, role_id, resource_id) "
-        "VALUES(:user_id, :role_id, :resource_id)",
-        tuple({
-            "user_id": str(user.user_id),
-            "role_id": role_id,
-            "resource_id": resource_id
-        } for resource_id in public_resources))
-
 def assign_default_roles(cursor: db.DbCursor, user: User):
     """Assign `user` some default roles."""
     __assign_group_creator_role__(cursor, user)
-    __assign_public_view_role__(cursor, user)
 
 def revoke_user_role_by_name(cursor: db.DbCursor, user: User, role_name: str):
     """Revoke a role from `user` by the role's name"""
@@ -1,10 +1,10 @@
 """Views regarding user collections."""
 from uuid import UUID
 
-from redis import Redis
 from flask import jsonify, request, Response, Blueprint, current_app
 
 from ....db import sqlite3 as db
+from ....db import redis as rdb
 from ....db.sqlite3 import with_db_connection
 
 from ....authentication.users import User, user_by_id
@@ -31,15 +31,13 @@ collections = Blueprint("collections", __name__)
 def list_user_collections() -> Response:
     """Retrieve the user ids"""
     with (require_oauth.acquire("profile user") as the_token,
-          Redis.from_url(current_app.config["REDIS_URI"],
-                         decode_responses=True) as redisconn):
+          rdb.connection(current_app.config["REDIS_URI"]) as redisconn):
         return jsonify(user_collections(redisconn, the_token.user))
 
 @collections.route("/<uuid:anon_id>/list")
 def list_anonymous_collections(anon_id: UUID) -> Response:
     """Fetch anonymous collections"""
-    with Redis.from_url(
-            current_app.config["REDIS_URI"], decode_responses=True) as redisconn:
+    with rdb.connection(current_app.config["REDIS_URI"]) as redisconn:
         def __list__(conn: db.DbConnection) -> tuple:
             try:
                 _user = user_by_id(conn, anon_id)
@@ -72,8 +70,7 @@ def __new_collection_as_anonymous_user__(redisconn, name, traits):
 @require_json
 def new_user_collection() -> Response:
     """Create a new collection."""
-    with (Redis.from_url(current_app.config["REDIS_URI"],
-                         decode_responses=True) as redisconn):
+    with rdb.connection(current_app.config["REDIS_URI"]) as redisconn:
         traits = tuple(request.json.get("traits", tuple()))# type: ignore[union-attr]
         name = request.json.get("name")# type: ignore[union-attr]
         if bool(request.headers.get("Authorization")):
@@ -86,8 +83,7 @@ def new_user_collection() -> Response:
 @require_json
 def view_collection(collection_id: UUID) -> Response:
     """View a particular collection"""
-    with (Redis.from_url(current_app.config["REDIS_URI"],
-                         decode_responses=True) as redisconn):
+    with rdb.connection(current_app.config["REDIS_URI"]) as redisconn:
         if bool(request.headers.get("Authorization")):
             with require_oauth.acquire("profile user") as token:
                 return jsonify(get_collection(redisconn,
@@ -107,8 +103,7 @@ def view_collection(collection_id: UUID) -> Response:
 def import_anonymous() -> Response:
     """Import anonymous collections."""
     with (require_oauth.acquire("profile user") as token,
-          Redis.from_url(current_app.config["REDIS_URI"],
-                         decode_responses=True) as redisconn):
+          rdb.connection(current_app.config["REDIS_URI"]) as redisconn):
         anon_id = UUID(request.json.get("anon_id"))#type: ignore[union-attr]
         anon_colls = user_collections(redisconn, User(
             anon_id, "anon@ymous.user", "Anonymous User"))
@@ -128,8 +123,7 @@ def import_anonymous() -> Response:
 def delete_anonymous() -> Response:
     """Delete anonymous collections."""
     with (require_oauth.acquire("profile user") as _token,
-          Redis.from_url(current_app.config["REDIS_URI"],
-                         decode_responses=True) as redisconn):
+          rdb.connection(current_app.config["REDIS_URI"]) as redisconn):
         anon_id = UUID(request.json.get("anon_id"))#type: ignore[union-attr]
         anon_colls = user_collections(redisconn, User(
             anon_id, "anon@ymous.user", "Anonymous User"))
@@ -142,8 +136,7 @@ def delete_anonymous() -> Response:
 @require_json
 def delete_collections():
     """Delete specified collections."""
-    with (Redis.from_url(current_app.config["REDIS_URI"],
-                         decode_responses=True) as redisconn):
+    with rdb.connection(current_app.config["REDIS_URI"]) as redisconn:
         coll_ids = tuple(UUID(cid) for cid in request.json["collection_ids"])
         deleted = _delete_collections(
             redisconn,
@@ -165,8 +158,7 @@ def remove_traits_from_collection(collection_id: UUID) -> Response:
         return jsonify({"message": "No trait to remove from collection."})
 
     the_traits = tuple(request.json["traits"])#type: ignore[index]
-    with (Redis.from_url(current_app.config["REDIS_URI"],
-                         decode_responses=True) as redisconn):
+    with rdb.connection(current_app.config["REDIS_URI"]) as redisconn:
         if not bool(request.headers.get("Authorization")):
             coll = remove_traits(
                 redisconn,
@@ -193,8 +185,7 @@ def add_traits_to_collection(collection_id: UUID) -> Response:
         return jsonify({"message": "No trait to add to collection."})
 
     the_traits = tuple(request.json["traits"])#type: ignore[index]
-    with (Redis.from_url(current_app.config["REDIS_URI"],
-                         decode_responses=True) as redisconn):
+    with rdb.connection(current_app.config["REDIS_URI"]) as redisconn:
         if not bool(request.headers.get("Authorization")):
             coll = add_traits(
                 redisconn,
@@ -221,8 +212,7 @@ def rename_collection(collection_id: UUID) -> Response:
         return jsonify({"message": "No new name to change to."})
 
     new_name = request.json["new_name"]#type: ignore[index]
-    with (Redis.from_url(current_app.config["REDIS_URI"],
-                         decode_responses=True) as redisconn):
+    with rdb.connection(current_app.config["REDIS_URI"]) as redisconn:
         if not bool(request.headers.get("Authorization")):
             coll = change_name(redisconn,
                                User(UUID(request.json["anon_id"]),#type: ignore[index]
@@ -7,7 +7,7 @@ from flask import current_app as app
 
 
 from ...errors import ForbiddenAccess
-from ...roles.models import user_roles
+from ...identity import user_privilege_ids
 
 from ....db import sqlite3 as db
 from ....authentication.users import User
@@ -31,10 +31,8 @@ def can_masquerade(func):
             conn = kwargs["conn"]
             token = kwargs["original_token"]
 
-        masq_privs = [priv for role in user_roles(conn, token.user)
-                      for priv in role.privileges
-                      if priv.privilege_id == "system:user:masquerade"]
-        if len(masq_privs) == 0:
+        if "system:user:masquerade" not in user_privilege_ids(
+                conn, token.user):
             raise ForbiddenAccess(
                 "You do not have the ability to masquerade as another user.")
         return func(*args, **kwargs)
@@ -1,10 +1,12 @@
 """Functions for acting on users."""
 import uuid
-from functools import reduce
+from typing import Iterator
 
-from ..roles.models import Role
+from gn_auth.streaming import fetch_rows
+
+from ..grouping import group_by
+from ..roles.models import Role, roles_from_rows
 from ..checks import authorised_p
-from ..privileges import Privilege
 
 from ...db import sqlite3 as db
 from ...authentication.users import User
@@ -13,33 +15,19 @@ from ...authentication.users import User
     ("system:user:list",),
     "You do not have the appropriate privileges to list users.",
     oauth2_scope="profile user")
-def list_users(conn: db.DbConnection) -> tuple[User, ...]:
-    """List out all users."""
+def list_users(conn: db.DbConnection) -> Iterator[User]:
+    """List out all users, reading them from the database in batches."""
     with db.cursor(conn) as cursor:
         cursor.execute("SELECT * FROM users")
-        return tuple(
+        yield from (
             User(uuid.UUID(row["user_id"]), row["email"], row["name"])
-            for row in cursor.fetchall())
+            for row in fetch_rows(cursor))
 
 def __build_resource_roles__(rows):
-    def __build_roles__(roles, row):
-        role_id = uuid.UUID(row["role_id"])
-        priv = Privilege(row["privilege_id"], row["privilege_description"])
-        role = roles.get(role_id, Role(
-            role_id, row["role_name"], bool(row["user_editable"]), tuple()))
-        return {
-            **roles,
-            role_id: Role(role_id, role.role_name, role.user_editable, role.privileges + (priv,))
-        }
-    def __build__(acc, row):
-        resource_id = uuid.UUID(row["resource_id"])
-        return {
-            **acc,
-            resource_id: __build_roles__(acc.get(resource_id, {}), row)
-        }
     return {
-        resource_id: tuple(roles.values())
-        for resource_id, roles in reduce(__build__, rows, {}).items()
+        uuid.UUID(resource_id): roles_from_rows(resource_rows)
+        for resource_id, resource_rows in group_by(
+            rows, lambda row: row["resource_id"]).items()
     }
 
 # @authorised_p(
@@ -50,16 +38,14 @@ def user_resource_roles(conn: db.DbConnection, user: User) -> dict[uuid.UUID, tu
     """Fetch all the user's roles on resources."""
     with db.cursor(conn) as cursor:
         cursor.execute(
-            "SELECT res.*, rls.*, p.*"
-            "FROM resources AS res INNER JOIN "
-            "user_roles AS ur "
-            "ON res.resource_id=ur.resource_id "
-            "LEFT JOIN roles AS rls "
-            "ON ur.role_id=rls.role_id "
-            "LEFT JOIN role_privileges AS rp "
-            "ON rls.role_id=rp.role_id "
-            "LEFT JOIN privileges AS p "
-            "ON rp.privilege_id=p.privilege_id "
+            "SELECT ur.resource_id, rls.*, p.* "
+            "FROM user_roles AS ur "
+            "INNER JOIN roles AS rls ON ur.role_id=rls.role_id "
+            # Keep the roles that grant no privileges.
+            "LEFT JOIN effective_privileges AS ep "
+            "ON ur.user_id=ep.user_id AND ur.resource_id=ep.resource_id "
+            "AND ur.role_id=ep.role_id "
+            "LEFT JOIN privileges AS p ON ep.privilege_id=p.privilege_id "
             "WHERE ur.user_id = ?",
             (str(user.user_id),))
         return __build_resource_roles__(
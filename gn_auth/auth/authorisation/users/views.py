@@ -7,6 +7,7 @@ import sqlite3
 from email_validator import validate_email, EmailNotValidError
 from flask import request, jsonify, Response, Blueprint, current_app
 
+from gn_auth.streaming import json_response
 from gn_auth.auth.db import sqlite3 as db
 from gn_auth.auth.db.sqlite3 import with_db_connection
 
@@ -176,5 +177,7 @@ def user_join_request_exists():
 def list_all_users() -> Response:
     """List all the users."""
     with require_oauth.acquire("profile group") as _the_token:
-        return jsonify(tuple(
-            asdict(user) for user in with_db_connection(list_users)))
+        def __users__():
+            with db.connection(current_app.config["AUTH_DB"]) as conn:
+                yield from (asdict(user) for user in list_users(conn))
+        return json_response(__users__())
@@ -1,11 +1,22 @@
 """Connections to MariaDB"""
+import time
 import logging
+import threading
 import traceback
 import contextlib
+from collections import deque
 from urllib.parse import urlparse
-from typing import Any, Tuple, Protocol, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Tuple, Protocol, Iterator, Sequence
 
 import MySQLdb as mdb
+from MySQLdb.cursors import DictCursor
+from flask import current_app, has_app_context
+
+from gn_auth import settings
+
+# CR_SERVER_GONE_ERROR, CR_SERVER_LOST
+__CONNECTION_LOST__ = (2006, 2013)
 
 class DbConnection(Protocol):
     """Type annotation for a generic database connection object."""
@@ -26,20 +37,209 @@ def parse_db_url(sql_uri: str) -> Tuple:
         parsed_db.hostname, parsed_db.username, parsed_db.password,
         parsed_db.path[1:], parsed_db.port)
 
+def __connection_lost__(exc: Exception) -> bool:
+    """Check whether `exc` is due to the server having gone away."""
+    return (isinstance(exc, mdb.OperationalError)
+            and len(exc.args) > 0
+            and exc.args[0] in __CONNECTION_LOST__)
+
+def __close_quietly__(conn: Any) -> None:
+    """Close `conn`, ignoring errors from a connection that is already dead."""
+    try:
+        conn.close()
+    except mdb.Error as _mdb_err:
+        logging.debug(traceback.format_exc())
+
+class ConnectionPool:
+    """
+    Keep idle connections to a single MariaDB database so that they can be
+    reused across requests rather than paying for the TCP and authentication
+    handshake every time.
+    """
+    def __init__(self, sql_uri: str, max_idle: int = 5,
+                 idle_timeout: float = 300):
+        """Initialise the pool."""
+        self.sql_uri = sql_uri
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.__idle__: deque = deque()
+        self.__lock__ = threading.Lock()
+
+    def __connect__(self) -> Any:
+        """Open a new connection to the database."""
+        host, user, passwd, db_name, port = parse_db_url(self.sql_uri)
+        return mdb.connect(db=db_name,
+                           user=user,
+                           passwd=passwd or '',
+                           host=host,
+                           port=port or 3306)
+
+    def __evict_expired__(self) -> list:
+        """Remove the connections that have been idle for too long."""
+        # Connections are released to the right, so the oldest are leftmost.
+        expired = []
+        cutoff = time.monotonic() - self.idle_timeout
+        with self.__lock__:
+            while len(self.__idle__) > 0 and self.__idle__[0][1] < cutoff:
+                expired.append(self.__idle__.popleft()[0])
+        return expired
+
+    def acquire(self) -> Any:
+        """
+        Borrow a connection from the pool, opening one if none is idle.
+
+        Idle connections are checked with a ping before being handed out, and
+        discarded in favour of a new connection if the server has gone away.
+        """
+        for conn in self.__evict_expired__():
+            __close_quietly__(conn)
+
+        while True:
+            with self.__lock__:
+                if len(self.__idle__) == 0:
+                    break
+                conn, _released_at = self.__idle__.pop()
+            try:
+                conn.ping()
+                return conn
+            except mdb.Error as _mdb_err:
+                logging.debug("Discarding dead pooled MariaDB connection.")
+                __close_quietly__(conn)
+        return self.__connect__()
+
+    def release(self, conn: Any, broken: bool = False) -> None:
+        """Return a borrowed connection to the pool."""
+        if not broken:
+            with self.__lock__:
+                if len(self.__idle__) < self.max_idle:
+                    self.__idle__.append((conn, time.monotonic()))
+                    return
+        __close_quietly__(conn)
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self.__lock__:
+            idle = [conn for conn, _released_at in self.__idle__]
+            self.__idle__.clear()
+        for conn in idle:
+            __close_quietly__(conn)
+
+__pools__: dict[str, ConnectionPool] = {}
+__pools_lock__ = threading.Lock()
+
+def __pool_settings__() -> tuple[int, float]:
+    """Retrieve the (maximum idle connections, idle timeout) pool settings."""
+    config = current_app.config if has_app_context() else {}
+    return (
+        int(config.get("SQL_POOL_SIZE", settings.SQL_POOL_SIZE)),
+        float(config.get("SQL_POOL_IDLE_TIMEOUT",
+                         settings.SQL_POOL_IDLE_TIMEOUT)))
+
+def connection_pool(sql_uri: str) -> ConnectionPool:
+    """Retrieve the connection pool for the database at `sql_uri`."""
+    with __pools_lock__:
+        if sql_uri not in __pools__:
+            __pools__[sql_uri] = ConnectionPool(sql_uri, *__pool_settings__())
+        return __pools__[sql_uri]
+
+def close_pools() -> None:
+    """Close all idle pooled connections, e.g. when shutting down."""
+    with __pools_lock__:
+        for pool in __pools__.values():
+            pool.close()
+
+@contextlib.contextmanager
+def __pooled_connection__(sql_uri) -> Iterator[DbConnection]:
+    """
+    Acquire a pooled connection to the MySQL database, rolling back and
+    re-raising on any error.
+    """
+    pool = connection_pool(sql_uri)
+    connection = pool.acquire()
+    broken = False
+    try:
+        yield connection
+        connection.commit()
+    except mdb.Error as _mdb_err:
+        broken = __connection_lost__(_mdb_err)
+        if not broken:
+            try:
+                connection.rollback()
+            except mdb.Error as _rollback_err:
+                broken = True
+        raise
+    finally:
+        pool.release(connection, broken)
+
 @contextlib.contextmanager
 def database_connection(sql_uri) -> Iterator[DbConnection]:
     """Connect to MySQL database."""
-    host, user, passwd, db_name, port = parse_db_url(sql_uri)
-    connection = mdb.connect(db=db_name,
-                             user=user,
-                             passwd=passwd or '',
-                             host=host,
-                             port=port or 3306)
+    pool = connection_pool(sql_uri)
+    connection = pool.acquire()
+    broken = False
     try:
         yield connection
     except mdb.Error as _mdb_err:
         logging.debug(traceback.format_exc())
-        connection.rollback()
+        broken = __connection_lost__(_mdb_err)
+        if not broken:
+            connection.rollback()
     finally:
-        connection.commit()
-        connection.close()
+        try:
+            if not broken:
+                connection.commit()
+        except mdb.Error as _mdb_err:
+            broken = True
+            raise
+        finally:
+            pool.release(connection, broken)
+
+def __chunk_settings__() -> tuple[int, int]:
+    """Retrieve the (keys per chunk, worker threads) tuple-IN settings."""
+    config = current_app.config if has_app_context() else {}
+    return (
+        max(1, int(config.get("SQL_IN_CHUNK_SIZE", settings.SQL_IN_CHUNK_SIZE))),
+        max(1, int(config.get("SQL_IN_WORKERS", settings.SQL_IN_WORKERS))))
+
+def __query_chunk__(sql_uri: str, query: str, chunk: Sequence[tuple]) -> tuple:
+    """Run `query` for the keys in `chunk` on a pooled connection."""
+    keystr = ", ".join(
+        [f"({', '.join(['%s'] * len(chunk[0]))})"] * len(chunk))
+    # Errors are not swallowed, as they are by `database_connection`: a chunk
+    # that fails must fail the whole query, not come back empty.
+    with (__pooled_connection__(sql_uri) as conn,
+          conn.cursor(DictCursor) as cursor):
+        cursor.execute(
+            query.format(keys=keystr),
+            tuple(item for key in chunk for item in key))
+        return tuple(cursor.fetchall())
+
+def query_in_chunks(
+        sql_uri: str, query: str, keys: Sequence[tuple]) -> Iterator[dict]:
+    """
+    Run `query`, whose `{keys}` placeholder is the list of a tuple-IN clause,
+    e.g. "... WHERE (SpeciesId, InbredSetId) IN ({keys})", for all `keys`.
+
+    Rather than one statement with a placeholder group for every key, the keys
+    are split into bounded chunks, run across a small pool of threads, each on
+    its own pooled connection. The results are yielded in the order of the
+    chunks, with only a few chunks in flight at a time.
+    """
+    if len(keys) == 0:
+        return
+    chunk_size, workers = __chunk_settings__()
+    chunks = (keys[start:start + chunk_size]
+              for start in range(0, len(keys), chunk_size))
+    if len(keys) <= chunk_size:
+        yield from __query_chunk__(sql_uri, query, keys)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending: deque = deque()
+        for chunk in chunks:
+            pending.append(
+                executor.submit(__query_chunk__, sql_uri, query, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while len(pending) > 0:
+            yield from pending.popleft().result()
@@ -1,18 +1,51 @@
 """Connections for Redis."""
 import logging
+import threading
 import traceback
 import contextlib
 from typing import Iterator
 
-from redis import Redis, RedisError, ConnectionError as RedisConnectionError
+from flask import current_app, has_app_context
+from redis import Redis, RedisError, ConnectionPool
+
+from gn_auth import settings
+
+__pools__: dict[str, ConnectionPool] = {}
+__pools_lock__ = threading.Lock()
+
+def __health_check_interval__() -> int:
+    """Seconds a pooled connection may sit idle before it is checked again."""
+    config = current_app.config if has_app_context() else {}
+    return int(config.get("REDIS_HEALTH_CHECK_INTERVAL",
+                          settings.REDIS_HEALTH_CHECK_INTERVAL))
+
+def connection_pool(redis_uri: str) -> ConnectionPool:
+    """Retrieve the shared connection pool for the Redis server at `redis_uri`."""
+    with __pools_lock__:
+        if redis_uri not in __pools__:
+            __pools__[redis_uri] = ConnectionPool.from_url(
+                redis_uri,
+                decode_responses=True,
+                health_check_interval=__health_check_interval__())
+        return __pools__[redis_uri]
+
+def close_pools() -> None:
+    """Disconnect all pooled connections, e.g. when shutting down."""
+    with __pools_lock__:
+        for pool in __pools__.values():
+            pool.disconnect()
 
 @contextlib.contextmanager
 def connection(redis_uri) -> Iterator[Redis]:
-    """Connection to redis"""
-    rconn = Redis.from_url(redis_uri, decode_responses=True)
+    """
+    Connection to redis
+
+    Connections are borrowed from a pool shared by all callers, which checks
+    the health of connections that have been idle for a while rather than
+    pinging the server on every use.
+    """
+    rconn = Redis(connection_pool=connection_pool(redis_uri))
     try:
-        if not rconn.ping():
-            raise RedisConnectionError("Could not connect to Redis.")
         yield rconn
     except RedisError as _rerr:
         logging.debug(traceback.format_exc())
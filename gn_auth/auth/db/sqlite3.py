@@ -1,12 +1,20 @@
 """Handle connection to auth database."""
+import re
+import json
+import time
+import random
 import sqlite3
 import logging
+import threading
 import contextlib
-from typing import Any, Protocol, Callable, Iterator
+from collections import deque
+from typing import Any, Protocol, Callable, Iterable, Iterator, Optional
 
 import traceback
 
-from flask import current_app
+from flask import g, current_app, has_app_context
+
+from gn_auth import settings
 
 from .protocols import DbCursor
 
@@ -15,20 +23,317 @@ class DbConnection(Protocol):
     def cursor(self) -> Any:
         """A cursor object"""
 
+    def execute(self, *args, **kwargs) -> Any:
+        """Execute a single statement on a new cursor."""
+
     def commit(self) -> Any:
         """Commit the transaction."""
 
     def rollback(self) -> Any:
         """Rollback the transaction."""
 
+__PROFILE_SETTINGS__ = (
+    # Order matters: wait on locks before trying to change the journal mode.
+    ("busy_timeout", "AUTH_DB_BUSY_TIMEOUT"),
+    ("journal_mode", "AUTH_DB_JOURNAL_MODE"),
+    ("synchronous", "AUTH_DB_SYNCHRONOUS"),
+    ("mmap_size", "AUTH_DB_MMAP_SIZE"),
+    ("cache_size", "AUTH_DB_CACHE_SIZE"),
+    ("temp_store", "AUTH_DB_TEMP_STORE"))
+
+__PRAGMA_CHOICES__ = {
+    "journal_mode": ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"),
+    "synchronous": ("OFF", "NORMAL", "FULL", "EXTRA"),
+    "temp_store": ("DEFAULT", "FILE", "MEMORY")
+}
+
+def __pragma_value__(pragma: str, value: Any) -> str:
+    """Validate the value for `pragma` since it cannot be a bound parameter."""
+    if pragma in __PRAGMA_CHOICES__:
+        value = str(value).strip().upper()
+        if value not in __PRAGMA_CHOICES__[pragma]:
+            raise ValueError(
+                f"Invalid value '{value}' for SQLite3 pragma '{pragma}'. "
+                f"Expected one of {', '.join(__PRAGMA_CHOICES__[pragma])}.")
+        return value
+    return str(int(value))
+
+def performance_profile() -> dict[str, str]:
+    """The performance-related pragmas to apply to each new connection."""
+    config = current_app.config if has_app_context() else {}
+    return {
+        pragma: __pragma_value__(
+            pragma, config.get(setting, getattr(settings, setting)))
+        for pragma, setting in __PROFILE_SETTINGS__
+    }
+
+def effective_profile(conn: DbConnection) -> dict[str, Any]:
+    """Retrieve the values of the performance-related pragmas in effect."""
+    def __named__(pragma, value):
+        if pragma in ("synchronous", "temp_store"):
+            return __PRAGMA_CHOICES__[pragma][int(value)]
+        return value.upper() if isinstance(value, str) else value
+
+    return {
+        pragma: __named__(
+            pragma, conn.execute(f"PRAGMA {pragma}").fetchone()[0])
+        for pragma, _setting in __PROFILE_SETTINGS__
+    }
+
+class ConnectionPool:
+    """
+    Keep a small number of idle connections to a single SQLite3 database so
+    that they can be reused across requests rather than re-opened every time.
+    """
+    def __init__(self, db_path: str, max_idle: int = 5,
+                 profile: Optional[dict[str, str]] = None):
+        """Initialise the pool."""
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self.profile = profile or {}
+        self.__idle__: deque = deque()
+        self.__lock__ = threading.Lock()
+
+    def __connect__(self) -> sqlite3.Connection:
+        """Open a new connection to the database."""
+        logging.debug("SQLite3 DB Path: '%s'.", self.db_path)
+        # A pooled connection could be handed to a different thread the next
+        # time it is borrowed, but it is never used by two threads at once.
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.set_trace_callback(logging.debug)
+        conn.execute("PRAGMA foreign_keys = ON")
+        for pragma, value in self.profile.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Borrow a connection from the pool, opening one if none is idle."""
+        with self.__lock__:
+            if len(self.__idle__) > 0:
+                return self.__idle__.pop()
+        return self.__connect__()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a borrowed connection to the pool."""
+        if conn.in_transaction:
+            conn.rollback()
+        with self.__lock__:
+            if len(self.__idle__) < self.max_idle:
+                self.__idle__.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self.__lock__:
+            while len(self.__idle__) > 0:
+                self.__idle__.pop().close()
+
+__pools__: dict[str, ConnectionPool] = {}
+__pools_lock__ = threading.Lock()
+__thread_scope__ = threading.local()
+
+def __pool_size__() -> int:
+    """The maximum number of idle connections to keep per database."""
+    config = current_app.config if has_app_context() else {}
+    return int(config.get("AUTH_DB_POOL_SIZE", settings.AUTH_DB_POOL_SIZE))
+
+def connection_pool(db_path: str) -> ConnectionPool:
+    """Retrieve the connection pool for the database at `db_path`."""
+    with __pools_lock__:
+        if db_path not in __pools__:
+            __pools__[db_path] = ConnectionPool(
+                db_path, __pool_size__(), performance_profile())
+        return __pools__[db_path]
+
+def close_pools() -> None:
+    """Close all idle pooled connections, e.g. when shutting down."""
+    with __pools_lock__:
+        for pool in __pools__.values():
+            pool.close()
+
+def __scope__() -> dict[str, list]:
+    """
+    The connections currently in use by this request, or by this thread when
+    running outside of a request.
+    """
+    if has_app_context():
+        if "auth_db_connections" not in g:
+            g.auth_db_connections = {}
+        return g.auth_db_connections
+    if not hasattr(__thread_scope__, "connections"):
+        __thread_scope__.connections = {}
+    return __thread_scope__.connections
+
+def changes_made() -> int:
+    """
+    The number of statements that have modified rows in the database during
+    this request (or in this thread, when running outside of a request).
+    Cached data derived from the database is stale once this changes.
+    """
+    if has_app_context():
+        return g.get("auth_db_changes", 0)
+    return getattr(__thread_scope__, "changes", 0)
+
+def __note_changes__(cur: sqlite3.Cursor) -> None:
+    """Count the statement just run on `cur` if it modified any rows."""
+    if cur.rowcount > 0:
+        if has_app_context():
+            g.auth_db_changes = g.get("auth_db_changes", 0) + 1
+        else:
+            __thread_scope__.changes = getattr(
+                __thread_scope__, "changes", 0) + 1
+
+__MAX_LABELS__ = 100
+__STATEMENT_LABEL__ = re.compile(
+    r"^\s*(?P<verb>\w+)(?:\b.*?\b(?:INTO|FROM|TABLE))?\s+(?P<table>\w+)",
+    re.IGNORECASE | re.DOTALL)
+
+def statement_label(statement: str) -> str:
+    """
+    A label for `statement` made of its verb and the first table it names,
+    e.g. 'INSERT oauth2_tokens', so that waits on the same kind of statement
+    are counted together whatever its parameters or formatting.
+    """
+    match = __STATEMENT_LABEL__.match(statement)
+    if match is None:
+        return " ".join(statement.split()[:1]).upper() or "OTHER"
+    return f"{match['verb'].upper()} {match['table']}"
+
+class ContentionMetrics:
+    """Count how often, how long and on what we waited on database locks."""
+    def __init__(self, max_labels: int = __MAX_LABELS__) -> None:
+        """Initialise the metrics."""
+        self.max_labels = max_labels
+        self.__lock__ = threading.Lock()
+        self.__labels__: dict[str, dict[str, Any]] = {}
+
+    def record(self, label: str, waited: float, failed: bool = False):
+        """Record a wait of `waited` seconds on whatever `label` names."""
+        with self.__lock__:
+            if (label not in self.__labels__
+                and len(self.__labels__) >= self.max_labels):
+                label = "other"
+            stats = self.__labels__.setdefault(
+                label, {"waits": 0, "wait_time": 0.0, "failures": 0})
+            stats["waits"] = stats["waits"] + 1
+            stats["wait_time"] = stats["wait_time"] + waited
+            stats["failures"] = stats["failures"] + (1 if failed else 0)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return a copy of the metrics collected so far."""
+        with self.__lock__:
+            labels = {
+                label: dict(stats) for label, stats in self.__labels__.items()}
+        return {
+            "waits": sum(stats["waits"] for stats in labels.values()),
+            "wait_time": sum(stats["wait_time"] for stats in labels.values()),
+            "failures": sum(stats["failures"] for stats in labels.values()),
+            "labels": labels
+        }
+
+    def reset(self):
+        """Clear all collected metrics."""
+        with self.__lock__:
+            self.__labels__ = {}
+
+contention_metrics = ContentionMetrics()
+
+def __retry_settings__() -> tuple[int, float, float]:
+    """Retrieve the (retries, base delay, maximum delay) retry settings."""
+    config = current_app.config if has_app_context() else {}
+    return (
+        int(config.get("AUTH_DB_BUSY_RETRIES", settings.AUTH_DB_BUSY_RETRIES)),
+        float(config.get("AUTH_DB_BUSY_BACKOFF_BASE",
+                         settings.AUTH_DB_BUSY_BACKOFF_BASE)),
+        float(config.get("AUTH_DB_BUSY_BACKOFF_MAX",
+                         settings.AUTH_DB_BUSY_BACKOFF_MAX)))
+
+def __is_busy__(exc: sqlite3.Error) -> bool:
+    """Check whether `exc` is due to the database being locked."""
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    errorcode = getattr(exc, "sqlite_errorcode", None)
+    if errorcode is None:
+        return "database is locked" in str(exc)
+    return errorcode & 0xff in (5, 6) # SQLITE_BUSY*, SQLITE_LOCKED*
+
+class TrackingCursor:
+    """Cursor that notes the statements that modify the database."""
+    def __init__(self, cur: sqlite3.Cursor):
+        """Wrap `cur`."""
+        self.__cursor__ = cur
+
+    def __run__(self, run: Callable[[], Any], sql: str) -> Any:
+        """Run the statement `sql`, counting any failure to get a lock."""
+        try:
+            result = run()
+        except sqlite3.Error as exc:
+            if __is_busy__(exc):
+                contention_metrics.record(statement_label(sql), 0.0, failed=True)
+            raise
+        __note_changes__(self.__cursor__)
+        return result
+
+    def execute(self, sql: str, *args, **kwargs):
+        """Execute a single statement."""
+        return self.__run__(
+            lambda: self.__cursor__.execute(sql, *args, **kwargs), sql)
+
+    def executemany(self, sql: str, *args, **kwargs):
+        """Execute `sql` for each set of parameters."""
+        return self.__run__(
+            lambda: self.__cursor__.executemany(sql, *args, **kwargs), sql)
+
+    def fetchone(self):
+        """Fetch single result if present, or `None`."""
+        return self.__cursor__.fetchone()
+
+    def fetchmany(self, *args, **kwargs):
+        """Fetch the next set of results."""
+        return self.__cursor__.fetchmany(*args, **kwargs)
+
+    def fetchall(self):
+        """Fetch all remaining results."""
+        return self.__cursor__.fetchall()
+
+    def __iter__(self):
+        """Iterate over the results."""
+        return iter(self.__cursor__)
+
+    def __getattr__(self, name):
+        """Delegate everything else to the wrapped cursor."""
+        return getattr(self.__cursor__, name)
+
+def commit(conn: DbConnection) -> None:
+    """Commit the transaction on `conn`, counting any failure to get the lock."""
+    try:
+        conn.commit()
+    except sqlite3.Error as exc:
+        if __is_busy__(exc):
+            contention_metrics.record("COMMIT", 0.0, failed=True)
+        raise
+
 @contextlib.contextmanager
 def connection(db_path: str, row_factory: Callable = sqlite3.Row) -> Iterator[DbConnection]:
-    """Create the connection to the auth database."""
-    logging.debug("SQLite3 DB Path: '%s'.", db_path)
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = row_factory
-    conn.set_trace_callback(logging.debug)
-    conn.execute("PRAGMA foreign_keys = ON")
+    """
+    Create the connection to the auth database.
+
+    Nested calls within the same request (or thread) get back the connection
+    that is already open rather than opening a second one that would contend
+    for the same write lock. The connection is only committed and returned to
+    the pool once the outermost caller is done with it.
+    """
+    db_path = str(db_path)
+    scope = __scope__()
+    if db_path in scope:
+        conn, depth = scope[db_path]
+        scope[db_path] = [conn, depth + 1]
+    else:
+        conn = connection_pool(db_path).acquire()
+        conn.row_factory = row_factory
+        scope[db_path] = [conn, 1]
+
     try:
         yield conn
     except sqlite3.Error as exc:
@@ -36,16 +341,27 @@ def connection(db_path: str, row_factory: Callable = sqlite3.Row) -> Iterator[Db
         logging.debug(traceback.format_exc())
         raise exc
     finally:
-        conn.commit()
-        conn.close()
+        scope[db_path][1] -= 1
+        if scope[db_path][1] == 0:
+            del scope[db_path]
+            try:
+                commit(conn)
+            finally:
+                connection_pool(db_path).release(conn)
 
 @contextlib.contextmanager
 def cursor(conn: DbConnection) -> Iterator[DbCursor]:
-    """Get a cursor from the given connection to the auth database."""
+    """
+    Get a cursor from the given connection to the auth database.
+
+    Whatever is run through the cursor is committed as one transaction once
+    the caller is done with it. Use `transaction` instead for writes that
+    should be retried when the database is locked.
+    """
     cur = conn.cursor()
     try:
-        yield cur
-        conn.commit()
+        yield TrackingCursor(cur)
+        commit(conn)
     except sqlite3.Error as exc:
         conn.rollback()
         logging.debug(traceback.format_exc())
@@ -53,6 +369,64 @@ def cursor(conn: DbConnection) -> Iterator[DbCursor]:
     finally:
         cur.close()
 
+def transaction(
+        conn: DbConnection, func: Callable[[DbCursor], Any], label: str) -> Any:
+    """
+    Run `func` with a cursor, as a transaction of its own on `conn`, and
+    commit it. If the database is locked by some other writer, roll the whole
+    transaction back and run it again, with capped exponential backoff and
+    full jitter between attempts. `label` names the transaction in the
+    contention metrics.
+
+    SQLite3 already waits up to `busy_timeout` for each lock, so this only
+    kicks in once that wait is exhausted, or when SQLite3 gives up at once
+    because the lock is held by a transaction that waits on one we hold.
+    Either way the locks we hold must be released before the other side can
+    finish, so no single statement of the transaction is ever retried.
+
+    `func` must not have effects outside the database, since it may run more
+    than once.
+    """
+    if getattr(conn, "in_transaction", False):
+        # Rolling back would also undo the enclosing transaction's work.
+        with cursor(conn) as cur:
+            return func(cur)
+
+    retries, base, maximum = __retry_settings__()
+    attempt = 0
+    while True:
+        try:
+            with cursor(conn) as cur:
+                return func(cur)
+        except sqlite3.Error as exc:
+            if not __is_busy__(exc):
+                raise
+            if attempt >= retries:
+                contention_metrics.record(label, 0.0, failed=True)
+                logging.warning(
+                    "Giving up on transaction '%s' after %s retries.",
+                    label, retries)
+                raise
+            delay = random.uniform(0, min(maximum, base * (2 ** attempt)))
+            time.sleep(delay)
+            contention_metrics.record(label, delay)
+            attempt = attempt + 1
+
+# A subquery selecting each value of a JSON array bound to its one parameter:
+# use as `... WHERE col IN (VALUES_IN)` with `json_values(values)` bound, so
+# that the SQL is the same however many values there are, letting SQLite3
+# reuse the prepared statement, and is not limited by the number of variables
+# a statement may have.
+VALUES_IN = "SELECT value FROM json_each(?)"
+
+def values_in(name: str) -> str:
+    """`VALUES_IN`, for statements with named parameters: bind to `name`."""
+    return f"SELECT value FROM json_each(:{name})"
+
+def json_values(values: Iterable[Any]) -> str:
+    """Encode `values` for binding to the parameter of `VALUES_IN`."""
+    return json.dumps([str(value) for value in values])
+
 def with_db_connection(func: Callable[[DbConnection], Any]) -> Any:
     """
     Takes a function of one argument `func`, whose one argument is a database
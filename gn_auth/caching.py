@@ -0,0 +1,67 @@
+"""Small, thread-safe, in-process caches."""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+class TTLCache:
+    """
+    A cache holding at most `maxsize` entries, each of which expires after at
+    most `ttl` seconds. The least recently used entry is evicted when the
+    cache is full.
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        """Initialise the cache."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.__entries__: OrderedDict = OrderedDict()
+        self.__lock__ = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retrieve the value cached for `key` if it has not expired."""
+        with self.__lock__:
+            entry = self.__entries__.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self.__entries__[key]
+                return default
+            self.__entries__.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Cache `value` under `key` for `ttl` seconds, or for the cache's own
+        `ttl` if that is shorter or `ttl` is not given.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self.__lock__:
+            self.__entries__[key] = (value, time.monotonic() + ttl)
+            self.__entries__.move_to_end(key)
+            while len(self.__entries__) > self.maxsize:
+                self.__entries__.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """Remove the entry for `key`, if any."""
+        with self.__lock__:
+            self.__entries__.pop(key, None)
+
+    def pop_where(self, predicate: Callable[[Any], bool]) -> None:
+        """Remove all entries whose value satisfies `predicate`."""
+        with self.__lock__:
+            for key in [key for key, (value, _expires)
+                        in self.__entries__.items() if predicate(value)]:
+                del self.__entries__[key]
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self.__lock__:
+            self.__entries__.clear()
+
+    def __len__(self) -> int:
+        """The number of entries currently held, including expired ones."""
+        with self.__lock__:
+            return len(self.__entries__)
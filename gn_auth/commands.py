@@ -9,8 +9,7 @@ from typing import Dict, Optional, Tuple, Union, Sequence
 
 
 from redis.client import Redis
-
-from gn_auth.auth.db.redis import RedisConnectionError
+from redis.typing import FieldT, EncodableT
 
 def queue_cmd(conn: Redis,
               job_queue: str,
@@ -29,19 +28,20 @@ are supported:
 Returns the name of the specific redis hash for the specific task.
 
     """
-    if not conn.ping():
-        raise RedisConnectionError
     unique_id = ("cmd::"
                  f"{datetime.now().strftime('%Y-%m-%d%H-%M%S-%M%S-')}"
                  f"{str(uuid4())}")
-    conn.rpush(job_queue, unique_id)
-    for key, value in {
-            "cmd": json.dumps(cmd), "result": "", "status": "queued"}.items():
-        conn.hset(name=unique_id, key=key, value=value)
+    details: Dict[FieldT, EncodableT] = {
+        "cmd": json.dumps(cmd), "result": "", "status": "queued"}
     if email:
-        conn.hset(name=unique_id, key="email", value=email)
+        details["email"] = email
     if env:
-        conn.hset(name=unique_id, key="env", value=json.dumps(env))
+        details["env"] = json.dumps(env)
+    # Queue the job only once its details are saved, in a single round-trip.
+    with conn.pipeline() as pipe:
+        pipe.hset(name=unique_id, mapping=details)
+        pipe.rpush(job_queue, unique_id)
+        pipe.execute()
     return unique_id
 
 def run_cmd(cmd: str,
@@ -1,6 +1,6 @@
 """Handle external processes in a consistent manner."""
 import json
-from typing import Any
+from typing import Any, Sequence
 from uuid import UUID, uuid4
 from datetime import datetime
 
@@ -18,6 +18,29 @@ def job_key(job_id: UUID, namespace_prefix: str = JOBS_NAMESPACE):
     """Build the namespace key for a specific job."""
     return f"{namespace_prefix}::{job_id}"
 
+def results_key(job_id: UUID, namespace_prefix: str = JOBS_NAMESPACE):
+    """Build the key of the list holding a specific job's results."""
+    return f"{job_key(job_id, namespace_prefix)}::results"
+
+def append_results(redisconn: Redis, job_id: UUID, results: Sequence[Any]) -> int:
+    """
+    Append `results` to the job's results, one list entry per result, and
+    return the number of results the job now has.
+
+    Appending only sends the new results, however many the job already has.
+    """
+    if len(results) == 0:
+        return redisconn.llen(results_key(job_id))
+    return redisconn.rpush(
+        results_key(job_id),
+        *(json.dumps(result, cls=jed.CustomJSONEncoder) for result in results))
+
+def job_results(redisconn: Redis, job_id: UUID, offset: int = 0) -> tuple:
+    """Retrieve the job's results, from the `offset`-th result onwards."""
+    return tuple(
+        json.loads(result, object_hook=jed.custom_json_decoder)
+        for result in redisconn.lrange(results_key(job_id), offset, -1))
+
 def job(redisconn: Redis, job_id: UUID) -> Either:
     """Retrive the job details of a job identified by `job_id`."""
     the_job = redisconn.hgetall(job_key(job_id))
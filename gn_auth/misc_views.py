@@ -2,9 +2,13 @@
 Miscellaneous top-level views that have nothing to do with the application's
 functionality.
 """
+import os
 from pathlib import Path
 
-from flask import Blueprint
+from flask import jsonify, Blueprint
+
+from gn_auth.auth.db import sqlite3 as authdb
+from gn_auth.auth.authorisation.checks import authorised_p
 
 misc = Blueprint("misc", __name__)
 
@@ -16,3 +20,15 @@ def version():
         with open(version_file, encoding="utf-8") as verfl:
             return verfl.read().strip()
     return "0.0.0"
+
+@misc.route("/metrics/auth-db-contention")
+@authorised_p(("system:user:list",),
+              error_description=(
+                  "You do not have sufficient privileges to view the auth "
+                  "database contention metrics."))
+def auth_db_contention():
+    """Report how much this worker process has waited on auth database locks."""
+    return jsonify({
+        "pid": os.getpid(),
+        **authdb.contention_metrics.snapshot()
+    })
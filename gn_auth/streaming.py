@@ -0,0 +1,53 @@
+"""
+Stream large listings to the client as they are read from the database.
+
+The rows are fetched in batches and each item is encoded as it is sent, so
+that neither the rows, nor the encoded response, are ever held in memory all
+at once.
+"""
+from itertools import chain, islice
+from typing import Any, Iterable, Iterator
+
+from flask import request, Response, current_app as app, stream_with_context
+
+FETCH_BATCH_SIZE = 1000
+
+NDJSON = "application/x-ndjson"
+
+def fetch_rows(cursor: Any, batch_size: int = FETCH_BATCH_SIZE) -> Iterator:
+    """Yield the rows of the executed `cursor`, `batch_size` rows at a time."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+def json_array(items: Iterable) -> Iterator[str]:
+    """Encode `items` as a JSON array, an item at a time."""
+    separator = "["
+    for item in items:
+        yield f"{separator}{app.json.dumps(item)}"
+        separator = ","
+    yield "[]" if separator == "[" else "]"
+
+def ndjson(items: Iterable) -> Iterator[str]:
+    """Encode `items` as newline-delimited JSON, an item at a time."""
+    for item in items:
+        yield f"{app.json.dumps(item)}\n"
+
+def json_response(items: Iterable) -> Response:
+    """
+    Stream `items` as a JSON array, or as newline-delimited JSON if the client
+    prefers it.
+
+    The first item is read before the response starts so that any error in
+    setting up the listing, e.g. a failed authorisation check, is still
+    reported as an error response.
+    """
+    items = iter(items)
+    first = tuple(islice(items, 1))
+    mimetype = request.accept_mimetypes.best_match(
+        ("application/json", NDJSON), default="application/json")
+    encode = ndjson if mimetype == NDJSON else json_array
+    return Response(
+        stream_with_context(encode(chain(first, items))), mimetype=mimetype)
@@ -0,0 +1,16 @@
+"""
+Index the 'refresh_token' column of the 'oauth2_tokens' table.
+"""
+
+from yoyo import step
+
+__depends__ = {'20231011_01_CS8NZ-create-new-inbredset-group-owner-role'}
+
+steps = [
+    step(
+        """
+        CREATE INDEX IF NOT EXISTS idx_tbl_oauth2_tokens_cols_refresh_token
+        ON oauth2_tokens(refresh_token)
+        """,
+        "DROP INDEX IF EXISTS idx_tbl_oauth2_tokens_cols_refresh_token")
+]
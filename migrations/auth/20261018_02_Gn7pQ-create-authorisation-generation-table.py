@@ -0,0 +1,51 @@
+"""
+Create the 'authorisation_generation' table, and the triggers that bump the
+generation whenever anything that affects a user's privileges changes.
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_01_Rk4vT-index-oauth2-tokens-refresh-token'}
+
+__TRACKED_TABLES__ = (
+    "user_roles", "role_privileges", "group_users", "resources",
+    "resource_ownership")
+
+def __trigger_step__(table, event):
+    """Build the step that bumps the generation on `event` in `table`."""
+    trigger = f"trg_bump_authorisation_generation_{table}_{event.lower()}"
+    return step(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {trigger}
+        AFTER {event} ON {table}
+        BEGIN
+          UPDATE authorisation_generation SET generation=generation+1
+          WHERE generation_key='authorisation';
+        END
+        """,
+        f"DROP TRIGGER IF EXISTS {trigger}")
+
+steps = [
+    step(
+        """
+        CREATE TABLE IF NOT EXISTS authorisation_generation(
+            generation_key TEXT NOT NULL,
+            generation INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(generation_key)
+        ) WITHOUT ROWID
+        """,
+        "DROP TABLE IF EXISTS authorisation_generation"),
+    step(
+        """
+        INSERT INTO authorisation_generation(generation_key, generation)
+        VALUES ('authorisation', 0)
+        """,
+        """
+        DELETE FROM authorisation_generation
+        WHERE generation_key='authorisation'
+        """)
+] + [
+    __trigger_step__(table, event)
+    for table in __TRACKED_TABLES__
+    for event in ("INSERT", "UPDATE", "DELETE")
+]
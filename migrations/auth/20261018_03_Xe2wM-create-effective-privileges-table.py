@@ -0,0 +1,99 @@
+"""
+Create the 'effective_privileges' table: the privileges each user holds on
+each resource, and the role each one comes from. Triggers on 'user_roles' and
+'role_privileges' keep it up to date.
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_02_Gn7pQ-create-authorisation-generation-table'}
+
+__GRANT_USER_ROLE__ = """
+          INSERT OR IGNORE INTO
+            effective_privileges(user_id, resource_id, privilege_id, role_id)
+          SELECT NEW.user_id, NEW.resource_id, rp.privilege_id, NEW.role_id
+          FROM role_privileges AS rp WHERE rp.role_id=NEW.role_id;
+"""
+
+__REVOKE_USER_ROLE__ = """
+          DELETE FROM effective_privileges
+          WHERE user_id=OLD.user_id AND resource_id=OLD.resource_id
+          AND role_id=OLD.role_id;
+"""
+
+__GRANT_ROLE_PRIVILEGE__ = """
+          INSERT OR IGNORE INTO
+            effective_privileges(user_id, resource_id, privilege_id, role_id)
+          SELECT ur.user_id, ur.resource_id, NEW.privilege_id, NEW.role_id
+          FROM user_roles AS ur WHERE ur.role_id=NEW.role_id;
+"""
+
+__REVOKE_ROLE_PRIVILEGE__ = """
+          DELETE FROM effective_privileges
+          WHERE role_id=OLD.role_id AND privilege_id=OLD.privilege_id;
+"""
+
+def __trigger_step__(trigger, event, table, body):
+    """Build the step that creates the trigger."""
+    return step(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {trigger}
+        AFTER {event} ON {table}
+        BEGIN
+          {body}
+        END
+        """,
+        f"DROP TRIGGER IF EXISTS {trigger}")
+
+steps = [
+    step(
+        """
+        CREATE TABLE IF NOT EXISTS effective_privileges(
+            user_id TEXT NOT NULL,
+            resource_id TEXT NOT NULL,
+            privilege_id TEXT NOT NULL,
+            role_id TEXT NOT NULL,
+            PRIMARY KEY(user_id, resource_id, privilege_id, role_id)
+        ) WITHOUT ROWID
+        """,
+        "DROP TABLE IF EXISTS effective_privileges"),
+    step(
+        """
+        CREATE INDEX IF NOT EXISTS idx_tbl_effective_privileges_cols_role_id
+        ON effective_privileges(role_id, privilege_id)
+        """,
+        "DROP INDEX IF EXISTS idx_tbl_effective_privileges_cols_role_id"),
+    step(
+        """
+        CREATE INDEX IF NOT EXISTS idx_tbl_user_roles_cols_role_id
+        ON user_roles(role_id)
+        """,
+        "DROP INDEX IF EXISTS idx_tbl_user_roles_cols_role_id"),
+    step(
+        """
+        INSERT OR IGNORE INTO
+          effective_privileges(user_id, resource_id, privilege_id, role_id)
+        SELECT ur.user_id, ur.resource_id, rp.privilege_id, ur.role_id
+        FROM user_roles AS ur
+        INNER JOIN role_privileges AS rp ON ur.role_id=rp.role_id
+        """,
+        "DELETE FROM effective_privileges"),
+    __trigger_step__(
+        "trg_effective_privileges_user_roles_insert", "INSERT", "user_roles",
+        __GRANT_USER_ROLE__),
+    __trigger_step__(
+        "trg_effective_privileges_user_roles_delete", "DELETE", "user_roles",
+        __REVOKE_USER_ROLE__),
+    __trigger_step__(
+        "trg_effective_privileges_user_roles_update", "UPDATE", "user_roles",
+        __REVOKE_USER_ROLE__ + __GRANT_USER_ROLE__),
+    __trigger_step__(
+        "trg_effective_privileges_role_privileges_insert", "INSERT",
+        "role_privileges", __GRANT_ROLE_PRIVILEGE__),
+    __trigger_step__(
+        "trg_effective_privileges_role_privileges_delete", "DELETE",
+        "role_privileges", __REVOKE_ROLE_PRIVILEGE__),
+    __trigger_step__(
+        "trg_effective_privileges_role_privileges_update", "UPDATE",
+        "role_privileges", __REVOKE_ROLE_PRIVILEGE__ + __GRANT_ROLE_PRIVILEGE__)
+]
@@ -0,0 +1,95 @@
+"""
+Create the 'data_resources_index' table: the resource each item of linked
+data belongs to, keyed by the names that traits are requested by. Triggers on
+the '*_resources' and 'linked_*_data' tables keep it up to date.
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_03_Xe2wM-create-effective-privileges-table'}
+
+# (resource category, data-to-resource table, linked-data table, trait name)
+__LINKED_DATA__ = (
+    ("phenotype", "phenotype_resources", "linked_phenotype_data",
+     "CAST(ld.PublishXRefId AS TEXT)"),
+    ("genotype", "genotype_resources", "linked_genotype_data", "''"),
+    ("mrna", "mrna_resources", "linked_mrna_data", "''"))
+
+def __index_rows__(category, resources_table, linked_table, trait_name):
+    """Select the index rows for data linked through `resources_table`."""
+    return f"""
+          SELECT '{category}', ld.dataset_name, {trait_name},
+                 dr.data_link_id, dr.resource_id
+          FROM {resources_table} AS dr
+          INNER JOIN {linked_table} AS ld ON dr.data_link_id=ld.data_link_id
+          WHERE ld.dataset_name IS NOT NULL"""
+
+__INSERT_INDEX_ROWS__ = """
+          INSERT OR IGNORE INTO data_resources_index(
+            resource_category_key, dataset_name, trait_name, data_link_id,
+            resource_id)"""
+
+def __trigger_step__(trigger, event, table, body):
+    """Build the step that creates the trigger."""
+    return step(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {trigger}
+        AFTER {event} ON {table}
+        BEGIN
+          {body}
+        END
+        """,
+        f"DROP TRIGGER IF EXISTS {trigger}")
+
+def __trigger_steps__(category, resources_table, linked_table, trait_name):
+    """Build the steps that keep the index up to date for one category."""
+    rows = __index_rows__(category, resources_table, linked_table, trait_name)
+    link = (f"{__INSERT_INDEX_ROWS__}{rows}\n"
+            "          AND dr.data_link_id=NEW.data_link_id;")
+    unlink = """
+          DELETE FROM data_resources_index
+          WHERE data_link_id=OLD.data_link_id;"""
+    return [
+        __trigger_step__(
+            f"trg_data_resources_index_{resources_table}_insert", "INSERT",
+            resources_table, link),
+        __trigger_step__(
+            f"trg_data_resources_index_{resources_table}_delete", "DELETE",
+            resources_table, unlink),
+        __trigger_step__(
+            f"trg_data_resources_index_{resources_table}_update", "UPDATE",
+            resources_table, unlink + link),
+        __trigger_step__(
+            f"trg_data_resources_index_{linked_table}_update", "UPDATE",
+            linked_table, unlink + link)
+    ]
+
+steps = [
+    step(
+        """
+        CREATE TABLE IF NOT EXISTS data_resources_index(
+            resource_category_key TEXT NOT NULL,
+            dataset_name TEXT NOT NULL,
+            trait_name TEXT NOT NULL, -- empty unless the data is per-trait
+            data_link_id TEXT NOT NULL,
+            resource_id TEXT NOT NULL,
+            PRIMARY KEY(
+              resource_category_key, dataset_name, trait_name, data_link_id)
+        ) WITHOUT ROWID
+        """,
+        "DROP TABLE IF EXISTS data_resources_index"),
+    step(
+        """
+        CREATE INDEX IF NOT EXISTS idx_tbl_data_resources_index_cols_data_link_id
+        ON data_resources_index(data_link_id)
+        """,
+        "DROP INDEX IF EXISTS idx_tbl_data_resources_index_cols_data_link_id"),
+] + [
+    step(f"{__INSERT_INDEX_ROWS__}{__index_rows__(*linked)}",
+         "DELETE FROM data_resources_index")
+    for linked in __LINKED_DATA__
+] + [
+    trigger_step
+    for linked in __LINKED_DATA__
+    for trigger_step in __trigger_steps__(*linked)
+]
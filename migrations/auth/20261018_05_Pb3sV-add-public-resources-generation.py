@@ -0,0 +1,52 @@
+"""
+Add the 'public-resources' generation, and the triggers that bump it whenever
+the set of public resources, or anything listed about them, changes.
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_04_Tq8dL-create-data-resources-index-table'}
+
+__BUMP__ = """
+          UPDATE authorisation_generation SET generation=generation+1
+          WHERE generation_key='public-resources';
+"""
+
+def __trigger_step__(trigger, event, table, condition):
+    """Build the step that bumps the generation on `event` in `table`."""
+    return step(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {trigger}
+        AFTER {event} ON {table}
+        {condition}
+        BEGIN
+          {__BUMP__}
+        END
+        """,
+        f"DROP TRIGGER IF EXISTS {trigger}")
+
+steps = [
+    # Start from a random generation so that a database that is re-created
+    # does not repeat generations that processes might still have cached.
+    step(
+        """
+        INSERT INTO authorisation_generation(generation_key, generation)
+        VALUES ('public-resources', abs(random() % 1000000000000))
+        """,
+        """
+        DELETE FROM authorisation_generation
+        WHERE generation_key='public-resources'
+        """),
+    __trigger_step__(
+        "trg_bump_public_resources_generation_resources_insert", "INSERT",
+        "resources", "WHEN NEW.public=1"),
+    __trigger_step__(
+        "trg_bump_public_resources_generation_resources_delete", "DELETE",
+        "resources", "WHEN OLD.public=1"),
+    __trigger_step__(
+        "trg_bump_public_resources_generation_resources_update", "UPDATE",
+        "resources", "WHEN OLD.public=1 OR NEW.public=1"),
+    __trigger_step__(
+        "trg_bump_public_resources_generation_resource_categories_update",
+        "UPDATE", "resource_categories", "")
+]
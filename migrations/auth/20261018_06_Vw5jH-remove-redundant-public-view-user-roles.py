@@ -0,0 +1,24 @@
+"""
+Remove the 'public-view' user roles on public resources: every user now holds
+that role on every public resource implicitly, when their privileges are
+checked, so storing it for each user is redundant.
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_05_Pb3sV-add-public-resources-generation'}
+
+steps = [
+    step(
+        """
+        DELETE FROM user_roles
+        WHERE role_id=(SELECT role_id FROM roles WHERE role_name='public-view')
+        AND resource_id IN (SELECT resource_id FROM resources WHERE public=1)
+        """,
+        """
+        INSERT OR IGNORE INTO user_roles(user_id, role_id, resource_id)
+        SELECT u.user_id, r.role_id, res.resource_id
+        FROM users AS u CROSS JOIN roles AS r CROSS JOIN resources AS res
+        WHERE r.role_name='public-view' AND res.public=1
+        """)
+]
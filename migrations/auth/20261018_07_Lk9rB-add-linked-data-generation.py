@@ -0,0 +1,43 @@
+"""
+Add the 'linked-data' generation, and the triggers that bump it whenever data
+is linked to, or unlinked from, a group.
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_06_Vw5jH-remove-redundant-public-view-user-roles'}
+
+__LINKED_TABLES__ = (
+    "linked_mrna_data", "linked_genotype_data", "linked_phenotype_data")
+
+def __trigger_step__(table, event):
+    """Build the step that bumps the generation on `event` in `table`."""
+    trigger = f"trg_bump_linked_data_generation_{table}_{event.lower()}"
+    return step(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {trigger}
+        AFTER {event} ON {table}
+        BEGIN
+          UPDATE authorisation_generation SET generation=generation+1
+          WHERE generation_key='linked-data';
+        END
+        """,
+        f"DROP TRIGGER IF EXISTS {trigger}")
+
+steps = [
+    # Start from a random generation so that a database that is re-created
+    # does not repeat generations that processes might still have cached.
+    step(
+        """
+        INSERT INTO authorisation_generation(generation_key, generation)
+        VALUES ('linked-data', abs(random() % 1000000000000))
+        """,
+        """
+        DELETE FROM authorisation_generation
+        WHERE generation_key='linked-data'
+        """)
+] + [
+    __trigger_step__(table, event)
+    for table in __LINKED_TABLES__
+    for event in ("INSERT", "DELETE", "UPDATE")
+]
@@ -0,0 +1,53 @@
+"""
+Create the 'linked_phenotype_search_index' table: the keys that phenotype
+search results are filtered by, for each trait that is linked to a group.
+
+The species and group names live in GN3, so rows are added by the search jobs
+for any linked traits that are not yet indexed. Triggers on the
+'linked_phenotype_data' table drop the rows of traits that are unlinked, or
+changed, so that they are never stale.
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_07_Lk9rB-add-linked-data-generation'}
+
+def __trigger_step__(event):
+    """Build the step that drops the index row on `event`."""
+    trigger = f"trg_linked_phenotype_search_index_{event.lower()}"
+    return step(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {trigger}
+        AFTER {event} ON linked_phenotype_data
+        BEGIN
+          DELETE FROM linked_phenotype_search_index
+          WHERE data_link_id=OLD.data_link_id;
+        END
+        """,
+        f"DROP TRIGGER IF EXISTS {trigger}")
+
+steps = [
+    step(
+        """
+        CREATE TABLE IF NOT EXISTS linked_phenotype_search_index(
+            species_name TEXT NOT NULL, -- Species.Name in MariaDB
+            group_name TEXT NOT NULL, -- InbredSet.InbredSetName in MariaDB
+            dataset_name TEXT NOT NULL, -- PublishFreeze.Name in MariaDB
+            trait_name TEXT NOT NULL, -- PublishXRef.Id in MariaDB
+            data_link_id TEXT NOT NULL,
+            PRIMARY KEY(
+              species_name, group_name, dataset_name, trait_name, data_link_id)
+        ) WITHOUT ROWID
+        """,
+        "DROP TABLE IF EXISTS linked_phenotype_search_index"),
+    step(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS
+        idx_tbl_linked_phenotype_search_index_cols_data_link_id
+        ON linked_phenotype_search_index(data_link_id)
+        """,
+        """
+        DROP INDEX IF EXISTS
+        idx_tbl_linked_phenotype_search_index_cols_data_link_id
+        """)
+] + [__trigger_step__(event) for event in ("DELETE", "UPDATE")]
@@ -0,0 +1,45 @@
+"""
+Add the 'tokens' generation, and the triggers that bump it whenever a token
+is revoked, refreshed or deleted, or its client is changed or deleted.
+
+Issuing a new token does not bump it: no token that is already cached is
+affected by that.
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_08_Pd3sK-create-linked-phenotype-search-index-table'}
+
+__TRACKED_TABLES__ = ("oauth2_tokens", "oauth2_clients")
+
+def __trigger_step__(table, event):
+    """Build the step that bumps the generation on `event` in `table`."""
+    trigger = f"trg_bump_tokens_generation_{table}_{event.lower()}"
+    return step(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {trigger}
+        AFTER {event} ON {table}
+        BEGIN
+          UPDATE authorisation_generation SET generation=generation+1
+          WHERE generation_key='tokens';
+        END
+        """,
+        f"DROP TRIGGER IF EXISTS {trigger}")
+
+steps = [
+    # Start from a random generation so that a database that is re-created
+    # does not repeat generations that processes might still have cached.
+    step(
+        """
+        INSERT INTO authorisation_generation(generation_key, generation)
+        VALUES ('tokens', abs(random() % 1000000000000))
+        """,
+        """
+        DELETE FROM authorisation_generation
+        WHERE generation_key='tokens'
+        """)
+] + [
+    __trigger_step__(table, event)
+    for table in __TRACKED_TABLES__
+    for event in ("UPDATE", "DELETE")
+]
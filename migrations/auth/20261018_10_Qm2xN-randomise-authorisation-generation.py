@@ -0,0 +1,18 @@
+"""
+Move the 'authorisation' generation to a random value, so that a database
+that is re-created does not repeat generations that processes might still
+have cached. The later generations already start from random values.
+"""
+
+from yoyo import step
+
+__depends__ = {'20261018_09_Ht6wZ-add-tokens-generation'}
+
+steps = [
+    step(
+        """
+        UPDATE authorisation_generation
+        SET generation=abs(random() % 1000000000000)
+        WHERE generation_key='authorisation'
+        """)
+]
@@ -4,43 +4,88 @@ A script to do search for phenotype traits using the Xapian Search endpoint.
 import uuid
 import json
 import traceback
+from collections import deque
 from urllib.parse import urljoin
-from typing import Any, Iterable
 from datetime import datetime, timedelta
+from typing import Any, Iterable, Iterator, Optional
+from concurrent.futures import ThreadPoolExecutor
 
 import click
 import redis
 import requests
+from requests.adapters import HTTPAdapter
 
 from gn_auth import jobs
 from gn_auth.auth.db import mariadb as gn3db
 from gn_auth.auth.db import sqlite3 as authdb
 from gn_auth.settings import SQL_URI, AUTH_DB
-from gn_auth.auth.authorisation.data.phenotypes import linked_phenotype_data
+from gn_auth.auth.authorisation.data.phenotypes import linked_phenotype_keys
 
 class NoSearchResults(Exception):
     """Raise when there are no results for a search."""
 
-def do_search(
-        host: str, query: str, per_page: int, page: int = 1) -> Iterable[dict[str, Any]]:
+def do_search(# pylint: disable=[too-many-arguments]
+        host: str, query: str, per_page: int, page: int = 1,
+        session: Optional[requests.Session] = None) -> Iterable[dict[str, Any]]:
     """Do the search and return the results"""
     search_uri = urljoin(host, (f"search/?page={page}&per_page={per_page}"
                                 f"&type=phenotype&query={query}"))
-    response = requests.get(search_uri)
+    response = (session or requests).get(search_uri)
     results = response.json()
     if len(results) > 0:
         return (item for item in results)
     raise NoSearchResults(f"No results for search '{query}'")
 
+def search_session(prefetch: int) -> requests.Session:
+    """
+    A session that keeps its connections to the search host alive, with
+    enough of them for `prefetch` concurrent requests.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, prefetch))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def search_pages(# pylint: disable=[too-many-arguments]
+        session: requests.Session, host: str, query: str, per_page: int,
+        prefetch: int = 2) -> Iterator[tuple[dict[str, Any], ...]]:
+    """
+    Yield the pages of the search results, in order, until the search runs
+    out of pages.
+
+    The next `prefetch` pages are fetched in the background while a page is
+    being used, and no more are fetched once the caller stops iterating.
+    """
+    def __fetch__(page: int) -> tuple[dict[str, Any], ...]:
+        return tuple(do_search(host, query, per_page, page, session))
+
+    prefetch = max(1, prefetch)
+    executor = ThreadPoolExecutor(max_workers=prefetch)
+    try:
+        pending = deque(
+            executor.submit(__fetch__, page) for page in range(1, prefetch + 1))
+        next_page = prefetch + 1
+        while len(pending) > 0:
+            try:
+                results = pending.popleft().result()
+            except NoSearchResults as _nsr:
+                return
+            pending.append(executor.submit(__fetch__, next_page))
+            next_page = next_page + 1
+            yield results
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
 def __filter_object__(search_item):
     return (search_item["species"], search_item["group"],
             search_item["dataset"], search_item["name"])
 
-def remove_selected(search_results, selected: tuple):
+def remove_selected(search_results, selected: frozenset):
     """Remove any item that the user has selected."""
     return (item for item in search_results if __filter_object__(item) not in selected)
 
-def remove_linked(search_results, linked: tuple):
+def remove_linked(search_results, linked: frozenset):
     """Remove any item that has been already linked to a user group."""
     return (item for item in search_results if __filter_object__(item) not in linked)
 
@@ -48,16 +93,16 @@ def update_status(redisconn: redis.Redis, redisname, status: str):
     """Update the status of the search."""
     redisconn.hset(redisname, "status", json.dumps(status))
 
-def update_search_results(redisconn: redis.Redis, redisname: str,
+def update_search_results(redisconn: redis.Redis, job_id: uuid.UUID,
                           results: tuple[dict[str, Any], ...]):
-    """Save the results to redis db."""
-    key = "search_results"
-    prev_results = tuple(json.loads(redisconn.hget(redisname, key) or "[]"))
-    redisconn.hset(redisname, key, json.dumps(prev_results + results))
+    """Append the new results to those saved in the redis db."""
+    jobs.append_results(redisconn, job_id, results)
 
-def expire_redis_results(redisconn: redis.Redis, redisname: str):
+def expire_redis_results(redisconn: redis.Redis, job_id: uuid.UUID):
     """Expire the results after a while to ensure they are cleaned up."""
-    redisconn.expireat(redisname, datetime.now() + timedelta(minutes=30))
+    expiry = datetime.now() + timedelta(minutes=30)
+    redisconn.expireat(jobs.job_key(job_id), expiry)
+    redisconn.expireat(jobs.results_key(job_id), expiry)
 
 @click.command()
 @click.argument("species")
@@ -67,6 +112,9 @@ def expire_redis_results(redisconn: redis.Redis, redisname: str):
     "--host", default="http://localhost:8080/api/", help="The URI to GN3.")
 @click.option("--per-page", default=10000, help="Number of results per page.")
 @click.option("--selected", default="[]", help="Selected traits.")
+@click.option(
+    "--prefetch", default=2,
+    help="Number of search pages to fetch ahead of the one being filtered.")
 @click.option(
     "--auth-db-uri", default=AUTH_DB, help="The SQL URI to the auth database.")
 @click.option(
@@ -77,7 +125,8 @@ def expire_redis_results(redisconn: redis.Redis, redisname: str):
     help="The URI to the redis server.")
 def search(# pylint: disable=[too-many-arguments, too-many-locals]
         species: str, query: str, job_id: uuid.UUID, host: str, per_page: int,
-        selected: str, auth_db_uri: str, gn3_db_uri: str, redis_uri: str):
+        selected: str, prefetch: int, auth_db_uri: str, gn3_db_uri: str,
+        redis_uri: str):
     """
     Search for phenotype traits, filtering out any linked and selected traits,
     loading more and more pages until the `per_page` quota is fulfilled or the
@@ -88,37 +137,36 @@ def search(# pylint: disable=[too-many-arguments, too-many-locals]
           gn3db.database_connection(gn3_db_uri) as gn3conn,
           redis.Redis.from_url(redis_uri, decode_responses=True) as redisconn):
         update_status(redisconn, redisname, "started")
-        update_search_results(redisconn, redisname, tuple()) # init search results
+        redisconn.delete(jobs.results_key(job_id)) # init search results
         try:
             search_query = f"species:{species}" + (
                 f" AND ({query})" if bool(query) else "")
-            selected_traits = tuple(
-                (item["species"], item["group"], item["dataset"], item["name"])
-                for item in json.loads(selected))
-            linked = tuple(
-                (row["SpeciesName"], row["InbredSetName"], row["dataset_name"],
-                 str(row["PublishXRefId"]))
-                for row in linked_phenotype_data(authconn, gn3conn, species))
-            page = 1
+            selected_traits = frozenset(
+                __filter_object__(item) for item in json.loads(selected))
+            linked = linked_phenotype_keys(authconn, gn3conn, species)
+            # Release the write lock taken to index newly linked traits, rather
+            # than holding it for as long as the search runs.
+            authdb.commit(authconn)
             count = 0
-            while count < per_page:
-                results = tuple(remove_linked(
-                    remove_selected(
-                        do_search(host, search_query, per_page, page),
-                        selected_traits),
-                    linked))[0:per_page-count]
-                count = count + len(results)
-                page = page + 1
-                update_search_results(redisconn, redisname, results)
+            with search_session(prefetch) as session:
+                for page_results in search_pages(
+                        session, host, search_query, per_page, prefetch):
+                    results = tuple(remove_linked(
+                        remove_selected(page_results, selected_traits),
+                        linked))[0:per_page-count]
+                    count = count + len(results)
+                    update_search_results(redisconn, job_id, results)
+                    if count >= per_page:
+                        break
         except NoSearchResults as _nsr:
             pass
         except Exception as _exc: # pylint: disable=[broad-except]
             update_status(redisconn, redisname, "failed")
             redisconn.hset(redisname, "exception", json.dumps(traceback.format_exc()))
-            expire_redis_results(redisconn, redisname)
+            expire_redis_results(redisconn, job_id)
             return 1
         update_status(redisconn, redisname, "completed")
-        expire_redis_results(redisconn, redisname)
+        expire_redis_results(redisconn, job_id)
         return 0
 
 if __name__ == "__main__":
@@ -0,0 +1,66 @@
+"""Test finding the resources that data is linked to."""
+import uuid
+
+import pytest
+
+from gn_auth.auth.db import sqlite3 as db
+from gn_auth.auth.authorisation.resources.data import data_resources
+from gn_auth.auth.authorisation.resources.models import (
+    user_resources, user_resources_among)
+
+from tests.unit.auth import conftest
+
+@pytest.mark.unit_test
+def test_data_resources_follow_links(fxtr_resources):
+    """
+    GIVEN: phenotype data and a phenotype resource
+    WHEN: the data is linked to, then unlinked from, the resource
+    THEN: check that the data is found on the resource only while linked
+    """
+    conn, _resources = fxtr_resources
+    resource = conftest.TEST_RESOURCES_GROUP_01[1]
+    data_link_id = str(uuid.uuid4())
+    key = ("phenotype", "BXDPublish", "10001")
+    with db.cursor(conn) as cursor:
+        cursor.execute(
+            "INSERT INTO linked_phenotype_data(data_link_id, group_id, "
+            "SpeciesId, InbredSetId, PublishFreezeId, dataset_name, "
+            "PublishXRefId) VALUES (?, ?, 1, 1, 1, 'BXDPublish', 10001)",
+            (data_link_id, str(conftest.TEST_GROUP_01.group_id)))
+        cursor.execute(
+            "INSERT INTO phenotype_resources(resource_id, data_link_id) "
+            "VALUES (?, ?)",
+            (str(resource.resource_id), data_link_id))
+    linked = data_resources(conn, (key, ("phenotype", "BXDPublish", "10002")))
+
+    with db.cursor(conn) as cursor:
+        cursor.execute(
+            "DELETE FROM phenotype_resources WHERE data_link_id=?",
+            (data_link_id,))
+        cursor.execute(
+            "DELETE FROM linked_phenotype_data WHERE data_link_id=?",
+            (data_link_id,))
+    unlinked = data_resources(conn, (key,))
+
+    assert linked == {key: (resource.resource_id,)}
+    assert unlinked == {}
+
+@pytest.mark.unit_test
+@pytest.mark.parametrize("user", conftest.TEST_USERS)
+def test_user_resources_among_agrees_with_user_resources(
+        fxtr_group_user_roles, user):
+    """
+    GIVEN: some resources in the database
+    WHEN: the user's resources are checked among all the resources
+    THEN: check that they are the same as the resources listed for the user
+    """
+    conn, *_others = fxtr_group_user_roles
+    with db.cursor(conn) as cursor:
+        cursor.execute("SELECT resource_id FROM resources")
+        resource_ids = tuple(
+            uuid.UUID(row["resource_id"]) for row in cursor.fetchall())
+
+    assert (sorted(user_resources_among(conn, user, resource_ids),
+                   key=lambda res: res.resource_id) ==
+            sorted(user_resources(conn, user),
+                   key=lambda res: res.resource_id))
@@ -0,0 +1,93 @@
+"""Test that the 'effective_privileges' table is kept up to date."""
+import uuid
+
+import pytest
+
+from gn_auth.auth.db import sqlite3 as db
+from gn_auth.auth.authorisation.users.models import user_resource_roles
+
+from tests.unit.auth.fixtures.role_fixtures import RESOURCE_READER_ROLE
+
+def __effective__(cursor, user, resource):
+    cursor.execute(
+        "SELECT privilege_id FROM effective_privileges "
+        "WHERE user_id=? AND resource_id=?",
+        (str(user.user_id), str(resource.resource_id)))
+    return sorted(row["privilege_id"] for row in cursor.fetchall())
+
+@pytest.mark.unit_test
+def test_effective_privileges_follow_roles_and_privileges(
+        fxtr_users, fxtr_roles, fxtr_resources):# pylint: disable=[unused-argument]
+    """
+    GIVEN: a user and a role
+    WHEN: the role is assigned, gains a privilege, and is unassigned
+    THEN: check that the user's effective privileges follow each change
+    """
+    conn, users = fxtr_users
+    _conn, resources = fxtr_resources
+    user, resource = users[1], resources[0]
+    user_role = {
+        "user_id": str(user.user_id),
+        "role_id": str(RESOURCE_READER_ROLE.role_id),
+        "resource_id": str(resource.resource_id)
+    }
+    with db.cursor(conn) as cursor:
+        cursor.execute(
+            "INSERT INTO user_roles(user_id, role_id, resource_id) "
+            "VALUES (:user_id, :role_id, :resource_id)",
+            user_role)
+        assigned = __effective__(cursor, user, resource)
+
+        cursor.execute(
+            "INSERT INTO role_privileges(role_id, privilege_id) "
+            "VALUES (?, 'group:resource:delete-resource')",
+            (user_role["role_id"],))
+        extended = __effective__(cursor, user, resource)
+
+        cursor.execute(
+            "DELETE FROM role_privileges WHERE role_id=? "
+            "AND privilege_id='group:resource:delete-resource'",
+            (user_role["role_id"],))
+        cursor.execute(
+            "DELETE FROM user_roles WHERE user_id=:user_id "
+            "AND role_id=:role_id AND resource_id=:resource_id",
+            user_role)
+        unassigned = __effective__(cursor, user, resource)
+
+    assert assigned == ["group:resource:view-resource"]
+    assert extended == [
+        "group:resource:delete-resource", "group:resource:view-resource"]
+    assert unassigned == []
+
+@pytest.mark.unit_test
+def test_roles_without_privileges_are_listed(fxtr_users, fxtr_resources):
+    """
+    GIVEN: a user assigned a role that grants no privileges
+    WHEN: the user's roles on resources are listed
+    THEN: check that the role is listed, with no privileges
+    """
+    conn, users = fxtr_users
+    _conn, resources = fxtr_resources
+    user, resource = users[1], resources[0]
+    role_id = uuid.uuid4()
+    with db.cursor(conn) as cursor:
+        cursor.execute(
+            "INSERT INTO roles(role_id, role_name, user_editable) "
+            "VALUES (?, 'no-privileges', 1)",
+            (str(role_id),))
+        cursor.execute(
+            "INSERT INTO user_roles(user_id, role_id, resource_id) "
+            "VALUES (?, ?, ?)",
+            (str(user.user_id), str(role_id), str(resource.resource_id)))
+    try:
+        roles = user_resource_roles(conn, user)
+    finally:
+        with db.cursor(conn) as cursor:
+            cursor.execute("DELETE FROM user_roles WHERE role_id=?",
+                           (str(role_id),))
+            cursor.execute("DELETE FROM roles WHERE role_id=?", (str(role_id),))
+
+    assert tuple(
+        (role.role_name, role.privileges)
+        for role in roles[resource.resource_id]
+        if role.role_id == role_id) == (("no-privileges", tuple()),)
@@ -0,0 +1,64 @@
+"""Test the single-pass grouping of rows."""
+import uuid
+
+import pytest
+
+from gn_auth.auth.authorisation.roles import Role
+from gn_auth.auth.authorisation.privileges import Privilege
+from gn_auth.auth.authorisation.grouping import group_by
+from gn_auth.auth.authorisation.roles.models import roles_from_rows
+
+@pytest.mark.unit_test
+def test_group_by_keeps_the_order_of_keys_and_values():
+    """
+    GIVEN: items with repeated keys
+    WHEN: the items are grouped by their key
+    THEN: check that groups follow the first appearance of their keys and that
+          each group keeps the order of its items
+    """
+    items = (("b", 1), ("a", 2), ("b", 3), ("c", 4), ("a", 5))
+    assert group_by(items, lambda item: item[0]) == {
+        "b": (("b", 1), ("b", 3)), "a": (("a", 2), ("a", 5)), "c": (("c", 4),)}
+    assert tuple(group_by(
+        items, lambda item: item[0], lambda item: item[1]).items()) == (
+            ("b", (1, 3)), ("a", (2, 5)), ("c", (4,)))
+
+@pytest.mark.unit_test
+def test_roles_from_rows_builds_each_role_with_all_its_privileges():
+    """
+    GIVEN: joined role and privilege rows, on two resources
+    WHEN: the rows are grouped by resource, and each group built into roles
+    THEN: check that each resource gets each of its roles once, holding all the
+          role's privileges, in the order of the rows
+    """
+    res_a, res_b = uuid.uuid4(), uuid.uuid4()
+    reader, editor = uuid.uuid4(), uuid.uuid4()
+    def __row__(resource_id, role_id, role_name, editable, priv):
+        return {
+            "resource_id": str(resource_id),
+            "role_id": str(role_id),
+            "role_name": role_name,
+            "user_editable": editable,
+            "privilege_id": priv,
+            "privilege_description": f"Can {priv}"
+        }
+    rows = (
+        __row__(res_a, reader, "reader", 0, "view"),
+        __row__(res_b, editor, "editor", 1, "view"),
+        __row__(res_a, editor, "editor", 1, "view"),
+        __row__(res_b, editor, "editor", 1, "edit"),
+        __row__(res_a, editor, "editor", 1, "edit"))
+
+    assert {
+        uuid.UUID(resource_id): roles_from_rows(resource_rows)
+        for resource_id, resource_rows in group_by(
+            rows, lambda row: row["resource_id"]).items()
+    } == {
+        res_a: (
+            Role(reader, "reader", False, (Privilege("view", "Can view"),)),
+            Role(editor, "editor", True, (Privilege("view", "Can view"),
+                                          Privilege("edit", "Can edit")))),
+        res_b: (
+            Role(editor, "editor", True, (Privilege("view", "Can view"),
+                                          Privilege("edit", "Can edit"))),)
+    }
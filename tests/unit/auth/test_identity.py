@@ -0,0 +1,45 @@
+"""Test the request-scoped facts about users."""
+import pytest
+from pymonad.maybe import Nothing
+
+from gn_auth.auth.db import sqlite3 as db
+from gn_auth.auth.authorisation.identity import identity_fact
+from gn_auth.auth.authorisation.resources.groups.models import user_group
+
+@pytest.mark.unit_test
+def test_facts_are_loaded_once_per_request(fxtr_app, fxtr_users):
+    """
+    GIVEN: a user
+    WHEN: the same fact about the user is needed repeatedly in a request
+    THEN: check that the fact is only loaded the first time
+    """
+    _conn, users = fxtr_users
+    loads = []
+    def __load__():
+        loads.append(1)
+        return "the-fact"
+
+    with fxtr_app.test_request_context():
+        assert identity_fact(users[0], "a-fact", __load__) == "the-fact"
+        assert identity_fact(users[0], "a-fact", __load__) == "the-fact"
+    assert len(loads) == 1
+
+    with fxtr_app.test_request_context():
+        identity_fact(users[0], "a-fact", __load__)
+    assert len(loads) == 2, "Facts should not outlive the request."
+
+@pytest.mark.unit_test
+def test_facts_are_reloaded_after_writes(fxtr_app, fxtr_users_in_group):
+    """
+    GIVEN: a user in a group
+    WHEN: the user is removed from the group during the request
+    THEN: check that the user's group is looked up again
+    """
+    conn, group, users = fxtr_users_in_group
+    with fxtr_app.test_request_context():
+        assert user_group(conn, users[0]).value == group
+        with db.cursor(conn) as cursor:
+            cursor.execute(
+                "DELETE FROM group_users WHERE group_id=? AND user_id=?",
+                (str(group.group_id), str(users[0].user_id)))
+        assert user_group(conn, users[0]) == Nothing
@@ -0,0 +1,134 @@
+"""Test the results of jobs, and reading them incrementally."""
+import json
+import uuid
+import contextlib
+
+import pytest
+
+from gn_auth import jobs
+
+class FakeRedis:
+    """Stand-in for the few Redis commands used for jobs' results."""
+    def __init__(self):
+        self.lists: dict = {}
+        self.hashes: dict = {}
+
+    def rpush(self, key, *values):
+        """Append `values` to the list at `key`, returning its new length."""
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    def llen(self, key):
+        """The length of the list at `key`."""
+        return len(self.lists.get(key, []))
+
+    def lrange(self, key, start, end):
+        """The items of the list at `key`, from `start` to `end` inclusive."""
+        items = self.lists.get(key, [])
+        return items[start:(None if end == -1 else end + 1)]
+
+    def hset(self, key, mapping):
+        """Set the fields of the hash at `key`."""
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def hget(self, key, field):
+        """A field of the hash at `key`."""
+        return self.hashes.get(key, {}).get(field)
+
+    def hgetall(self, key):
+        """All the fields of the hash at `key`."""
+        return dict(self.hashes.get(key, {}))
+
+@pytest.fixture
+def fake_redis(mocker):
+    """Fixture: a fake Redis, used by the views in place of a real one."""
+    redisconn = FakeRedis()
+    mocker.patch("gn_auth.auth.authorisation.data.views.rdb.connection",
+                 lambda _uri: contextlib.nullcontext(redisconn))
+    return redisconn
+
+def __search_job__(redisconn, pages):
+    """Create a search job, and append its pages of results."""
+    job_id = jobs.create_job(redisconn, {"command": ["search"]})
+    for page in pages:
+        jobs.append_results(redisconn, job_id, page)
+    return job_id
+
+@pytest.mark.unit_test
+@pytest.mark.parametrize(
+    "offset,expected",
+    ((0, tuple(range(6))), (3, (3, 4, 5)), (5, (5,)), (6, tuple()),
+     (10, tuple())))
+def test_job_results_are_read_from_an_offset(offset, expected):
+    """
+    GIVEN: a job whose results were appended a page at a time
+    WHEN: the results are read from some offset
+    THEN: check that only the results from the offset onwards are read, in the
+          order they were appended
+    """
+    redisconn = FakeRedis()
+    job_id = __search_job__(
+        redisconn,
+        (({"idx": 0}, {"idx": 1}), tuple(), ({"idx": 2},),
+         ({"idx": 3}, {"idx": 4}, {"idx": 5})))
+    assert tuple(result["idx"] for result in jobs.job_results(
+        redisconn, job_id, offset)) == expected
+
+@pytest.mark.unit_test
+def test_appending_results_counts_all_the_results():
+    """
+    GIVEN: a job with some results
+    WHEN: more results are appended, or none are
+    THEN: check that the count of all the job's results is returned
+    """
+    redisconn = FakeRedis()
+    job_id = __search_job__(redisconn, (({"idx": 0}, {"idx": 1}),))
+    assert jobs.append_results(redisconn, job_id, ({"idx": 2},)) == 3
+    assert jobs.append_results(redisconn, job_id, tuple()) == 3
+
+@pytest.mark.unit_test
+def test_polling_search_results_from_next_offset(client, fake_redis):# pylint: disable=[redefined-outer-name]
+    """
+    GIVEN: a running search job with some results
+    WHEN: the results are polled, then polled again from the 'next_offset'
+          after more results were appended
+    THEN: check that each poll only returns the results that are new
+    """
+    job_id = __search_job__(fake_redis, (({"idx": 0}, {"idx": 1}),))
+    first = client.get(f"/auth/data/search/phenotype/{job_id}/results").json
+    jobs.append_results(fake_redis, job_id, ({"idx": 2},))
+    second = client.get(
+        f"/auth/data/search/phenotype/{job_id}/results"
+        f"?offset={first['next_offset']}").json
+
+    assert first["status"] == "queued"
+    assert [result["idx"] for result in first["search_results"]] == [0, 1]
+    assert first["next_offset"] == 2
+    assert [result["idx"] for result in second["search_results"]] == [2]
+    assert second["next_offset"] == 3
+
+@pytest.mark.unit_test
+@pytest.mark.parametrize("offset", ("-1", "two"))
+def test_invalid_search_results_offsets_are_rejected(
+        client, fake_redis, offset):# pylint: disable=[redefined-outer-name]
+    """
+    GIVEN: a search job with some results
+    WHEN: the results are requested from a negative, or non-integer offset
+    THEN: check that the request is rejected as invalid
+    """
+    job_id = __search_job__(fake_redis, (({"idx": 0}, {"idx": 1}),))
+    response = client.get(
+        f"/auth/data/search/phenotype/{job_id}/results?offset={offset}")
+    assert response.status_code == 400
+    assert json.loads(response.data)["error"] == "InvalidData"
+
+@pytest.mark.unit_test
+def test_search_results_of_unknown_jobs_are_not_found(client, fake_redis):# pylint: disable=[redefined-outer-name,unused-argument]
+    """
+    GIVEN: no search job with a given ID
+    WHEN: its results are requested
+    THEN: check that the job is reported as not found
+    """
+    response = client.get(
+        f"/auth/data/search/phenotype/{uuid.uuid4()}/results")
+    assert response.status_code == 404
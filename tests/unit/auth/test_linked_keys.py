@@ -0,0 +1,132 @@
+"""Test loading the keys of linked data into MariaDB temporary tables."""
+import uuid
+
+import pytest
+
+from gn_auth.auth.db import sqlite3 as db
+from gn_auth.auth.authorisation.data.phenotypes import linked_phenotype_keys
+from gn_auth.auth.authorisation.data.linked_keys import (
+    join_linked_keys, linked_keys_table)
+
+from tests.unit.auth import conftest
+
+class FakeCursor:
+    """Stand-in for a MariaDB cursor that records the statements it runs."""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        return False
+
+    def execute(self, query, *_args):
+        """Record the statement."""
+        self.conn.statements.append(query)
+
+    def executemany(self, query, rows):
+        """Record the statement and the rows inserted."""
+        self.conn.statements.append(query)
+        self.conn.inserted.extend(rows)
+
+    def fetchall(self):
+        """The rows the connection was set up to return."""
+        return self.conn.rows
+
+class FakeConnection:# pylint: disable=[too-few-public-methods]
+    """Stand-in for a MariaDB connection."""
+    def __init__(self):
+        self.statements: list = []
+        self.inserted: list = []
+        self.rows: list = []
+
+    def cursor(self, *_args):
+        """A cursor that records statements on this connection."""
+        return FakeCursor(self)
+
+def __link_genotypes__(conn, *dataset_ids):
+    with db.cursor(conn) as cursor:
+        cursor.executemany(
+            "INSERT INTO linked_genotype_data(data_link_id, group_id, "
+            "SpeciesId, InbredSetId, GenoFreezeId, dataset_name, "
+            "dataset_fullname, dataset_shortname) "
+            "VALUES (?, ?, 1, 1, ?, 'name', 'full name', 'short name')",
+            ((str(uuid.uuid4()), str(conftest.TEST_GROUP_01.group_id),
+              str(dataset_id))
+             for dataset_id in dataset_ids))
+
+@pytest.mark.unit_test
+def test_linked_keys_are_reloaded_only_after_linking(fxtr_group):
+    """
+    GIVEN: genotype data linked to a group
+    WHEN: the linked keys are loaded into a MariaDB connection, more than once
+    THEN: check that they are only reloaded after more data is linked
+    """
+    conn, _groups = fxtr_group
+    gn3conn = FakeConnection()
+    __link_genotypes__(conn, 1, 2)
+    try:
+        table = linked_keys_table(conn, gn3conn, "genotype")
+        loaded = list(gn3conn.inserted)
+        linked_keys_table(conn, gn3conn, "genotype")
+        unchanged = list(gn3conn.inserted)
+        __link_genotypes__(conn, 3)
+        linked_keys_table(conn, gn3conn, "genotype")
+    finally:
+        with db.cursor(conn) as cursor:
+            cursor.execute("DELETE FROM linked_genotype_data")
+
+    assert sorted(loaded) == [("1", "1", "1"), ("1", "1", "2")]
+    assert unchanged == loaded
+    assert sorted(gn3conn.inserted[len(loaded):]) == [
+        ("1", "1", "1"), ("1", "1", "2"), ("1", "1", "3")]
+    assert join_linked_keys(
+        table, "genotype", ("s.SpeciesId", "iset.InbredSetId", "gf.Id")) == (
+            f" LEFT JOIN {table} AS lk ON s.SpeciesId=lk.SpeciesId AND "
+            "iset.InbredSetId=lk.InbredSetId AND gf.Id=lk.GenoFreezeId ")
+
+def __link_phenotypes__(conn, *xref_ids):
+    with db.cursor(conn) as cursor:
+        cursor.executemany(
+            "INSERT INTO linked_phenotype_data(data_link_id, group_id, "
+            "SpeciesId, InbredSetId, PublishFreezeId, dataset_name, "
+            "dataset_fullname, dataset_shortname, PublishXRefId) "
+            "VALUES (?, ?, 1, 1, 1, 'BXDPublish', 'full name', 'short name', ?)",
+            ((str(uuid.uuid4()), str(conftest.TEST_GROUP_01.group_id),
+              str(xref_id))
+             for xref_id in xref_ids))
+
+@pytest.mark.unit_test
+def test_linked_phenotype_keys_are_indexed_once(fxtr_group):
+    """
+    GIVEN: phenotypes linked to a group
+    WHEN: the keys of the linked phenotypes are retrieved, more than once
+    THEN: check that GN3 is only queried for the traits not yet indexed, and
+          that unlinked traits drop out of the index
+    """
+    conn, _groups = fxtr_group
+    gn3conn = FakeConnection()
+    gn3conn.rows = [
+        {"InbredSetId": 1, "SpeciesName": "mouse", "InbredSetName": "BXD"}]
+    __link_phenotypes__(conn, 10, 11)
+    try:
+        keys = linked_phenotype_keys(conn, gn3conn, "mouse")
+        queried = len(gn3conn.statements)
+        again = linked_phenotype_keys(conn, gn3conn, "mouse")
+        other_species = linked_phenotype_keys(conn, gn3conn, "rat")
+        with db.cursor(conn) as cursor:
+            cursor.execute(
+                "DELETE FROM linked_phenotype_data WHERE PublishXRefId='10'")
+        unlinked = linked_phenotype_keys(conn, gn3conn, "mouse")
+    finally:
+        with db.cursor(conn) as cursor:
+            cursor.execute("DELETE FROM linked_phenotype_data")
+
+    assert keys == frozenset({("mouse", "BXD", "BXDPublish", "10"),
+                              ("mouse", "BXD", "BXDPublish", "11")})
+    assert queried == 1
+    assert again == keys
+    assert other_species == frozenset()
+    assert unlinked == frozenset({("mouse", "BXD", "BXDPublish", "11")})
+    assert len(gn3conn.statements) == queried
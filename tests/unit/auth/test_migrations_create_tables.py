@@ -47,7 +47,13 @@ migrations_and_tables = (
     ("20231002_01_tzxTf-link-inbredsets-to-auth-system.py",
      "linked_inbredset_groups"),
     ("20231002_01_tzxTf-link-inbredsets-to-auth-system.py",
-     "inbredset_group_resources"))
+     "inbredset_group_resources"),
+    ("20261018_02_Gn7pQ-create-authorisation-generation-table.py",
+     "authorisation_generation"),
+    ("20261018_03_Xe2wM-create-effective-privileges-table.py",
+     "effective_privileges"),
+    ("20261018_04_Tq8dL-create-data-resources-index-table.py",
+     "data_resources_index"))
 
 @pytest.mark.unit_test
 @pytest.mark.parametrize("migration_file,the_table", migrations_and_tables)
@@ -25,7 +25,16 @@ migrations_tables_and_indexes = (
      "tbl_group_users_cols_group_id"),
     ("20221206_01_BbeF9-create-group-user-roles-on-resources-table.py",
      "group_user_roles_on_resources",
-     "idx_tbl_group_user_roles_on_resources_group_user_resource"))
+     "idx_tbl_group_user_roles_on_resources_group_user_resource"),
+    ("20261018_01_Rk4vT-index-oauth2-tokens-refresh-token.py", "oauth2_tokens",
+     "idx_tbl_oauth2_tokens_cols_refresh_token"),
+    ("20261018_03_Xe2wM-create-effective-privileges-table.py", "user_roles",
+     "idx_tbl_user_roles_cols_role_id"),
+    ("20261018_03_Xe2wM-create-effective-privileges-table.py",
+     "effective_privileges", "idx_tbl_effective_privileges_cols_role_id"),
+    ("20261018_04_Tq8dL-create-data-resources-index-table.py",
+     "data_resources_index",
+     "idx_tbl_data_resources_index_cols_data_link_id"))
 
 @pytest.mark.unit_test
 @pytest.mark.parametrize(
@@ -0,0 +1,104 @@
+"""Test the bit-mask representation of privileges."""
+import uuid
+
+import pytest
+
+from gn_auth.auth.db import sqlite3 as db
+from gn_auth.auth.authentication.users import User
+from gn_auth.auth.authorisation.resources.checks import authorised_for
+from gn_auth.auth.authorisation.privilege_masks import (
+    has_all, load_privilege_masks)
+
+from tests.unit.auth.fixtures.role_fixtures import (
+    RESOURCE_READER_ROLE, RESOURCE_EDITOR_ROLE)
+
+@pytest.mark.unit_test
+def test_role_masks_hold_the_roles_privileges(fxtr_roles):
+    """
+    GIVEN: roles with privileges
+    WHEN: the privilege masks are computed
+    THEN: check that each role's mask holds exactly the role's privileges
+    """
+    conn, roles = fxtr_roles
+    masks = load_privilege_masks(conn)
+    for role in roles:
+        assert masks.privilege_ids(masks.role_mask(role.role_id)) == frozenset(
+            priv.privilege_id for priv in role.privileges)
+
+    reader = masks.role_mask(RESOURCE_READER_ROLE.role_id)
+    editor = masks.role_mask(RESOURCE_EDITOR_ROLE.role_id)
+    edit = masks.mask(("group:resource:edit-resource",))
+    assert has_all(editor, edit)
+    assert not has_all(reader, edit)
+    assert masks.mask(("no:such:privilege",)) is None
+    assert not has_all(editor, masks.mask(("no:such:privilege",)))
+
+def __sql_authorised_for__(conn, user, privileges, resource_ids):
+    """Authorisation check done entirely in SQL, for comparison."""
+    with db.cursor(conn) as cursor:
+        cursor.execute(
+            ("SELECT ur.resource_id, rp.privilege_id FROM "
+             "user_roles AS ur "
+             "INNER JOIN roles AS r ON ur.role_id=r.role_id "
+             "INNER JOIN role_privileges AS rp ON r.role_id=rp.role_id "
+             "WHERE ur.user_id=? "
+             f"AND ur.resource_id IN ({', '.join(['?']*len(resource_ids))})"
+             f"AND rp.privilege_id IN ({', '.join(['?']*len(privileges))})"),
+            ((str(user.user_id),) + tuple(
+                str(r_id) for r_id in resource_ids) + tuple(privileges)))
+        held: dict[uuid.UUID, set] = {}
+        for row in cursor.fetchall():
+            held.setdefault(uuid.UUID(row[0]), set()).add(row[1])
+        return {
+            resource_id: all(
+                priv in held.get(resource_id, set()) for priv in privileges)
+            for resource_id in resource_ids
+        }
+
+@pytest.mark.unit_test
+def test_mask_checks_agree_with_sql_checks(fxtr_roles):
+    """
+    GIVEN: a user with reader or editor roles on many resources
+    WHEN: the user's authorisation on all the resources is checked
+    THEN: check that the bit-mask checks agree with the SQL checks
+    """
+    conn, _roles = fxtr_roles
+    user = User(uuid.uuid4(), "mask@privilege.check", "Mask Check")
+    resource_ids = tuple(uuid.uuid4() for _ in range(200))
+    privileges = ("group:resource:view-resource",
+                  "group:resource:edit-resource")
+    with db.cursor(conn) as cursor:
+        cursor.execute(
+            "SELECT resource_category_id FROM resource_categories LIMIT 1")
+        category_id = cursor.fetchone()[0]
+        cursor.execute("INSERT INTO users(user_id, email, name) VALUES(?,?,?)",
+                       (str(user.user_id), user.email, user.name))
+        cursor.executemany(
+            "INSERT INTO resources(resource_id, resource_name, "
+            "resource_category_id, public) VALUES (?, ?, ?, 0)",
+            ((str(rid), f"mask-check-{rid}", category_id)
+             for rid in resource_ids))
+        cursor.executemany(
+            "INSERT INTO user_roles(user_id, role_id, resource_id) "
+            "VALUES (?, ?, ?)",
+            ((str(user.user_id),
+              str((RESOURCE_EDITOR_ROLE if idx % 2 else
+                   RESOURCE_READER_ROLE).role_id),
+              str(rid))
+             for idx, rid in enumerate(resource_ids)))
+
+    try:
+        by_masks = authorised_for(conn, user, privileges, resource_ids)
+        by_sql = __sql_authorised_for__(conn, user, privileges, resource_ids)
+    finally:
+        with db.cursor(conn) as cursor:
+            cursor.execute("DELETE FROM user_roles WHERE user_id=?",
+                           (str(user.user_id),))
+            cursor.executemany("DELETE FROM resources WHERE resource_id=?",
+                               ((str(rid),) for rid in resource_ids))
+            cursor.execute("DELETE FROM users WHERE user_id=?",
+                           (str(user.user_id),))
+
+    assert by_masks == by_sql
+    assert all(by_masks[rid] == bool(idx % 2)
+               for idx, rid in enumerate(resource_ids))
@@ -2,9 +2,11 @@
 import pytest
 
 from gn_auth.auth.db import sqlite3 as db
-from gn_auth.auth.authorisation.privileges import Privilege, user_privileges
+from gn_auth.auth.authorisation.privileges import (
+    Privilege, user_privileges, cached_user_privileges)
 
 from tests.unit.auth import conftest
+from tests.unit.auth.fixtures.role_fixtures import RESOURCE_READER_ROLE
 
 def sort_key_privileges(priv):
     """Sort-key for privileges."""
@@ -46,3 +48,33 @@ def test_user_privileges(auth_testdb_path, fxtr_users, user, expected):# pylint:
     with db.connection(auth_testdb_path) as conn:
         assert sorted(
             user_privileges(conn, user), key=sort_key_privileges) == expected
+
+@pytest.mark.unit_test
+def test_cached_privileges_follow_role_changes(
+        fxtr_users, fxtr_roles, fxtr_resources):# pylint: disable=[unused-argument]
+    """
+    GIVEN: A user whose privileges have been cached
+    WHEN: The user is assigned a new role on a resource
+    THEN: Ensure the new privileges are seen without waiting for the cache
+    """
+    conn, users = fxtr_users
+    _conn, resources = fxtr_resources
+    user, resource = users[1], resources[0]
+    before = cached_user_privileges(conn, user)
+    assert resource.resource_id not in before.by_resource
+
+    params = (str(user.user_id), str(RESOURCE_READER_ROLE.role_id),
+              str(resource.resource_id))
+    with db.cursor(conn) as cursor:
+        cursor.execute("INSERT INTO user_roles(user_id, role_id, resource_id) "
+                       "VALUES (?, ?, ?)",
+                       params)
+    after = cached_user_privileges(conn, user)
+    with db.cursor(conn) as cursor:
+        cursor.execute("DELETE FROM user_roles WHERE user_id=? AND role_id=? "
+                       "AND resource_id=?",
+                       params)
+
+    assert after.generation > before.generation
+    assert after.resource_privilege_ids(resource.resource_id) == frozenset(
+        ("group:resource:view-resource",))
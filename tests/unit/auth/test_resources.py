@@ -5,11 +5,16 @@ import pytest
 
 from gn_auth.auth.db import sqlite3 as db
 
-from gn_auth.auth.authorisation.errors import AuthorisationError
+from gn_auth.auth.authentication.users import User
+from gn_auth.auth.authorisation.privileges import cached_user_privileges
+from gn_auth.auth.authorisation.errors import InvalidData, AuthorisationError
 from gn_auth.auth.authorisation.resources.groups import Group
 from gn_auth.auth.authorisation.resources.models import (
     Resource, user_resources, create_resource, ResourceCategory,
-    public_resources)
+    public_resources, resource_categories,
+    public_resources_snapshot, user_roles_on_resources, resource_data,
+    continue_after, continuation_token)
+from gn_auth.auth.authorisation.resources.checks import authorised_for
 
 from tests.unit.auth import conftest
 
@@ -91,6 +96,82 @@ def test_public_resources(fxtr_resources):
     assert sorted(
         public_resources(conn), key=sort_key_resources) == PUBLIC_RESOURCES
 
+@pytest.mark.unit_test
+def test_public_resources_snapshot_follows_visibility(fxtr_resources):
+    """
+    GIVEN: some resources in the database
+    WHEN: the public resources are listed before and after a private resource
+          is made public
+    THEN: check that the snapshot is reused until the visibility changes
+    """
+    conn, _resources = fxtr_resources
+    private = conftest.TEST_RESOURCES_GROUP_01[1]
+    first = public_resources_snapshot(conn)
+    again = public_resources_snapshot(conn)
+    with db.cursor(conn) as cursor:
+        cursor.execute("UPDATE resources SET public=1 WHERE resource_id=?",
+                       (str(private.resource_id),))
+    after = public_resources_snapshot(conn)
+    with db.cursor(conn) as cursor:
+        cursor.execute("UPDATE resources SET public=0 WHERE resource_id=?",
+                       (str(private.resource_id),))
+
+    assert again is first
+    assert private.resource_id not in first.resource_ids
+    assert after.resource_ids == first.resource_ids | {private.resource_id}
+
+@pytest.mark.unit_test
+def test_privileges_use_the_public_resources_snapshot(fxtr_resources):
+    """
+    GIVEN: some resources in the database
+    WHEN: a user's privileges are loaded
+    THEN: check that the 'public-view' role is implicitly granted on exactly
+          the resources of the public resources snapshot
+    """
+    conn, _resources = fxtr_resources
+    user = conftest.TEST_USERS[0]
+    with db.cursor(conn) as cursor:
+        cursor.execute(
+            "SELECT role_id FROM roles WHERE role_name='public-view'")
+        role_id = uuid.UUID(cursor.fetchone()[0])
+
+    snapshot = public_resources_snapshot(conn)
+    assert cached_user_privileges(conn, user).public is snapshot
+    assert snapshot.role_id == role_id
+
+@pytest.mark.unit_test
+def test_public_view_is_granted_implicitly(fxtr_resources):
+    """
+    GIVEN: a user with no roles at all, and both public and private resources
+    WHEN: the user's authorisation to view the resources is checked
+    THEN: check that the user can view the public resources, through the
+          'public-view' role, and not the private ones
+    """
+    conn, _resources = fxtr_resources
+    public, private = (conftest.TEST_RESOURCES_GROUP_01[0],
+                       conftest.TEST_RESOURCES_GROUP_01[1])
+    user = User(uuid.uuid4(), "no@roles.at.all", "No Roles")
+    with db.cursor(conn) as cursor:
+        cursor.execute("INSERT INTO users(user_id, email, name) VALUES(?,?,?)",
+                       (str(user.user_id), user.email, user.name))
+
+    try:
+        authorised = authorised_for(
+            conn, user, ("group:resource:view-resource",),
+            (public.resource_id, private.resource_id))
+        roles = user_roles_on_resources(
+            conn, user, (public.resource_id, private.resource_id))
+    finally:
+        with db.cursor(conn) as cursor:
+            cursor.execute("DELETE FROM users WHERE user_id=?",
+                           (str(user.user_id),))
+
+    assert authorised == {public.resource_id: True, private.resource_id: False}
+    assert tuple(roles.keys()) == (public.resource_id,)
+    assert tuple(
+        role.role_name for role in roles[public.resource_id]["roles"]) == (
+            "public-view",)
+
 @pytest.mark.unit_test
 @pytest.mark.parametrize(
     "user,expected",
@@ -119,3 +200,119 @@ def test_user_resources(fxtr_group_user_roles, user, expected):
     assert sorted(
         {res.resource_id: res for res in user_resources(conn, user)
          }.values(), key=sort_key_resources) == expected
+
+def __per_source_user_resources__(conn, user):
+    """Collect the user's resources one source at a time, for comparison."""
+    categories = {
+        cat.resource_category_id: cat for cat in resource_categories(conn)}
+    def __resources__(cursor):
+        return tuple(
+            Resource(uuid.UUID(row[0]), row[1], categories[uuid.UUID(row[2])],
+                     bool(row[3]))
+            for row in cursor.fetchall())
+
+    with db.cursor(conn) as cursor:
+        cursor.execute(
+            "SELECT resources.* FROM user_roles INNER JOIN resources "
+            "ON user_roles.resource_id=resources.resource_id "
+            "WHERE user_roles.user_id=?",
+            (str(user.user_id),))
+        role_resources = __resources__(cursor)
+        cursor.execute(
+            "SELECT r.* FROM resource_ownership AS ro "
+            "INNER JOIN resources AS r ON ro.resource_id=r.resource_id "
+            "INNER JOIN group_users AS gu ON ro.group_id=gu.group_id "
+            "INNER JOIN user_roles AS ur ON gu.user_id=ur.user_id "
+            "INNER JOIN roles ON ur.role_id=roles.role_id "
+            "WHERE gu.user_id=? AND roles.role_name='group-leader'",
+            (str(user.user_id),))
+        leader_resources = __resources__(cursor)
+    return tuple({
+        res.resource_id: res for res in
+        (role_resources + leader_resources + tuple(public_resources(conn)))
+    }.values())
+
+@pytest.mark.unit_test
+@pytest.mark.parametrize("user", conftest.TEST_USERS)
+def test_user_resources_query_agrees_with_per_source_queries(
+        fxtr_group_user_roles, user):
+    """
+    GIVEN: a group that owns many resources, some of them public
+    WHEN: a user's resources are listed
+    THEN: check that the single query lists the same resources as the
+          per-source queries
+    """
+    conn, *_others = fxtr_group_user_roles
+    resource_ids = tuple(str(uuid.uuid4()) for _ in range(50))
+    with db.cursor(conn) as cursor:
+        cursor.executemany(
+            "INSERT INTO resources VALUES (?, ?, ?, ?)",
+            ((rid, f"owned-{rid}",
+              str(resource_category.resource_category_id), idx % 3 == 0)
+             for idx, rid in enumerate(resource_ids)))
+        cursor.executemany(
+            "INSERT INTO resource_ownership(group_id, resource_id) "
+            "VALUES (?, ?)",
+            ((str(conftest.TEST_GROUP_01.group_id), rid)
+             for rid in resource_ids))
+
+    try:
+        single = user_resources(conn, user)
+        per_source = __per_source_user_resources__(conn, user)
+    finally:
+        with db.cursor(conn) as cursor:
+            cursor.executemany(
+                "DELETE FROM resource_ownership WHERE resource_id=?",
+                ((rid,) for rid in resource_ids))
+            cursor.executemany("DELETE FROM resources WHERE resource_id=?",
+                               ((rid,) for rid in resource_ids))
+
+    assert (sorted(single, key=sort_key_resources) ==
+            sorted(per_source, key=sort_key_resources))
+
+@pytest.mark.unit_test
+def test_resource_data_pages_continue_after_the_last_item(fxtr_resources):
+    """
+    GIVEN: a resource with some linked data
+    WHEN: the data is fetched a page at a time, each page continuing after the
+          last item of the page before
+    THEN: check that the pages hold all the data, in order, exactly once
+    """
+    conn, _resources = fxtr_resources
+    resource = conftest.TEST_RESOURCES_GROUP_01[1]
+    data_link_ids = tuple(str(uuid.uuid4()) for _ in range(7))
+    with db.cursor(conn) as cursor:
+        cursor.executemany(
+            "INSERT INTO linked_phenotype_data(data_link_id, group_id, "
+            "SpeciesId, InbredSetId, PublishFreezeId, dataset_name, "
+            "PublishXRefId) VALUES (?, ?, 1, 1, 1, 'BXDPublish', ?)",
+            ((data_link_id, str(conftest.TEST_GROUP_01.group_id), 10001 + idx)
+             for idx, data_link_id in enumerate(data_link_ids)))
+        cursor.executemany(
+            "INSERT INTO phenotype_resources(resource_id, data_link_id) "
+            "VALUES (?, ?)",
+            ((str(resource.resource_id), data_link_id)
+             for data_link_id in data_link_ids))
+
+    try:
+        pages, after = [], None
+        while True:
+            page = tuple(
+                resource_data(conn, resource, limit=3, after=after))
+            pages.append(tuple(item["data_link_id"] for item in page))
+            if len(page) < 3:
+                break
+            after = continue_after(continuation_token(page[-1]["data_link_id"]))
+    finally:
+        with db.cursor(conn) as cursor:
+            cursor.executemany(
+                "DELETE FROM phenotype_resources WHERE data_link_id=?",
+                ((data_link_id,) for data_link_id in data_link_ids))
+            cursor.executemany(
+                "DELETE FROM linked_phenotype_data WHERE data_link_id=?",
+                ((data_link_id,) for data_link_id in data_link_ids))
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sum(pages, tuple()) == tuple(sorted(data_link_ids))
+    with pytest.raises(InvalidData):
+        continue_after("not-a-token")
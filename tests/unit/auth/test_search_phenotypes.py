@@ -0,0 +1,73 @@
+"""Test fetching the pages of a phenotype search."""
+import json
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from scripts.search_phenotypes import search_pages, search_session
+
+class StubSearchHandler(BaseHTTPRequestHandler):
+    """Serve pages of search results, with `page` items on each of the first
+    five pages, and none after."""
+    protocol_version = "HTTP/1.1" # keep connections alive
+
+    def do_GET(self):# pylint: disable=[invalid-name]
+        """Serve the requested page, recording the request."""
+        page = int(parse_qs(urlparse(self.path).query)["page"][0])
+        self.server.requests.append((page, self.client_address))# type: ignore[attr-defined]
+        body = json.dumps([
+            {"page": page, "item": item}
+            for item in range(page if page <= 5 else 0)]).encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):# pylint: disable=[arguments-differ]
+        """Keep the test output quiet."""
+
+@pytest.fixture
+def stub_search_host():
+    """Fixture: a local HTTP server that stands in for the search host."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSearchHandler)
+    server.requests = []# type: ignore[attr-defined]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield (f"http://127.0.0.1:{server.server_address[1]}/api/", server)
+    server.shutdown()
+    server.server_close()
+
+@pytest.mark.unit_test
+def test_search_pages_are_prefetched_in_order(stub_search_host):# pylint: disable=[redefined-outer-name]
+    """
+    GIVEN: a search host with five pages of results
+    WHEN: the pages are fetched, prefetching two at a time
+    THEN: check that the pages come in order, ending at the last page, and
+          that connections are reused rather than opened for every page
+    """
+    host, server = stub_search_host
+    with search_session(2) as session:
+        pages = tuple(search_pages(session, host, "species:mouse", 10, 2))
+
+    assert tuple(len(page) for page in pages) == (1, 2, 3, 4, 5)
+    assert all(item["page"] == idx + 1
+               for idx, page in enumerate(pages) for item in page)
+    assert len(server.requests) <= 7
+    assert len({client for _page, client in server.requests}) <= 2
+
+@pytest.mark.unit_test
+def test_search_pages_stop_when_no_longer_needed(stub_search_host):# pylint: disable=[redefined-outer-name]
+    """
+    GIVEN: a search host with five pages of results
+    WHEN: the caller stops after the first page
+    THEN: check that no more than the prefetched pages are requested
+    """
+    host, server = stub_search_host
+    with search_session(2) as session:
+        for _page in search_pages(session, host, "species:mouse", 10, 2):
+            break
+
+    assert {page for page, _client in server.requests} <= {1, 2, 3}
@@ -0,0 +1,132 @@
+"""Test the pooled, request-scoped connections to the auth database."""
+import sqlite3
+
+import pytest
+
+from gn_auth.auth.db import sqlite3 as db
+
+@pytest.mark.unit_test
+def test_nested_connections_are_reused(tmp_path):
+    """
+    GIVEN: a path to an SQLite3 database
+    WHEN: a connection is requested while another is already open
+    THEN: check that the already open connection is returned
+    """
+    db_path = str(tmp_path.joinpath("nested.db"))
+    with db.connection(db_path) as outer:
+        with db.connection(db_path) as inner:
+            assert inner is outer
+
+@pytest.mark.unit_test
+def test_connections_are_returned_to_the_pool(tmp_path):
+    """
+    GIVEN: a path to an SQLite3 database
+    WHEN: connections are requested one after the other
+    THEN: check that the same pooled connection is handed out each time
+    """
+    db_path = str(tmp_path.joinpath("sequential.db"))
+    with db.connection(db_path) as first:
+        pass
+    with db.connection(db_path) as second:
+        assert second is first
+
+@pytest.mark.unit_test
+def test_pool_size_defaults_to_the_setting(mocker, tmp_path):
+    """
+    GIVEN: no application context
+    WHEN: the pool for an SQLite3 database is created
+    THEN: check that it keeps as many idle connections as the setting allows
+    """
+    mocker.patch("gn_auth.auth.db.sqlite3.has_app_context", lambda: False)
+    mocker.patch("gn_auth.auth.db.sqlite3.settings.AUTH_DB_POOL_SIZE", 2)
+    pool = db.connection_pool(str(tmp_path.joinpath("pool_size.db")))
+    assert pool.max_idle == 2
+
+@pytest.mark.unit_test
+def test_writes_are_committed_when_outermost_connection_exits(tmp_path):
+    """
+    GIVEN: a path to an SQLite3 database
+    WHEN: data is written within nested connections
+    THEN: check that the data is visible to other connections afterwards
+    """
+    db_path = str(tmp_path.joinpath("commit.db"))
+    with db.connection(db_path) as outer:
+        with db.connection(db_path) as inner, db.cursor(inner) as cursor:
+            cursor.execute("CREATE TABLE things(thing TEXT)")
+            cursor.execute("INSERT INTO things VALUES ('a-thing')")
+        assert outer.execute("SELECT COUNT(*) FROM things").fetchone()[0] == 1
+
+    other_conn = db.ConnectionPool(db_path).acquire()
+    try:
+        assert other_conn.execute(
+            "SELECT COUNT(*) FROM things").fetchone()[0] == 1
+    finally:
+        other_conn.close()
+
+@pytest.mark.unit_test
+def test_transactions_are_retried_while_database_is_locked(tmp_path):
+    """
+    GIVEN: a transaction that fails part-way because the database is locked
+    WHEN: the transaction is run through `transaction`
+    THEN: check that the whole transaction is rolled back and run again until
+          it succeeds, and that the waits are recorded against its label
+    """
+    attempts = []
+    def __locked_twice__(cursor):
+        attempts.append(1)
+        cursor.execute("INSERT INTO things VALUES ('a-thing')")
+        if len(attempts) < 3:
+            raise sqlite3.OperationalError("database is locked")
+        return "done"
+
+    db.contention_metrics.reset()
+    with db.connection(str(tmp_path.joinpath("retry.db"))) as conn:
+        with db.cursor(conn) as cursor:
+            cursor.execute("CREATE TABLE things(thing TEXT)")
+        assert db.transaction(conn, __locked_twice__, "add_thing") == "done"
+        assert conn.execute("SELECT COUNT(*) FROM things").fetchone()[0] == 1
+    assert len(attempts) == 3
+    metrics = db.contention_metrics.snapshot()
+    assert metrics["waits"] == 2
+    assert metrics["labels"]["add_thing"]["failures"] == 0
+
+@pytest.mark.unit_test
+@pytest.mark.parametrize(
+    "statement,label",
+    (("INSERT INTO oauth2_tokens VALUES (:token_id, :client_id)",
+      "INSERT oauth2_tokens"),
+     ("UPDATE  resources\n SET public=? WHERE resource_id=?",
+      "UPDATE resources"),
+     ("SELECT ur.* FROM user_roles AS ur WHERE ur.user_id=?",
+      "SELECT user_roles"),
+     ("COMMIT", "COMMIT")))
+def test_statements_are_counted_under_bounded_labels(statement, label):
+    """
+    GIVEN: a statement that failed to get a lock
+    WHEN: the failure is counted
+    THEN: check that it is counted under its verb and table, and that the
+          number of labels stays bounded
+    """
+    assert db.statement_label(statement) == label
+    metrics = db.ContentionMetrics(max_labels=1)
+    metrics.record(label, 0.0, failed=True)
+    metrics.record("DELETE a_table", 0.0, failed=True)
+    assert tuple(metrics.snapshot()["labels"]) == (label, "other")
+
+@pytest.mark.unit_test
+def test_value_lists_are_not_limited_by_the_number_of_variables(tmp_path):
+    """
+    GIVEN: more values than SQLite3 allows variables in a single statement
+    WHEN: the values are bound to a `VALUES_IN` subquery
+    THEN: check that every matching row is selected
+    """
+    db_path = str(tmp_path.joinpath("values.db"))
+    values = tuple(f"value-{idx}" for idx in range(40000))
+    with db.connection(db_path) as conn, db.cursor(conn) as cursor:
+        cursor.execute("CREATE TABLE things(thing TEXT)")
+        cursor.executemany(
+            "INSERT INTO things VALUES (?)", ((value,) for value in values))
+        cursor.execute(
+            f"SELECT COUNT(*) FROM things WHERE thing IN ({db.VALUES_IN})",
+            (db.json_values(values[::2] + ("not-a-thing",)),))
+        assert cursor.fetchone()[0] == len(values[::2])
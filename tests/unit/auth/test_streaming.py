@@ -0,0 +1,57 @@
+"""Test streaming large listings as JSON."""
+import json
+import sqlite3
+
+import pytest
+
+from gn_auth.streaming import NDJSON, fetch_rows, json_response
+from gn_auth.auth.authorisation.errors import AuthorisationError
+
+@pytest.mark.unit_test
+def test_fetch_rows_reads_all_rows_in_batches():
+    """
+    GIVEN: a query with more rows than the batch size
+    WHEN: the rows are fetched in batches
+    THEN: check that every row is yielded, in order
+    """
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.execute(
+        "WITH RECURSIVE nums(n) AS (SELECT 1 UNION ALL SELECT n+1 FROM nums "
+        "WHERE n < 25) SELECT n FROM nums")
+    assert tuple(row[0] for row in fetch_rows(cursor, 10)) == tuple(
+        range(1, 26))
+
+@pytest.mark.unit_test
+@pytest.mark.parametrize(
+    "accept,items,parse",
+    (("application/json", tuple(), json.loads),
+     ("application/json", ({"a": 1}, {"b": 2}), json.loads),
+     (NDJSON, ({"a": 1}, {"b": 2}),
+      lambda body: [json.loads(line) for line in body.splitlines()])))
+def test_json_response_streams_the_items(fxtr_app, accept, items, parse):
+    """
+    GIVEN: some items to list
+    WHEN: the items are streamed to a client that accepts `accept`
+    THEN: check that the body holds the items, encoded in the accepted format
+    """
+    with fxtr_app.test_request_context(headers={"Accept": accept}):
+        response = json_response(iter(items))
+        body = "".join(response.response)
+
+    assert response.mimetype == accept
+    assert parse(body) == list(items)
+
+@pytest.mark.unit_test
+def test_json_response_raises_errors_before_streaming(fxtr_app):
+    """
+    GIVEN: a listing that fails before producing its first item
+    WHEN: the listing is streamed
+    THEN: check that the error is raised before the response is returned
+    """
+    def __unauthorised__():
+        raise AuthorisationError("Not allowed.")
+        yield {}# pylint: disable=[unreachable]
+
+    with fxtr_app.test_request_context():
+        with pytest.raises(AuthorisationError):
+            json_response(__unauthorised__())
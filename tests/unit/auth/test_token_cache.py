@@ -0,0 +1,75 @@
+"""Test the in-process cache of validated OAuth2 tokens."""
+import uuid
+import datetime
+
+import pytest
+
+from gn_auth.auth.db import sqlite3 as db
+from gn_auth.auth.authorisation.privileges import authorisation_generation
+from gn_auth.auth.authentication.oauth2.models.token_cache import (
+    cache_token, cached_token)
+from gn_auth.auth.authentication.oauth2.models.oauth2token import (
+    OAuth2Token, save_token, revoke_token)
+
+def __token__(the_client, access_token, expires_in=3600):
+    return OAuth2Token(
+        token_id=uuid.uuid4(), client=the_client, token_type="Bearer",
+        access_token=access_token, refresh_token=None, scope="profile",
+        revoked=False, issued_at=datetime.datetime.now(),
+        expires_in=expires_in, user=the_client.user)
+
+@pytest.mark.unit_test
+def test_saving_a_token_invalidates_the_cached_copy(fxtr_oauth2_clients):
+    """
+    GIVEN: a token that has been cached
+    WHEN: the token is revoked
+    THEN: check that the token is no longer served from the cache
+    """
+    conn, clients = fxtr_oauth2_clients
+    token = __token__(clients[0], "token-cache-test-revoked")
+    cache_token(token, 1)
+    assert cached_token(token.access_token, 1) is token
+
+    save_token(conn, revoke_token(token))
+    assert cached_token(token.access_token, 1) is None
+
+    with db.cursor(conn) as cursor:
+        cursor.execute("DELETE FROM oauth2_tokens WHERE token_id=?",
+                       (str(token.token_id),))
+
+@pytest.mark.unit_test
+def test_expired_tokens_are_not_cached(fxtr_oauth2_clients):
+    """
+    GIVEN: a token that has already expired
+    WHEN: the token is cached
+    THEN: check that it is not served from the cache
+    """
+    _conn, clients = fxtr_oauth2_clients
+    token = __token__(clients[0], "token-cache-test-expired", expires_in=-5)
+    cache_token(token, 1)
+    assert cached_token(token.access_token, 1) is None
+
+@pytest.mark.unit_test
+def test_tokens_revoked_elsewhere_are_not_served(fxtr_oauth2_clients):
+    """
+    GIVEN: a token that has been saved and cached
+    WHEN: the token is revoked by some other process, which cannot clear this
+          process' cache
+    THEN: check that the token is no longer served from the cache
+    """
+    conn, clients = fxtr_oauth2_clients
+    token = __token__(clients[0], "token-cache-test-revoked-elsewhere")
+    save_token(conn, token)
+    before = authorisation_generation(conn, "tokens")
+    cache_token(token, before)
+    assert cached_token(token.access_token, before) is token
+
+    with db.cursor(conn) as cursor:
+        cursor.execute("UPDATE oauth2_tokens SET revoked=1 WHERE token_id=?",
+                       (str(token.token_id),))
+        after = authorisation_generation(conn, "tokens")
+        cursor.execute("DELETE FROM oauth2_tokens WHERE token_id=?",
+                       (str(token.token_id),))
+
+    assert after != before
+    assert cached_token(token.access_token, after) is None